@@ -0,0 +1,258 @@
+import asyncio
+import ipaddress
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+import asyncpg
+
+from app.config import get_settings
+from app.db import SessionLocal
+from app.repositories.audit_log import AuditLogRepository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Metody zmieniające dane - tylko one trafiają do dziennika audytu
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+def _as_uuid(value) -> Optional[uuid.UUID]:
+    try:
+        return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+    except (ValueError, TypeError):
+        return None
+
+def _ip_address(client) -> Optional[str]:
+    # Kolumna INET - host spoza adresów IP (np. "testclient" albo z nagłówków proxy) zapisujemy jako NULL
+    if not client:
+        return None
+    try:
+        ipaddress.ip_address(client[0])
+    except ValueError:
+        return None
+    return client[0]
+
+def request_entry(scope: dict, status_code: int, duration_s: float) -> Optional[dict]:
+    """
+    Wpis audytu dla obsłużonego zapytania. Akcją jest nazwa endpointu, modułem pierwszy
+    segment ścieżki po /api, a zasobem pierwszy parametr ścieżki będący UUID.
+    Użytkownika ustawia zależność autoryzacji (`request.state.user_id`) - zapytania
+    bez poprawnego tokena mają wpis bez user_id. Zwraca None dla ścieżek bez trasy.
+    """
+    route = scope.get("route")
+    if route is None:
+        return None
+    user_agent = dict(scope.get("headers") or []).get(b"user-agent")
+
+    segments = [s for s in route.path.split("/") if s]
+    module = segments[1] if len(segments) > 1 and segments[0] == "api" else (segments[0] if segments else "root")
+    resource_type, resource_id = None, None
+    for name, value in (scope.get("path_params") or {}).items():
+        resource_id = _as_uuid(value)
+        if resource_id is not None:
+            resource_type = name[:-3] if name.endswith("_id") else name
+            break
+
+    return {
+        "timestamp": datetime.now(timezone.utc),
+        "user_id": _as_uuid((scope.get("state") or {}).get("user_id")),
+        "action": route.name[:100],
+        "module": module[:100],
+        "resource_type": resource_type or module[:100],
+        "resource_id": resource_id,
+        "ip_address": _ip_address(scope.get("client")),
+        "user_agent": user_agent.decode("latin-1") if user_agent else None,
+        "details": {
+            "method": scope["method"],
+            "path": route.path,
+            "status_code": status_code,
+            "duration_ms": round(duration_s * 1000, 2),
+        },
+        "result": "success" if status_code < 400 else "failure" if status_code < 500 else "error",
+        "error_message": None,
+    }
+
+class AuditLogger:
+    """
+    Dziennik audytu zapisywany poza ścieżką zapytania.
+
+    Zapytanie tylko dokłada wpis do kolejki w pamięci; zadanie w tle zapisuje kolejkę
+    partiami przez COPY (co `flush_interval_s` albo gdy uzbiera się `batch_size` wpisów).
+    Kolejka ma limit `max_queue` - przy awarii bazy nadmiarowe wpisy są odrzucane
+    i liczone w `dropped`, zamiast spowalniać zapytania lub zajmować pamięć bez końca.
+    Wpisy z danymi odrzuconymi przez bazę są pomijane i liczone w `rejected`.
+    Przy zamknięciu kolejka jest opróżniana (najdłużej `drain_timeout_s`).
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval_s: float, drain_timeout_s: float):
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self.drain_timeout_s = drain_timeout_s
+        self._queue: Deque[dict] = deque()
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self.last_flush_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    def record(self, entry: dict) -> None:
+        """Dodaje wpis do kolejki bez czekania; przy pełnej kolejce wpis jest odrzucany."""
+        if not self.running:
+            return
+        if len(self._queue) >= self.max_queue:
+            if self.dropped % 1000 == 0:
+                logger.warning(f"Audit log queue is full ({self.max_queue}), dropping entries.")
+            self.dropped += 1
+            return
+        self._queue.append(entry)
+        self.recorded += 1
+        if len(self._queue) >= self.batch_size:
+            self._ready.set()
+
+    def start(self) -> None:
+        self._closing = False
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._closing = True
+        self._ready.set()
+        try:
+            await asyncio.wait_for(self._task, self.drain_timeout_s)
+        except asyncio.TimeoutError:
+            logger.warning("Audit log drain timed out.")
+        finally:
+            self._task = None
+            if self._queue:
+                logger.warning(f"{len(self._queue)} audit log entries were not written.")
+                self.dropped += len(self._queue)
+                self._queue.clear()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            if len(self._queue) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), self.flush_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+            self._ready.clear()
+            if not await self.flush():
+                # Baza niedostępna - kolejna próba po interwale, nie w pętli
+                await asyncio.sleep(self.flush_interval_s)
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """Zapisuje całą kolejkę partiami. False - zapis się nie udał, wpisy wróciły do kolejki."""
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            started = time.perf_counter()
+            rejected = self.rejected
+            try:
+                await self._write(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                self.last_error = repr(e)
+                logger.warning(f"Audit log write failed: {e!r}")
+                # Partia wraca na początek kolejki (w granicach limitu) - ponowienie przy kolejnym flushu
+                room = max(0, self.max_queue - len(self._queue))
+                self.dropped += max(0, len(batch) - room)
+                self._queue.extendleft(reversed(batch[:room]))
+                return False
+            self.written += len(batch) - (self.rejected - rejected)
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        return True
+
+    async def _write(self, batch: List[dict]) -> None:
+        """
+        Zapis partii. Błąd danych (wartość niezgodna z typem kolumny) nie wraca do kolejki -
+        ponawiany bez końca zablokowałby zapis; partia jest dzielona, a błędne wpisy odrzucane.
+        Pozostałe błędy (np. brak połączenia) przechodzą wyżej i partia wraca do kolejki.
+        """
+        try:
+            await self._copy(batch)
+        except (asyncpg.DataError, ValueError) as e:
+            if len(batch) == 1:
+                self.rejected += 1
+                logger.warning(f"Audit log entry rejected ({e!r}): {batch[0].get('action')}")
+                return
+            middle = len(batch) // 2
+            await self._write(batch[:middle])
+            await self._write(batch[middle:])
+
+    async def _copy(self, batch: List[dict]) -> None:
+        async with SessionLocal() as session:
+            repo = AuditLogRepository(session)
+            try:
+                await repo.copy_entries(batch)
+            except asyncpg.ForeignKeyViolationError:
+                # Użytkownik usunięty, zanim wpis trafił do bazy - wpis zostaje bez user_id
+                await session.rollback()
+                known = await repo.existing_user_ids([e["user_id"] for e in batch if e["user_id"]])
+                for entry in batch:
+                    if entry["user_id"] not in known:
+                        entry["user_id"] = None
+                await repo.copy_entries(batch)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failed_batches": self.failed_batches,
+            "last_flush_ms": self.last_flush_ms,
+            "last_error": self.last_error,
+        }
+
+class AuditMiddleware:
+    """Middleware ASGI: po obsłużeniu zapytania zmieniającego dane dodaje wpis do dziennika audytu."""
+
+    def __init__(self, app, audit: AuditLogger):
+        self.app = app
+        self.audit = audit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS or not self.audit.running:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        # Wyjątek, który nie stał się odpowiedzią, kończy się 500
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            entry = request_entry(scope, status_code, time.perf_counter() - started)
+            if entry is not None:
+                self.audit.record(entry)
+
+audit_log = AuditLogger(
+    max_queue=settings.audit_queue_max,
+    batch_size=settings.audit_batch_size,
+    flush_interval_s=settings.audit_flush_interval_s,
+    drain_timeout_s=settings.audit_drain_timeout_s,
+)
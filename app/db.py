@@ -1,11 +1,216 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy import text
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import event, exc, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import get_settings
+from app.metrics import instrument_engine, observe_pool_connect
+from app.slow_queries import slow_query_log
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
-engine = create_async_engine(settings.database_url, pool_pre_ping=True)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Pula połączeń zliczająca oczekujących i czas pobrania połączenia."""
+
+    # Etykieta puli w metrykach ("primary" / "replica")
+    name = "primary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def connect(self):
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            # Przekroczony pool_timeout liczy się tylko w `timeouts`, nie w czasie oczekiwania
+            self.timeouts += 1
+            observe_pool_connect(self.name, time.perf_counter() - started, timed_out=True)
+            raise
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - started
+        self.acquired += 1
+        self.wait_total_s += waited
+        self.wait_max_s = max(self.wait_max_s, waited)
+        observe_pool_connect(self.name, waited, timed_out=False)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.name = self.name
+        return pool
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total_s / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "wait_max_ms": round(self.wait_max_s * 1000, 2),
+        }
+
+def _ping_idle_connections(engine: AsyncEngine, idle_s: float) -> None:
+    """Tryb pre-ping 'idle': ping tylko dla połączeń nieużywanych dłużej niż `idle_s`."""
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, record):
+        record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, record, proxy):
+        checked_in_at = record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_s:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            # Pula odrzuci połączenie i spróbuje z nowym
+            raise exc.DisconnectionError() from e
+
+def make_engine(url: str, name: str = "primary") -> AsyncEngine:
+    mode = settings.db_pool_pre_ping
+    new_engine = create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_s,
+        pool_recycle=settings.db_pool_recycle_s,
+        pool_pre_ping=mode == "always",
+        connect_args={
+            # SQLAlchemy przygotowuje zapytania sam (connection.prepare), więc cache asyncpg go nie obejmuje
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "statement_cache_size": settings.db_statement_cache_size,
+            "server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)},
+        },
+    )
+    if mode == "idle":
+        _ping_idle_connections(new_engine, settings.db_pool_pre_ping_idle_s)
+    new_engine.pool.name = name
+    instrument_engine(new_engine, name)
+    if settings.slow_query_enabled:
+        slow_query_log.instrument_engine(new_engine, name)
+    return new_engine
+
+def pool_stats(target: Optional[AsyncEngine]) -> Optional[dict]:
+    return target.pool.stats() if target is not None else None
+
+engine = make_engine(settings.database_url)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# Opcjonalna replika do odczytu (DATABASE_READ_URL)
+read_engine = make_engine(settings.database_read_url, "replica") if settings.database_read_url else None
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession) if read_engine else None
+
+# Opóźnienie repliki w sekundach; 0, gdy odtworzyła już cały odebrany WAL (także przy braku ruchu na primary)
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
 async def ping_db():
     async with engine.begin() as conn:
         await conn.execute(text("SELECT 1"))
+
+class ReadReplica:
+    """
+    Decyduje, czy zapytanie tylko do odczytu może trafić na replikę.
+
+    Replika jest używana, gdy ostatni test zdrowia się powiódł, a opóźnienie nie
+    przekracza `max_lag`. Użytkownik, który niedawno coś zapisał (w tym workerze),
+    przez `ryw_window` sekund czyta z primary (read-your-writes).
+    """
+
+    def __init__(self, session_factory, check_interval: float, max_lag: float, ryw_window: float):
+        self.session_factory = session_factory
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.ryw_window = ryw_window
+        self.healthy = False
+        self.lag_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._recent_writes: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.session_factory is not None
+
+    def mark_write(self, user_key: Optional[str]) -> None:
+        if not self.enabled or not user_key:
+            return
+        now = time.monotonic()
+        self._recent_writes[user_key] = now + self.ryw_window
+        if len(self._recent_writes) > 10000:
+            self._recent_writes = {k: v for k, v in self._recent_writes.items() if v > now}
+
+    def use_replica(self, user_key: Optional[str] = None) -> bool:
+        if not self.enabled or not self.healthy:
+            return False
+        if user_key and self._recent_writes.get(user_key, 0) > time.monotonic():
+            return False
+        return True
+
+    def session(self) -> AsyncSession:
+        return self.session_factory()
+
+    async def check(self) -> None:
+        try:
+            async with read_engine.connect() as conn:
+                self.lag_s = float((await conn.execute(REPLICA_LAG_SQL)).scalar())
+            self.last_error = None
+            self.healthy = self.lag_s <= self.max_lag
+            if not self.healthy:
+                logger.warning(f"Read replica lag {self.lag_s:.1f}s exceeds {self.max_lag}s, reading from primary.")
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"Read replica health check failed, reading from primary: {e!r}")
+            self.healthy = False
+            self.last_error = str(e)
+
+    def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.create_task(self._run(), name="read-replica-monitor")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.healthy = False
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_s,
+            "max_lag_seconds": self.max_lag,
+            "last_error": self.last_error,
+        }
+
+read_replica = ReadReplica(
+    ReadSessionLocal,
+    check_interval=settings.database_read_check_s,
+    max_lag=settings.database_read_max_lag_s,
+    ryw_window=settings.database_read_ryw_window_s,
+)
@@ -1,11 +1,13 @@
 import uuid
-from fastapi import Depends, Header
+from fastapi import Depends, Header, Request
 from typing import Optional
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.security import decode_token
+from app.security import decode_token, token_subject
 from app.errors import http_401, http_403
-from app.db import SessionLocal
+from app.db import SessionLocal, read_replica
+from app.session_cache import session_cache
 from app.repositories.user import UserRepository
 from app.repositories.organization import OrganizationRepository
 from app.repositories.ice_rink import IceRinkRepository
@@ -15,12 +17,31 @@ from app.repositories.weather_provider import WeatherProviderRepository
 from app.repositories.weather_forecast import WeatherForecastRepository
 from app.repositories.system_config import SystemConfigRepository
 from app.repositories.user_session import UserSessionRepository
+from app.repositories.job_run import JobRunRepository
 
 # Zależność dostarczająca sesję bazodanową
 async def get_db_session() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
 
+# Sesja dla endpointów tylko do odczytu - replika, o ile jest zdrowa i użytkownik niedawno nic nie zapisał
+async def get_read_db_session(authorization: Optional[str] = Header(None)) -> AsyncSession:
+    if read_replica.use_replica(token_subject(authorization)):
+        async with read_replica.session() as session:
+            yield session
+    else:
+        async with SessionLocal() as session:
+            yield session
+
+def statement_timeout(timeout_ms: int, read_only: bool = False):
+    """
+    Nadpisuje statement_timeout dla transakcji żądania (SET LOCAL), np. dla eksportów.
+    Użycie: `dependencies=[Depends(statement_timeout(...))]` w dekoratorze endpointu.
+    """
+    async def _inner(session: AsyncSession = Depends(get_read_db_session if read_only else get_db_session)):
+        await session.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+    return _inner
+
 # Zależności dostarczające instancje repozytoriów
 def get_user_repo(session: AsyncSession = Depends(get_db_session)) -> UserRepository:
     return UserRepository(session)
@@ -49,6 +70,28 @@ def get_weather_forecast_repo(session: AsyncSession = Depends(get_db_session)) -
 def get_system_config_repo(session: AsyncSession = Depends(get_db_session)) -> SystemConfigRepository:
     return SystemConfigRepository(session)
 
+def get_job_run_repo(session: AsyncSession = Depends(get_db_session)) -> JobRunRepository:
+    return JobRunRepository(session)
+
+# Repozytoria dla endpointów tylko do odczytu (GET)
+def get_read_user_repo(session: AsyncSession = Depends(get_read_db_session)) -> UserRepository:
+    return UserRepository(session)
+
+def get_read_org_repo(session: AsyncSession = Depends(get_read_db_session)) -> OrganizationRepository:
+    return OrganizationRepository(session)
+
+def get_read_rink_repo(session: AsyncSession = Depends(get_read_db_session)) -> IceRinkRepository:
+    return IceRinkRepository(session)
+
+def get_read_measurement_repo(session: AsyncSession = Depends(get_read_db_session)) -> MeasurementRepository:
+    return MeasurementRepository(session)
+
+def get_read_ticket_repo(session: AsyncSession = Depends(get_read_db_session)) -> ServiceTicketRepository:
+    return ServiceTicketRepository(session)
+
+def get_read_weather_forecast_repo(session: AsyncSession = Depends(get_read_db_session)) -> WeatherForecastRepository:
+    return WeatherForecastRepository(session)
+
 # Zależności autoryzacji (reszta pliku)
 async def get_bearer_token(authorization: Optional[str] = Header(None)) -> str:
     if not authorization or not authorization.lower().startswith("bearer "):
@@ -56,6 +99,7 @@ async def get_bearer_token(authorization: Optional[str] = Header(None)) -> str:
     return authorization.split(" ", 1)[1].strip()
 
 async def get_current_user_payload(
+    request: Request,
     token: str = Depends(get_bearer_token),
     session_repo: UserSessionRepository = Depends(get_session_repo)
 ) -> dict:
@@ -70,11 +114,23 @@ async def get_current_user_payload(
     jti_str = payload.get("jti")
     if not jti_str:
         http_401("Token is missing JTI")
+    try:
+        jti = uuid.UUID(jti_str)
+    except ValueError:
+        http_401("Invalid token")
+
+    # Trafienie w cache nie pobiera połączenia z puli (sesja AsyncSession jest leniwa)
+    # Zweryfikowany użytkownik dla dziennika audytu (bez ponownego dekodowania tokena)
+    if session_cache.is_valid(jti):
+        request.state.user_id = payload.get("sub")
+        return payload
 
-    session = await session_repo.get_session(uuid.UUID(jti_str))
+    session = await session_repo.get_session(jti)
     if not session or not session.is_active:
         http_401("Token has been revoked or session is invalid")
 
+    session_cache.add(jti, payload["exp"])
+    request.state.user_id = payload.get("sub")
     return payload
 
 def require_role(*roles: str):
@@ -43,5 +43,8 @@ def http_422(detail: str = "Validation Error", code: str = "VALIDATION_ERROR", d
 def http_429(detail: str = "Too Many Requests", code: str = "RATE_LIMIT_EXCEEDED", details: Optional[Dict[str, Any]] = None):
     raise create_error_response(429, detail, code, details)
 
+def http_503(detail: str = "Service Unavailable", code: str = "SERVICE_UNAVAILABLE", details: Optional[Dict[str, Any]] = None):
+    raise create_error_response(503, detail, code, details)
+
 def http_500(detail: str = "Internal Server Error", code: str = "INTERNAL_ERROR", details: Optional[Dict[str, Any]] = None):
     raise create_error_response(500, detail, code, details)
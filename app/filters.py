@@ -0,0 +1,117 @@
+"""
+Wspólna składnia filtrowania, sortowania i wyboru pól dla endpointów listujących.
+
+    ?filter=status:in:new,assigned&filter=created_at:gte:2024-01-01
+    &sort=-priority,created_at
+    &fields=id,ticket_number,status
+
+Każde repozytorium deklaruje dozwolone pola i operatory w `list_options`.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Query
+
+from app.errors import http_400
+
+OPERATORS = ("eq", "in", "gte", "lte", "ilike")
+EQ_IN = ("eq", "in")
+
+@dataclass(frozen=True)
+class ListOptions:
+    """Allow-lista dla jednego modelu: pola filtrowane (z operatorami), sortowane i zwracane w `fields=`."""
+    model: Any
+    filters: Dict[str, Tuple[str, ...]]
+    sort: Tuple[str, ...]
+    fields: Tuple[str, ...]
+    default_sort: Tuple[str, ...] = ("-created_at",)
+
+@dataclass
+class ListQuery:
+    filters: List[Tuple[str, str, Any]] = field(default_factory=list)
+    sort: List[Tuple[str, bool]] = field(default_factory=list)
+    fields: Optional[List[str]] = None
+
+def _coerce(column, raw: str) -> Any:
+    python_type = column.type.python_type
+    if python_type is bool:
+        if raw.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(raw)
+        return raw.lower() in ("true", "1")
+    if python_type is datetime:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    if python_type is date:
+        return date.fromisoformat(raw)
+    return python_type(raw)
+
+def _parse_filter(options: ListOptions, expression: str) -> Tuple[str, str, Any]:
+    try:
+        name, op, raw = expression.split(":", 2)
+    except ValueError:
+        http_400(f"Invalid filter '{expression}', expected field:operator:value", code="INVALID_FILTER")
+    if op not in OPERATORS:
+        http_400(f"Unknown filter operator '{op}'", code="INVALID_FILTER")
+    if op not in options.filters.get(name, ()):
+        http_400(f"Filtering by '{name}' with '{op}' is not allowed", code="INVALID_FILTER",
+                 details={"allowed": {k: list(v) for k, v in options.filters.items()}})
+    if op == "ilike":
+        return name, op, raw
+
+    column = getattr(options.model, name)
+    try:
+        if op == "in":
+            value = [_coerce(column, item) for item in raw.split(",") if item]
+        else:
+            value = _coerce(column, raw)
+    except (ValueError, TypeError, ArithmeticError):
+        http_400(f"Invalid value for '{name}': '{raw}'", code="INVALID_FILTER")
+    return name, op, value
+
+def _parse_sort(options: ListOptions, sort: str) -> List[Tuple[str, bool]]:
+    result = []
+    for key in (k.strip() for k in sort.split(",")):
+        if not key:
+            continue
+        name = key.lstrip("+-")
+        if name not in options.sort:
+            http_400(f"Sorting by '{name}' is not allowed", code="INVALID_SORT",
+                     details={"allowed": list(options.sort)})
+        result.append((name, key.startswith("-")))
+    return result
+
+def list_query(options: ListOptions):
+    """Zależność FastAPI parsująca `filter`, `sort` i `fields` według allow-listy modelu."""
+    async def _inner(
+        filter: List[str] = Query([], description="field:operator:value, operators: " + ", ".join(OPERATORS)),
+        sort: Optional[str] = Query(None, description="Comma separated, '-' prefix for descending"),
+        fields: Optional[str] = Query(None, description="Comma separated list of fields to return"),
+    ) -> ListQuery:
+        query = ListQuery(
+            filters=[_parse_filter(options, f) for f in filter],
+            sort=_parse_sort(options, sort or ",".join(options.default_sort)),
+        )
+        if fields:
+            query.fields = [f.strip() for f in fields.split(",") if f.strip()]
+            unknown = [f for f in query.fields if f not in options.fields]
+            if unknown:
+                http_400(f"Unknown fields: {', '.join(unknown)}", code="INVALID_FIELDS",
+                         details={"allowed": list(options.fields)})
+        return query
+    return _inner
+
+def build_conditions(model, query: ListQuery) -> list:
+    conditions = []
+    for name, op, value in query.filters:
+        column = getattr(model, name)
+        if op == "eq":
+            conditions.append(column == value)
+        elif op == "in":
+            conditions.append(column.in_(value))
+        elif op == "gte":
+            conditions.append(column >= value)
+        elif op == "lte":
+            conditions.append(column <= value)
+        elif op == "ilike":
+            conditions.append(column.icontains(value, autoescape=True))
+    return conditions
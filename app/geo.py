@@ -0,0 +1,63 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(latitude: float, longitude: float, precision: int = 6) -> str:
+    """Koduje współrzędne do geohasha o zadanej liczbie znaków."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+def cell_key(latitude: float, longitude: float, mode: str = "geohash", precision: int = 6) -> str:
+    """
+    Zwraca identyfikator komórki geograficznej dla punktu.
+    - `geohash` - geohash o `precision` znakach (6 znaków to ok. 1.2 x 0.6 km),
+    - `round`   - współrzędne zaokrąglone do `precision` miejsc po przecinku,
+    - `off`     - brak grupowania, każdy punkt to osobna komórka.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    if mode == "geohash":
+        return geohash_encode(latitude, longitude, precision)
+    if mode == "round":
+        return f"{round(latitude, precision)}:{round(longitude, precision)}"
+    if mode == "off":
+        return f"{latitude}:{longitude}"
+    raise ValueError(f"Unknown geo cell mode: {mode}")
+
+def group_by_cell(
+    items: Iterable[T],
+    coords: Tuple[str, str] = ("latitude", "longitude"),
+    mode: str = "geohash",
+    precision: int = 6,
+) -> Dict[str, List[T]]:
+    """Grupuje obiekty z atrybutami współrzędnych według komórek geograficznych."""
+    lat_attr, lon_attr = coords
+    cells: Dict[str, List[T]] = defaultdict(list)
+    for item in items:
+        cells[cell_key(getattr(item, lat_attr), getattr(item, lon_attr), mode, precision)].append(item)
+    return dict(cells)
+
+def centroid(items: List[T], coords: Tuple[str, str] = ("latitude", "longitude")) -> Tuple[float, float]:
+    lat_attr, lon_attr = coords
+    lat = sum(float(getattr(i, lat_attr)) for i in items) / len(items)
+    lon = sum(float(getattr(i, lon_attr)) for i in items) / len(items)
+    return round(lat, 6), round(lon, 6)
@@ -1,6 +1,5 @@
-import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -9,19 +8,47 @@ from slowapi.errors import RateLimitExceeded
 
 # Importy z Twojego projektu
 from app.config import get_settings
+from app.db import read_replica
+from app.security import token_subject
 from app.routers import (auth, organizations, users, ice_rinks, system,
-                           measurements, service_tickets, weather, ssp, dashboard)
-from app.tasks import fetch_weather_forecasts_task
+                           measurements, service_tickets, weather, ssp, dashboard, search, metrics)
+from app.scheduler import scheduler
+from app.session_cache import revocation_listener
+from app.sla import sla_monitor
+from app.notifications import notification_dispatcher
+from app.audit import AuditMiddleware, audit_log
+from app.metrics import MetricsMiddleware, mark_process_dead
+from app.slow_queries import slow_query_log
+from app import tasks  # noqa: F401 - rejestruje zadania w harmonogramie
 
 def create_app() -> FastAPI:
     # --- Definicja cyklu życia aplikacji (Lifespan) ---
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        print("Application startup... starting background tasks.")
-        task = asyncio.create_task(fetch_weather_forecasts_task())
+        revocation_listener.start()
+        read_replica.start()
+        if settings.audit_enabled:
+            audit_log.start()
+        if settings.slow_query_enabled:
+            slow_query_log.start()
+        if settings.sla_monitor_enabled:
+            sla_monitor.start()
+        if settings.notify_dispatcher_enabled:
+            notification_dispatcher.start()
+        if settings.scheduler_enabled:
+            print("Application startup... starting background tasks.")
+            scheduler.start()
         yield
         print("Application shutdown... cleaning up.")
-        task.cancel()
+        await scheduler.stop()
+        await sla_monitor.stop()
+        await notification_dispatcher.stop()
+        # Po zadaniach w tle - kolejka audytu jest opróżniana na końcu
+        await audit_log.stop()
+        await slow_query_log.stop()
+        await revocation_listener.stop()
+        await read_replica.stop()
+        mark_process_dead()
 
     # --- Główna instancja aplikacji FastAPI ---
     settings = get_settings()
@@ -48,6 +75,22 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # --- Read-your-writes: po zapisie użytkownik przez chwilę czyta z primary ---
+    if read_replica.enabled:
+        @app.middleware("http")
+        async def track_user_writes(request: Request, call_next):
+            if request.method not in ("GET", "HEAD", "OPTIONS"):
+                read_replica.mark_write(token_subject(request.headers.get("authorization")))
+            return await call_next(request)
+
+    # --- Dziennik audytu: wpisy trafiają do kolejki, zapis do bazy odbywa się w tle ---
+    if settings.audit_enabled:
+        app.add_middleware(AuditMiddleware, audit=audit_log)
+
+    # --- Metryki: najbardziej zewnętrzne middleware, więc czas obejmuje pozostałe ---
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+
     # --- Rejestracja Routerów ---
     app.include_router(auth.router)
     app.include_router(organizations.router)
@@ -59,6 +102,9 @@ def create_app() -> FastAPI:
     app.include_router(weather.router)
     app.include_router(ssp.router)
     app.include_router(dashboard.router)
+    app.include_router(search.router)
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
 
     # --- DODANA SEKCJA - Konfiguracja Swaggera dla autoryzacji JWT ---
     def custom_openapi():
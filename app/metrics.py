@@ -0,0 +1,152 @@
+import os
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import query_stats
+
+# Kilka workerów uvicorn: każdy proces zapisuje wartości do plików w PROMETHEUS_MULTIPROC_DIR
+# (katalog czyszczony przy starcie usługi), a /metrics sumuje je ze wszystkich procesów
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+
+HTTP_REQUESTS = Counter("http_requests_total", "Obsłużone zapytania HTTP", ["method", "route", "status"])
+HTTP_DURATION = Histogram("http_request_duration_seconds", "Czas obsługi zapytania", ["method", "route"],
+                          buckets=LATENCY_BUCKETS)
+HTTP_QUERIES = Histogram("http_request_db_queries", "Liczba zapytań SQL na zapytanie HTTP", ["method", "route"],
+                         buckets=QUERY_BUCKETS)
+HTTP_DB_TIME = Histogram("http_request_db_seconds", "Czas zapytań SQL na zapytanie HTTP", ["method", "route"],
+                         buckets=LATENCY_BUCKETS)
+HTTP_N_PLUS_ONE = Counter("http_request_n_plus_one_total", "Zapytania HTTP z powtarzanym zapytaniem SQL (N+1)",
+                          ["method", "route"])
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "Zapytania w trakcie obsługi", multiprocess_mode="livesum")
+
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Pobrania połączenia z puli", ["pool"])
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Przekroczenia czasu oczekiwania na połączenie", ["pool"])
+DB_POOL_WAIT = Histogram("db_pool_wait_seconds", "Czas oczekiwania na połączenie z puli", ["pool"],
+                         buckets=POOL_WAIT_BUCKETS)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Połączenia wydane z puli", ["pool"],
+                            multiprocess_mode="livesum")
+
+JOB_RUNS = Counter("job_runs_total", "Uruchomienia zadań w tle", ["job", "status"])
+JOB_DURATION = Histogram("job_duration_seconds", "Czas wykonania zadania w tle", ["job", "status"],
+                         buckets=JOB_BUCKETS)
+
+# Wiersze przyjęte z systemów SSP - prędkość: rate(ssp_ingested_rows_total[1m])
+SSP_INGESTED_ROWS = Counter("ssp_ingested_rows_total", "Wiersze przyjęte z systemów SSP", ["kind"])
+
+# Metody spoza tej listy (dowolny token od klienta) mają wspólną etykietę "other"
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+# Dzieci metryk dla etykiet - `labels()` przy każdym zapytaniu byłoby zbędnym kosztem
+_route_children: Dict[Tuple[str, str], tuple] = {}
+_status_children: Dict[Tuple[str, str, int], Counter] = {}
+_pool_children: Dict[str, tuple] = {}
+
+def _route_metrics(method: str, route: str) -> tuple:
+    children = _route_children.get((method, route))
+    if children is None:
+        children = _route_children[(method, route)] = (HTTP_DURATION.labels(method, route),
+                                                       HTTP_QUERIES.labels(method, route),
+                                                       HTTP_DB_TIME.labels(method, route))
+    return children
+
+def _status_counter(method: str, route: str, status: int) -> Counter:
+    counter = _status_children.get((method, route, status))
+    if counter is None:
+        counter = _status_children[(method, route, status)] = HTTP_REQUESTS.labels(method, route, str(status))
+    return counter
+
+def _pool_metrics(pool: str) -> tuple:
+    children = _pool_children.get(pool)
+    if children is None:
+        children = _pool_children[pool] = (DB_POOL_CHECKOUTS.labels(pool), DB_POOL_WAIT.labels(pool),
+                                           DB_POOL_TIMEOUTS.labels(pool), DB_POOL_CHECKED_OUT.labels(pool))
+    return children
+
+def observe_pool_connect(pool: str, waited_s: float, timed_out: bool) -> None:
+    checkouts, wait, timeouts, _ = _pool_metrics(pool)
+    if timed_out:
+        timeouts.inc()
+    else:
+        checkouts.inc()
+        wait.observe(waited_s)
+
+def observe_job(job: str, status: str, duration_s: float) -> None:
+    JOB_RUNS.labels(job, status).inc()
+    JOB_DURATION.labels(job, status).observe(duration_s)
+
+def instrument_engine(engine: AsyncEngine, pool: str) -> None:
+    """Zliczanie zapytań SQL (na zapytanie HTTP) i wydanych połączeń puli."""
+    checked_out = _pool_metrics(pool)[3]
+    query_stats.instrument_engine(engine)
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, record, proxy):
+        checked_out.inc()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, record):
+        checked_out.dec()
+
+def render() -> Tuple[bytes, str]:
+    """Treść /metrics - przy wielu workerach suma wartości ze wszystkich procesów."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_process_dead() -> None:
+    # Gauge'e 'livesum' zakończonego workera przestają się liczyć
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: czas, status oraz liczba i czas zapytań SQL każdego zapytania HTTP
+    (etykieta = szablon trasy). Powtarzane zapytania (N+1) są logowane z trasą.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        with query_stats.track_queries(scope) as queries:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                HTTP_IN_PROGRESS.dec()
+                method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+                route = scope.get("route")
+                # Ścieżki spoza tras API (404, dokumentacja) mają wspólną etykietę - liczba serii jest ograniczona
+                path = route.path if route is not None else "other"
+                duration, query_count, db_time = _route_metrics(method, path)
+                duration.observe(time.perf_counter() - started)
+                query_count.observe(queries.count)
+                db_time.observe(queries.db_time_s)
+                _status_counter(method, path, status_code).inc()
+                if query_stats.report(queries, f"{method} {path}"):
+                    HTTP_N_PLUS_ONE.labels(method, path).inc()
@@ -1,8 +1,8 @@
 import uuid
 from sqlalchemy import (Column, String, ForeignKey, DateTime, func, JSON,
-                          Numeric, Boolean, Text, Integer)
+                          Numeric, Boolean, Text, Integer, FetchedValue)
 from sqlalchemy.orm import relationship, declarative_base
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY, REAL, INET
 
 Base = declarative_base()
 
@@ -116,8 +116,29 @@ class WeatherForecast(Base):
     ice_rink = relationship("IceRink", back_populates="weather_forecasts")
     provider = relationship("WeatherProvider", back_populates="forecasts")
 
+class WeatherForecastRun(Base):
+    """Jedno wydanie prognozy (run) dla komórki geograficznej - zmienne przechowywane jako tablice."""
+    __tablename__ = "weather_forecast_runs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    weather_provider_id = Column(UUID(as_uuid=True), ForeignKey('weather_providers.id'), nullable=False)
+    geo_cell = Column(String(64), nullable=False)
+    issued_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    latitude = Column(Numeric(10, 8), nullable=False)
+    longitude = Column(Numeric(11, 8), nullable=False)
+    ice_rink_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False)
+    forecast_times = Column(ARRAY(DateTime(timezone=True)), nullable=False)
+    temperature_min = Column(ARRAY(REAL), nullable=False)
+    temperature_max = Column(ARRAY(REAL), nullable=False)
+    humidity = Column(ARRAY(REAL))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    provider = relationship("WeatherProvider")
+
 class ServiceTicket(Base):
     __tablename__ = "service_tickets"
+    # Wartości z serwera (created_at, updated_at) wracają w RETURNING przy flush - bez refresh()
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     ticket_number = Column(String(50), unique=True, index=True)
@@ -132,6 +153,12 @@ class ServiceTicket(Base):
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
     source = Column(String(20), nullable=False, default='manual')
+
+    # Ustawiane przez wyzwalacz set_ticket_sla_fields (termin wg priorytetu, znaczniki statusu)
+    sla_target = Column(DateTime(timezone=True), server_default=FetchedValue(), server_onupdate=FetchedValue())
+    resolved_at = Column(DateTime(timezone=True), server_default=FetchedValue(), server_onupdate=FetchedValue())
+    closed_at = Column(DateTime(timezone=True), server_default=FetchedValue(), server_onupdate=FetchedValue())
+    sla_breached_at = Column(DateTime(timezone=True), server_default=FetchedValue(), server_onupdate=FetchedValue())
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -144,6 +171,7 @@ class ServiceTicket(Base):
 
 class TicketComment(Base):
     __tablename__ = "ticket_comments"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     ticket_id = Column(UUID(as_uuid=True), ForeignKey('service_tickets.id'), nullable=False)
@@ -157,6 +185,7 @@ class TicketComment(Base):
 
 class SystemConfig(Base):
     __tablename__ = "system_config"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     key = Column(String(255), nullable=False, unique=True, index=True)
@@ -174,9 +203,59 @@ class UserSession(Base):
     __tablename__ = "user_sessions"
 
     id = Column(UUID(as_uuid=True), primary_key=True) # To będzie JTI z tokena
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     is_active = Column(Boolean, nullable=False, default=True)
 
     user = relationship("User")
+
+class Notification(Base):
+    __tablename__ = "notifications"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'))
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'))
+    type = Column(String(50), nullable=False)
+    title = Column(String(255), nullable=False)
+    message = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default='pending')
+    sent_at = Column(DateTime(timezone=True))
+    read_at = Column(DateTime(timezone=True))
+    retry_count = Column(Integer, nullable=False, default=0)
+    error_message = Column(Text)
+    # `metadata` jest zarezerwowane w modelach deklaratywnych
+    meta = Column("metadata", JSONB, nullable=False, default={})
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AuditLog(Base):
+    __tablename__ = "audit_logs"
+    __table_args__ = {"schema": "audit"}
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=FetchedValue())
+    timestamp = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'))
+    action = Column(String(100), nullable=False)
+    module = Column(String(100), nullable=False)
+    resource_type = Column(String(100))
+    resource_id = Column(UUID(as_uuid=True))
+    ip_address = Column(INET)
+    user_agent = Column(Text)
+    details = Column(JSONB, nullable=False, default={})
+    result = Column(String(20), nullable=False, default='success')
+    error_message = Column(Text)
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_name = Column(String(100), nullable=False)
+    trigger = Column(String(20), nullable=False, default='schedule')
+    status = Column(String(20), nullable=False, default='running')
+    started_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+    duration_ms = Column(Integer)
+    host = Column(String(255))
+    details = Column(JSONB, nullable=False, default={})
+    error_message = Column(Text)
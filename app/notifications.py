@@ -0,0 +1,322 @@
+import asyncio
+import email.policy
+import logging
+import re
+import socket
+import time
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import get_settings
+from app.db import SessionLocal
+from app.rate_limiter import backoff_delay
+from app.repositories.base import unit_of_work
+from app.repositories.notification import NotificationRepository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Kody HTTP, przy których próba zostanie powtórzona (jak przy pobieraniu prognoz)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Zapas dzierżawy na zapis wyników - wysyłka partii kończy się najpóźniej `lease_s - LEASE_MARGIN_S` po pobraniu
+LEASE_MARGIN_S = 10.0
+
+class DeliveryError(Exception):
+    """Nieudane doręczenie; `retryable=False` kończy powiadomienie statusem 'failed'."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+def _payload(notification: dict) -> dict:
+    return {
+        "id": str(notification["id"]),
+        "type": notification["type"],
+        "title": notification["title"],
+        "message": notification["message"],
+        "organization_id": str(notification["organization_id"]) if notification["organization_id"] else None,
+        "metadata": notification["metadata"],
+    }
+
+async def _post(client: httpx.AsyncClient, url: str, payload: dict) -> None:
+    try:
+        response = await client.post(url, json=payload)
+    except httpx.TransportError as e:
+        raise DeliveryError(f"{type(e).__name__}: {e}")
+    if response.status_code >= 400:
+        raise DeliveryError(f"HTTP {response.status_code}", retryable=response.status_code in RETRYABLE_STATUS_CODES)
+
+class HttpSender:
+    """Webhooki (adres `metadata.url`) i SMS przez bramkę HTTP - wspólny klient z pulą połączeń."""
+
+    def __init__(self, client: httpx.AsyncClient, sms_gateway_url: str = ""):
+        self.client = client
+        self.sms_gateway_url = sms_gateway_url
+
+    async def send(self, notification: dict) -> None:
+        metadata = notification["metadata"] or {}
+        if notification["type"] == "webhook":
+            if not metadata.get("url"):
+                raise DeliveryError("metadata.url is missing", retryable=False)
+            await _post(self.client, metadata["url"], _payload(notification))
+        else:
+            if not self.sms_gateway_url:
+                raise DeliveryError("SMS gateway is not configured", retryable=False)
+            if not metadata.get("phone"):
+                raise DeliveryError("metadata.phone is missing", retryable=False)
+            await _post(self.client, self.sms_gateway_url, {"to": metadata["phone"], "text": notification["message"]})
+
+class SmtpReplyError(Exception):
+    def __init__(self, code: int, text: str):
+        super().__init__(f"SMTP {code} {text}".strip())
+        self.code = code
+
+class SmtpSender:
+    """
+    Minimalny asynchroniczny klient SMTP (bez TLS i uwierzytelniania - lokalny relay lub
+    atrapa serwera w testach). Partia jest dzielona na `connections` części, a każda część
+    idzie jednym połączeniem - bez nawiązywania sesji SMTP dla każdej wiadomości.
+    """
+
+    def __init__(self, host: str, port: int, sender: str, connections: int = 2, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.connections = max(1, connections)
+        self.timeout = timeout
+        self.local_hostname = socket.getfqdn()
+
+    async def send_batch(self, notifications: List[dict], results: Optional[Dict] = None) -> Dict:
+        """
+        Zwraca {id: None | DeliveryError} dla każdej wiadomości. `results` jest uzupełniany
+        na bieżąco, więc po przerwaniu wysyłki zawiera wyniki wiadomości już obsłużonych.
+        """
+        results = {} if results is None else results
+        if not self.host:
+            error = DeliveryError("SMTP host is not configured", retryable=False)
+            results.update({n["id"]: error for n in notifications})
+            return results
+        chunks = [notifications[i::self.connections] for i in range(self.connections)]
+        await asyncio.gather(*(self._send_chunk(c, results) for c in chunks if c))
+        return results
+
+    def _message(self, notification: dict) -> Tuple[Optional[str], bytes]:
+        to = (notification["metadata"] or {}).get("email") or notification.get("user_email")
+        message = EmailMessage(policy=email.policy.SMTP)
+        message["From"] = self.sender
+        message["To"] = to or ""
+        message["Subject"] = notification["title"]
+        message.set_content(notification["message"])
+        # Kropka na początku linii jest podwajana (RFC 5321, 4.5.2)
+        return to, re.sub(rb"(?m)^\.", b"..", message.as_bytes())
+
+    async def _reply(self, reader: asyncio.StreamReader, *expected: int) -> None:
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+            if len(line) < 4:
+                raise ConnectionError("SMTP connection closed")
+            if line[3:4] != b"-":
+                break
+        code = int(line[:3])
+        if code not in expected:
+            raise SmtpReplyError(code, line[4:].decode(errors="replace").strip())
+
+    async def _command(self, reader, writer, command: str, *expected: int) -> None:
+        writer.write(command.encode() + b"\r\n")
+        await self._reply(reader, *expected)
+
+    async def _send_chunk(self, notifications: List[dict], results: Dict) -> None:
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+            await self._reply(reader, 220)
+            await self._command(reader, writer, f"EHLO {self.local_hostname}", 250)
+            for notification in notifications:
+                to, data = self._message(notification)
+                if not to:
+                    results[notification["id"]] = DeliveryError("no e-mail address", retryable=False)
+                    continue
+                try:
+                    await self._command(reader, writer, f"MAIL FROM:<{self.sender}>", 250)
+                    await self._command(reader, writer, f"RCPT TO:<{to}>", 250, 251)
+                    await self._command(reader, writer, "DATA", 354)
+                    writer.write(data + b".\r\n")
+                    await self._reply(reader, 250)
+                    results[notification["id"]] = None
+                except SmtpReplyError as e:
+                    # 5xx - błąd trwały, 4xx - chwilowy
+                    results[notification["id"]] = DeliveryError(str(e), retryable=e.code < 500)
+                    await self._command(reader, writer, "RSET", 250)
+            writer.write(b"QUIT\r\n")
+        except (OSError, asyncio.TimeoutError, SmtpReplyError, ValueError) as e:
+            # Zerwane połączenie: niewysłane wiadomości części czekają na kolejną próbę
+            error = DeliveryError(f"{type(e).__name__}: {e}")
+            for notification in notifications:
+                results.setdefault(notification["id"], error)
+        finally:
+            if writer is not None:
+                writer.close()
+
+class NotificationDispatcher:
+    """
+    Wysyłka powiadomień z tabeli `notifications` (outbox) w partiach.
+
+    Każdy worker pobiera partię przez `FOR UPDATE SKIP LOCKED` z dzierżawą, więc wiele
+    procesów nie wyśle tego samego powiadomienia. Partia jest wysyłana współbieżnie
+    (webhook/SMS przez wspólnego klienta HTTP, e-maile przez SMTP), a wyniki są
+    zapisywane dwoma zapytaniami. Nieudane próby wracają do kolejki z wykładniczym
+    backoffem liczonym z `retry_count`; po `max_retries` powiadomienie ma status 'failed'.
+    Wysyłka partii jest przerywana przed końcem dzierżawy (niewysłane wracają do kolejki),
+    a wynik zapisuje się tylko, gdy dzierżawa nie została przejęta przez inny worker.
+    """
+
+    def __init__(self, batch_size: int, concurrency: int, poll_s: float, lease_s: float, max_retries: int,
+                 backoff_base_s: float, backoff_cap_s: float):
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.poll_s = poll_s
+        self.lease_s = lease_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_cap_s = backoff_cap_s
+        self.client: Optional[httpx.AsyncClient] = None
+        self.http: Optional[HttpSender] = None
+        self.smtp = SmtpSender(settings.notify_smtp_host, settings.notify_smtp_port, settings.notify_smtp_from,
+                               settings.notify_smtp_connections, settings.notify_http_timeout_s)
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def open(self) -> None:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self.client = httpx.AsyncClient(timeout=settings.notify_http_timeout_s, limits=limits)
+        self.http = HttpSender(self.client, settings.notify_sms_gateway_url)
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def start(self) -> None:
+        self.open()
+        self._task = asyncio.create_task(self._loop(), name="notification-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.close()
+
+    def wake(self) -> None:
+        """Przyspiesza kolejną partię (np. po dodaniu powiadomień w tym procesie)."""
+        self._wakeup.set()
+
+    async def _loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification dispatch failed")
+                claimed = 0
+            # Pełna partia - w kolejce prawdopodobnie czekają kolejne
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch_once(self) -> int:
+        """Pobiera, wysyła i oznacza jedną partię. Zwraca liczbę pobranych powiadomień."""
+        async with SessionLocal() as session:
+            notifications = await NotificationRepository(session).claim_batch(self.batch_size, self.lease_s)
+        if not notifications:
+            return 0
+        started = time.perf_counter()
+        results: Dict = {}
+        try:
+            # Po końcu dzierżawy partię może pobrać inny worker - wysyłka musi skończyć się wcześniej
+            async with asyncio.timeout(self.delivery_timeout_s):
+                await self._deliver(notifications, results)
+        except TimeoutError:
+            logger.warning(f"Notification delivery exceeded {self.delivery_timeout_s:.0f}s, "
+                           f"{len(notifications) - len(results)} notifications will be retried.")
+        timed_out = DeliveryError("delivery did not finish within the lease")
+
+        sent, failures = [], []
+        for notification in notifications:
+            error = results.get(notification["id"], timed_out)
+            if error is None:
+                sent.append(notification["id"])
+                continue
+            final = not error.retryable or notification["retry_count"] + 1 >= self.max_retries
+            delay = 0.0 if final else backoff_delay(notification["retry_count"], self.backoff_base_s, self.backoff_cap_s)
+            failures.append((notification["id"], str(error), final, delay))
+            if final:
+                self.failed += 1
+            else:
+                self.retried += 1
+        self.sent += len(sent)
+
+        async with SessionLocal() as session:
+            repo = NotificationRepository(session)
+            # Cała partia jest pobierana jednym UPDATE, więc ma wspólny koniec dzierżawy
+            leased_until = notifications[0]["leased_until"]
+            async with unit_of_work(session):
+                await repo.mark_sent(sent, leased_until)
+                await repo.mark_failed(failures, leased_until)
+        logger.info(f"Dispatched {len(notifications)} notifications in {time.perf_counter() - started:.2f}s: "
+                    f"{len(sent)} sent, {len(failures)} failed.")
+        return len(notifications)
+
+    @property
+    def delivery_timeout_s(self) -> float:
+        return max(self.lease_s - LEASE_MARGIN_S, self.lease_s / 2)
+
+    async def _deliver(self, notifications: List[dict], results: Dict) -> None:
+        """Wysyła partię, wpisując wynik każdego powiadomienia do `results` zaraz po jego obsłużeniu."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send_http(notification: dict) -> None:
+            async with semaphore:
+                try:
+                    await self.http.send(notification)
+                    results[notification["id"]] = None
+                except DeliveryError as e:
+                    results[notification["id"]] = e
+                except Exception as e:
+                    results[notification["id"]] = DeliveryError(repr(e))
+
+        emails = [n for n in notifications if n["type"] == "email"]
+        tasks = [send_http(n) for n in notifications if n["type"] in ("webhook", "sms")]
+        # Powiadomienia w aplikacji nie wymagają doręczenia - są dostępne od razu
+        results.update({n["id"]: None for n in notifications if n["type"] == "in_app"})
+        if emails:
+            tasks.append(self.smtp.send_batch(emails, results))
+        await asyncio.gather(*tasks)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+notification_dispatcher = NotificationDispatcher(
+    batch_size=settings.notify_batch_size,
+    concurrency=settings.notify_concurrency,
+    poll_s=settings.notify_poll_s,
+    lease_s=settings.notify_lease_s,
+    max_retries=settings.notify_max_retries,
+    backoff_base_s=settings.notify_backoff_base_s,
+    backoff_cap_s=settings.notify_backoff_cap_s,
+)
@@ -0,0 +1,117 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w$])-?\d+(?:\.\d+)?\b|\$\d+")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """Kształt zapytania: literały i parametry jako `?`, listy `IN (...)` dowolnej długości jako `(?)`."""
+    shape = _LITERALS.sub("?", statement)
+    shape = _LISTS.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+@dataclass
+class QueryStats:
+    """Zapytania SQL wykonane w bloku `track_queries` (np. w jednym zapytaniu HTTP)."""
+
+    parent: Optional["QueryStats"] = None
+    # Zakres ASGI zapytania HTTP, które wykonuje zapytania SQL (trasa dla logów)
+    scope: Optional[dict] = None
+    count: int = 0
+    db_time_s: float = 0.0
+    # Klucz to tekst zapytania z silnika - ten sam obiekt str z cache kompilacji, więc haszowany raz
+    statements: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Kształty wykonane co najmniej `threshold` razy - typowy objaw N+1 (zapytanie w pętli)."""
+        if self.count < threshold:
+            return []
+        shapes: Counter = Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def route_label(scope: dict) -> str:
+    """"METODA szablon-trasy" - przed dopasowaniem trasy (lub bez niej) surowa ścieżka."""
+    route = scope.get("route")
+    return f"{scope.get('method', '')} {route.path if route is not None else scope.get('path', '')}".strip()
+
+@contextmanager
+def track_queries(scope: Optional[dict] = None) -> Iterator[QueryStats]:
+    """Zlicza zapytania silników aplikacji w bloku; zagnieżdżone bloki liczą się też w zewnętrznych."""
+    parent = _current.get()
+    if scope is None and parent is not None:
+        scope = parent.scope
+    stats = QueryStats(parent=parent, scope=scope)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+def current_route() -> Optional[str]:
+    stats = _current.get()
+    return route_label(stats.scope) if stats is not None and stats.scope is not None else None
+
+def query_duration(context) -> float:
+    """Czas wykonania zapytania w `after_cursor_execute` (0, gdy silnik nie jest instrumentowany)."""
+    started = getattr(context, "_query_started", None)
+    return time.perf_counter() - started if started is not None else 0.0
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # Także poza zapytaniami HTTP - czas wykorzystuje dziennik wolnych zapytań
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is None:
+            return
+        elapsed = query_duration(context)
+        while stats is not None:
+            stats.count += 1
+            stats.db_time_s += elapsed
+            stats.statements[statement] += 1
+            stats = stats.parent
+
+# Ostatnie ostrzeżenie dla (trasa, kształt) - ten sam problem jest logowany najwyżej raz na minutę
+_last_reported: Dict[Tuple[str, str], float] = {}
+REPORT_INTERVAL_S = 60.0
+
+def report(stats: QueryStats, route: str) -> int:
+    """Loguje wzorce N+1 i zapytania HTTP przekraczające limit zapytań. Zwraca liczbę wzorców N+1."""
+    repeated = stats.repeated(settings.query_repeat_threshold)
+    now = time.monotonic()
+    for shape, count in repeated:
+        key = (route, shape)
+        if now - _last_reported.get(key, 0.0) >= REPORT_INTERVAL_S:
+            _last_reported[key] = now
+            logger.warning(f"N+1 queries on {route}: {count}x {shape[:300]}")
+    if settings.query_count_warn and stats.count > settings.query_count_warn:
+        key = (route, "")
+        if now - _last_reported.get(key, 0.0) >= REPORT_INTERVAL_S:
+            _last_reported[key] = now
+            logger.warning(f"{route} ran {stats.count} SQL queries ({stats.db_time_s * 1000:.1f} ms in database).")
+    return len(repeated)
@@ -0,0 +1,42 @@
+import asyncio
+import random
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Asynchroniczny limiter typu token bucket dla wywołań zewnętrznych API.
+
+    Kubełek uzupełnia się z prędkością `rate` tokenów na `period` sekund,
+    a `capacity` określa, ile wywołań może pójść od razu jedną serią.
+    """
+
+    def __init__(self, rate: float, period: float = 60.0, capacity: Optional[float] = None):
+        if rate <= 0 or period <= 0:
+            raise ValueError("rate and period must be positive")
+        self.fill_rate = rate / period
+        self.capacity = float(capacity) if capacity else 1.0
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.fill_rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # Blokada zapewnia kolejność FIFO - oczekujący nie wyprzedzają się nawzajem
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.fill_rate)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Wykładniczy backoff z pełnym jitterem (attempt liczone od 0)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,37 @@
+import json
+import uuid
+from typing import Sequence, Set
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.repositories.base import BaseRepository
+from app.models import AuditLog, User
+
+# Kolumny ładowane przez COPY (id nadaje serwer)
+AUDIT_COPY_COLUMNS = ["timestamp", "user_id", "action", "module", "resource_type", "resource_id",
+                      "ip_address", "user_agent", "details", "result", "error_message"]
+
+class AuditLogRepository(BaseRepository[AuditLog]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(AuditLog, session)
+
+    async def copy_entries(self, entries: Sequence[dict]) -> int:
+        """Zapisuje wpisy jednym `COPY` (binarnie, bez parametrów wiązanych na wiersz)."""
+        if not entries:
+            return 0
+        conn = await self.session.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            AuditLog.__tablename__,
+            schema_name=AuditLog.__table_args__["schema"],
+            columns=AUDIT_COPY_COLUMNS,
+            records=[
+                tuple(json.dumps(entry["details"]) if c == "details" else entry.get(c) for c in AUDIT_COPY_COLUMNS)
+                for entry in entries
+            ],
+        )
+        await self._commit()
+        return len(entries)
+
+    async def existing_user_ids(self, ids: Sequence[uuid.UUID]) -> Set[uuid.UUID]:
+        result = await self.session.execute(select(User.id).where(User.id.in_(set(ids))))
+        return set(result.scalars().all())
@@ -1,30 +1,184 @@
-from typing import Type, TypeVar, Generic, Optional, List, Tuple
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Type, TypeVar, Generic, Optional, List, Tuple, Sequence, Literal
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update as sqlalchemy_update
+from sqlalchemy import (select, func, text, table as sql_table, column as sql_column, update as sqlalchemy_update,
+                        or_, exists, cast, literal, union_all, bindparam, Select, JSON)
+from sqlalchemy.dialects.postgresql import insert, JSONB
 from sqlalchemy.orm import selectinload
 from app.models import Base
+from app.filters import ListQuery, build_conditions
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+# Klucz w `session.info` z głębokością zagnieżdżenia unit_of_work
+UNIT_OF_WORK_KEY = "unit_of_work_depth"
+
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    Jedna transakcja dla wielu operacji (także różnych repozytoriów na tej samej sesji).
+
+    Repozytoria wewnątrz bloku nie zatwierdzają zmian (`_commit` robi tylko flush);
+    commit wykonuje najbardziej zewnętrzny blok, a wyjątek wycofuje całość.
+
+        async with unit_of_work(session):
+            await run_repo.save_runs(runs)
+            await config_repo.set_config_value("weather_api_status", "ok")
+    """
+    depth = session.info.get(UNIT_OF_WORK_KEY, 0)
+    session.info[UNIT_OF_WORK_KEY] = depth + 1
+    try:
+        yield session
+        if depth == 0:
+            await session.commit()
+    except BaseException:
+        if depth == 0:
+            await session.rollback()
+        raise
+    finally:
+        session.info[UNIT_OF_WORK_KEY] = depth
+
+def in_unit_of_work(session: AsyncSession) -> bool:
+    return session.info.get(UNIT_OF_WORK_KEY, 0) > 0
+
+# Twardy limit parametrów wiązanych w jednym zapytaniu PostgreSQL
+PG_MAX_BIND_PARAMS = 32767
+# Od tej liczby wierszy tryb "auto" używa COPY do tabeli tymczasowej zamiast INSERT ... VALUES
+COPY_THRESHOLD_ROWS = 5000
+
+def _dedupe_by_key(rows: Sequence[dict], index_elements: Sequence[str]) -> List[dict]:
+    # ON CONFLICT DO UPDATE nie może zmienić tego samego wiersza dwa razy w jednym zapytaniu,
+    # więc zostawiamy ostatnie wystąpienie każdego klucza
+    unique = {tuple(row[k] for k in index_elements): row for row in rows}
+    return list(unique.values())
+
+def _on_conflict(stmt, index_elements: Sequence[str], update_columns: Sequence[str]):
+    if not update_columns:
+        return stmt.on_conflict_do_nothing(index_elements=index_elements)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={c: stmt.excluded[c] for c in update_columns},
+    )
+
+async def _upsert_values(session: AsyncSession, target, rows: List[dict], columns: List[str],
+                         index_elements: Sequence[str], update_columns: Sequence[str],
+                         max_params: int) -> None:
+    # Kolumny z domyślną wartością po stronie Pythona (np. id = uuid4) też są parametrami
+    implicit = [c for c in target.columns if c.default is not None and c.name not in columns]
+    chunk_size = max(1, max_params // (len(columns) + len(implicit)))
+    for start in range(0, len(rows), chunk_size):
+        stmt = insert(target).values(rows[start:start + chunk_size])
+        await session.execute(_on_conflict(stmt, index_elements, update_columns))
+
+async def _upsert_copy(session: AsyncSession, target, rows: List[dict], columns: List[str],
+                       index_elements: Sequence[str], update_columns: Sequence[str]) -> None:
+    conn = await session.connection()
+    preparer = conn.dialect.identifier_preparer
+    staging = f"_staging_{target.name}_{uuid.uuid4().hex[:8]}"
+    column_list = ", ".join(preparer.quote(c) for c in columns)
+
+    # Tabela tymczasowa ma tylko ładowane kolumny (typy jak w tabeli docelowej, bez ograniczeń)
+    await session.execute(text(
+        f"CREATE TEMP TABLE {preparer.quote(staging)} ON COMMIT DROP AS "
+        f"SELECT {column_list} FROM {preparer.format_table(target)} WITH NO DATA"
+    ))
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        staging,
+        records=[tuple(row[c] for c in columns) for row in rows],
+        columns=columns,
+    )
+
+    stage = sql_table(staging, *[sql_column(c) for c in columns])
+    # include_defaults=False: brakujące kolumny (np. id) dostają wartości domyślne serwera per wiersz
+    stmt = insert(target).from_select(columns, select(*[stage.c[c] for c in columns]), include_defaults=False)
+    await session.execute(_on_conflict(stmt, index_elements, update_columns))
+    await session.execute(text(f"DROP TABLE {preparer.quote(staging)}"))
+
+async def bulk_upsert(
+    session: AsyncSession,
+    target,
+    rows: Sequence[dict],
+    index_elements: Sequence[str],
+    update_columns: Sequence[str],
+    method: Literal["auto", "values", "copy"] = "auto",
+    max_params: int = PG_MAX_BIND_PARAMS,
+) -> int:
+    """
+    Wstawia lub aktualizuje wiersze (`INSERT ... ON CONFLICT`) bez limitu ich liczby.
+
+    - `values` - wiele zapytań `INSERT ... VALUES`, każde mieszczące się w `max_params`,
+    - `copy`   - `COPY` do tabeli tymczasowej i jeden `INSERT ... SELECT ... ON CONFLICT`
+                 (wymaga sterownika asyncpg),
+    - `auto`   - `copy` dla dużych partii, `values` dla małych.
+
+    Nie zatwierdza transakcji. Zwraca liczbę przetworzonych (unikalnych) wierszy.
+    """
+    if not rows:
+        return 0
+    target = getattr(target, "__table__", target)
+    columns = list(rows[0].keys())
+    rows = _dedupe_by_key(rows, index_elements)
+
+    if method == "auto":
+        driver = (await session.connection()).dialect.driver
+        method = "copy" if driver == "asyncpg" and len(rows) >= COPY_THRESHOLD_ROWS else "values"
+
+    if method == "copy":
+        await _upsert_copy(session, target, rows, columns, index_elements, update_columns)
+    else:
+        await _upsert_values(session, target, rows, columns, index_elements, update_columns, max_params)
+    return len(rows)
+
+def changed_values(model, values: dict):
+    """
+    Warunek WHERE: co najmniej jedna kolumna ma inną wartość niż `values`.
+    Dzięki niemu UPDATE bez zmian nie zapisuje wiersza (ani nie uruchamia triggerów).
+    """
+    conditions = []
+    for key, value in values.items():
+        column = getattr(model, key)
+        if isinstance(column.type, JSON) and not isinstance(column.type, JSONB):
+            # Typ json nie ma operatora równości - porównujemy jako jsonb
+            conditions.append(cast(column, JSONB).is_distinct_from(cast(literal(value, JSON), JSONB)))
+        else:
+            conditions.append(column.is_distinct_from(value))
+    return or_(*conditions)
+
+@lru_cache(maxsize=None)
+def _select_by_id(model: Type[Base]) -> Select:
+    # Jedno zapytanie na model, budowane raz - bez składania i kompilacji przy każdym get_by_id
+    return select(model).where(model.id == bindparam("obj_id"))
+
 class BaseRepository(Generic[ModelType]):
     def __init__(self, model: Type[ModelType], session: AsyncSession):
         self.model = model
         self.session = session
 
+    async def _commit(self) -> None:
+        # W ramach unit_of_work zmiany zatwierdza właściciel transakcji
+        if in_unit_of_work(self.session):
+            await self.session.flush()
+        else:
+            await self.session.commit()
+
     async def get_by_id(self, obj_id: uuid.UUID, load_relations: Optional[List[str]] = None) -> Optional[ModelType]:
-        query = select(self.model).filter_by(id=obj_id)
         if load_relations:
+            query = select(self.model).filter_by(id=obj_id)
             for relation in load_relations:
                 query = query.options(selectinload(getattr(self.model, relation)))
-        result = await self.session.execute(query)
+            result = await self.session.execute(query)
+        else:
+            result = await self.session.execute(_select_by_id(self.model), {"obj_id": obj_id})
         return result.scalar_one_or_none()
 
     async def create(self, data: dict) -> ModelType:
-        db_obj = self.model(**data)
-        self.session.add(db_obj)
-        await self.session.commit()
-        await self.session.refresh(db_obj)
+        # INSERT ... RETURNING zwraca też wartości z serwera (domyślne, triggery) - bez refresh()
+        query = insert(self.model).values(**data).returning(self.model)
+        db_obj = (await self.session.execute(query)).scalar_one()
+        await self._commit()
         return db_obj
 
     async def update(self, obj_id: uuid.UUID, data: dict) -> Optional[ModelType]:
@@ -33,21 +187,61 @@ class BaseRepository(Generic[ModelType]):
         if not update_data:
             return await self.get_by_id(obj_id)
 
-        query = sqlalchemy_update(self.model).where(self.model.id == obj_id).values(**update_data)
-        await self.session.execute(query)
-        await self.session.commit()
-        return await self.get_by_id(obj_id)
-        
-    async def get_paginated_list(self, skip: int = 0, limit: int = 20, filters: Optional[dict] = None) -> Tuple[List[ModelType], int]:
-        query = select(self.model)
-        if filters:
-            # Proste filtrowanie, można rozbudować o operatory ILIKE, >, < etc.
-            query = query.filter_by(**filters)
+        # Jedno zapytanie: UPDATE ... RETURNING, a gdy nic się nie zmieniło - bieżący wiersz bez zapisu
+        table = self.model.__table__
+        updated = (
+            sqlalchemy_update(table)
+            .where(table.c.id == obj_id, changed_values(self.model, update_data))
+            .values(**update_data)
+            .returning(*table.c)
+            .cte("updated")
+        )
+        unchanged = select(*table.c).where(table.c.id == obj_id, ~exists(select(updated.c.id)))
+        query = (
+            select(self.model)
+            .from_statement(union_all(select(*updated.c), unchanged))
+            .execution_options(populate_existing=True)
+        )
+        db_obj = (await self.session.execute(query)).scalar_one_or_none()
+        await self._commit()
+        return db_obj
         
-        count_query = select(func.count()).select_from(query.subquery())
+    def _filter_conditions(self, filters: Optional[dict]) -> list:
+        conditions = []
+        for name, value in (filters or {}).items():
+            column = getattr(self.model, name)
+            conditions.append(column.in_(value) if isinstance(value, (list, tuple, set)) else column == value)
+        return conditions
+
+    async def get_paginated_list(self, skip: int = 0, limit: int = 20, filters: Optional[dict] = None,
+                                 list_query: Optional[ListQuery] = None) -> Tuple[List, int]:
+        """
+        Zwraca stronę wyników i liczbę wszystkich pasujących wierszy.
+        `filters` to proste warunki równości (np. zawężenie do organizacji; lista wartości = IN),
+        `list_query` - sparsowane `filter`/`sort`/`fields` z żądania. Przy `fields` zwracane są
+        słowniki z wybranymi kolumnami zamiast obiektów ORM.
+        """
+        conditions = self._filter_conditions(filters)
+        if list_query:
+            conditions += build_conditions(self.model, list_query)
+
+        count_query = select(func.count()).select_from(self.model).where(*conditions)
         total = (await self.session.execute(count_query)).scalar_one()
 
-        items_query = query.order_by(self.model.created_at.desc()).offset(skip).limit(limit)
-        items = (await self.session.execute(items_query)).scalars().all()
-        
-        return items, total
+        if list_query and list_query.fields:
+            query = select(*[getattr(self.model, f) for f in list_query.fields])
+        else:
+            query = select(self.model)
+
+        if list_query and list_query.sort:
+            order_by = [getattr(self.model, name).desc() if desc else getattr(self.model, name).asc()
+                        for name, desc in list_query.sort]
+        else:
+            order_by = [self.model.created_at.desc()]
+        # id jako ostatni klucz - stabilna kolejność między stronami
+        query = query.where(*conditions).order_by(*order_by, self.model.id).offset(skip).limit(limit)
+
+        result = await self.session.execute(query)
+        if list_query and list_query.fields:
+            return [dict(row._mapping) for row in result], total
+        return result.scalars().all(), total
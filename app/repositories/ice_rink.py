@@ -1,35 +1,65 @@
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from app.repositories.base import BaseRepository
+from sqlalchemy import select, update
+from sqlalchemy.orm import noload, selectinload
+from app.repositories.base import BaseRepository, changed_values
+from app.filters import ListOptions, EQ_IN
 from app.models import IceRink
 
 class IceRinkRepository(BaseRepository[IceRink]):
+    list_options = ListOptions(
+        model=IceRink,
+        filters={
+            "name": ("eq", "ilike"), "location": ("ilike",), "type": EQ_IN, "status": EQ_IN,
+            "ssp_status": EQ_IN, "organization_id": EQ_IN, "max_power_consumption": ("gte", "lte"),
+            "last_communication": ("gte", "lte"), "created_at": ("gte", "lte"),
+        },
+        sort=("name", "location", "type", "status", "ssp_status", "max_power_consumption",
+              "last_communication", "created_at"),
+        fields=("id", "organization_id", "name", "location", "latitude", "longitude", "dimensions", "type",
+                "chiller_type", "max_power_consumption", "ssp_endpoint", "ssp_status", "status",
+                "last_communication", "created_at", "updated_at"),
+    )
+
     def __init__(self, session: AsyncSession):
         super().__init__(IceRink, session)
 
     async def get_by_id_with_details(self, rink_id: uuid.UUID) -> IceRink | None:
         """
-        Pobiera lodowisko razem z powiązanymi pomiarami i prognozami pogody.
+        Pobiera lodowisko razem z powiązanymi pomiarami.
+        Prognozy pogody pochodzą z wydań prognoz (WeatherForecastRepository.get_forecasts_for_rink).
         """
         query = (
             select(IceRink)
             .where(IceRink.id == rink_id)
             .options(
                 selectinload(IceRink.measurements),
-                selectinload(IceRink.weather_forecasts)
+                noload(IceRink.weather_forecasts)
             )
         )
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
+    async def get_all_with_coordinates(self) -> List[IceRink]:
+        """Zwraca wszystkie lodowiska, które mają uzupełnione współrzędne."""
+        query = (
+            select(IceRink)
+            .where(IceRink.latitude.is_not(None), IceRink.longitude.is_not(None))
+            .order_by(IceRink.created_at)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
     async def update_ssp_status(self, rink_id: uuid.UUID, status: str, last_communication: Optional[datetime] = None) -> None:
-        rink = await self.get_by_id(rink_id)
-        if rink:
-            rink.ssp_status = status
-            if last_communication:
-                rink.last_communication = last_communication
-            await self.session.commit()
+        values = {"ssp_status": status}
+        if last_communication:
+            values["last_communication"] = last_communication
+        await self.session.execute(
+            update(IceRink)
+            .where(IceRink.id == rink_id, changed_values(IceRink, values))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self._commit()
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+import uuid
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from app.repositories.base import BaseRepository
+from app.models import JobRun
+
+class JobRunRepository(BaseRepository[JobRun]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(JobRun, session)
+
+    async def start_run(self, job_name: str, trigger: str, host: str) -> JobRun:
+        # Wywoływane pod blokadą zadania - pozostałe wpisy 'running' to przerwane uruchomienia
+        await self.session.execute(
+            update(JobRun)
+            .where(JobRun.job_name == job_name, JobRun.status == 'running')
+            .values(status='error', error_message='interrupted', finished_at=datetime.now(timezone.utc))
+        )
+        return await self.create({
+            "job_name": job_name,
+            "trigger": trigger,
+            "host": host,
+            "started_at": datetime.now(timezone.utc),
+        })
+
+    async def finish_run(self, run_id: uuid.UUID, started: datetime, status: str,
+                         details: Optional[dict] = None, error_message: Optional[str] = None) -> None:
+        finished = datetime.now(timezone.utc)
+        await self.session.execute(
+            update(JobRun)
+            .where(JobRun.id == run_id)
+            .values(
+                status=status,
+                finished_at=finished,
+                duration_ms=int((finished - started).total_seconds() * 1000),
+                details=details or {},
+                error_message=error_message,
+            )
+        )
+        await self._commit()
+
+    async def get_last_run(self, job_name: str, status: Optional[str] = None) -> Optional[JobRun]:
+        query = select(JobRun).where(JobRun.job_name == job_name).order_by(JobRun.started_at.desc()).limit(1)
+        if status:
+            query = query.where(JobRun.status == status)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def list_runs(self, job_name: Optional[str] = None, limit: int = 50) -> List[JobRun]:
+        query = select(JobRun).order_by(JobRun.started_at.desc()).limit(limit)
+        if job_name:
+            query = query.where(JobRun.job_name == job_name)
+        result = await self.session.execute(query)
+        return result.scalars().all()
@@ -1,13 +1,82 @@
 import uuid
 from datetime import datetime
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from functools import lru_cache
+from sqlalchemy import Select, select, func, cast, bindparam, text
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
 from sqlalchemy.orm import selectinload
-from sqlalchemy.dialects.postgresql import insert
-from app.repositories.base import BaseRepository
+from app.repositories.base import BaseRepository, bulk_upsert
 from app.models import Measurement
 
+# Pola w kolejności MeasurementResponse - szybka ścieżka zwraca krotki w tym samym układzie
+MEASUREMENT_FIELDS = (
+    "timestamp", "ice_temperature", "chiller_power", "chiller_status", "ambient_temperature",
+    "humidity", "energy_consumption", "data_source", "quality_score", "id", "ice_rink_id",
+)
+# Kolumny NUMERIC rzutowane w bazie na float8 (zamiast Decimal po stronie Pythona)
+FLOAT_FIELDS = {"ice_temperature", "chiller_power", "ambient_temperature", "humidity",
+                "energy_consumption", "quality_score"}
+
+ROW_COLUMNS = tuple(
+    cast(getattr(Measurement, name), DOUBLE_PRECISION) if name in FLOAT_FIELDS else getattr(Measurement, name)
+    for name in MEASUREMENT_FIELDS
+)
+
+# Najczęstsze odczyty budowane raz przy imporcie: SQLAlchemy nie składa ani nie kompiluje ich
+# przy każdym wywołaniu, a stały tekst SQL trafia w cache prepared statements połączenia
+LATEST_FOR_RINK = (
+    select(Measurement)
+    .where(Measurement.ice_rink_id == bindparam("rink_id"))
+    .order_by(Measurement.timestamp.desc())
+    .limit(1)
+)
+
+# Ostatni pomiar wielu lodowisk jednym zapytaniem (zamiast zapytania na lodowisko):
+# dla każdego id jeden odczyt indeksu idx_measurements_ice_rink_time od końca
+LATEST_FOR_RINKS = text("""
+    SELECT m.*
+    FROM unnest(CAST(:rink_ids AS uuid[])) AS r(id)
+    CROSS JOIN LATERAL (
+        SELECT * FROM measurements
+        WHERE ice_rink_id = r.id
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ) AS m
+""").columns(*Measurement.__table__.columns)
+
+ENERGY_FOR_RINKS = (
+    select(Measurement.ice_rink_id, cast(func.sum(Measurement.energy_consumption), DOUBLE_PRECISION))
+    .where(Measurement.ice_rink_id.in_(bindparam("rink_ids", expanding=True)),
+           Measurement.timestamp >= bindparam("start_date"))
+    .group_by(Measurement.ice_rink_id)
+)
+
+@lru_cache(maxsize=None)
+def _rink_page_statements(rows: bool, has_start: bool, has_end: bool) -> Tuple[Select, Select]:
+    """(strona, licznik) dla wariantu filtrów dat; `rows` - kolumny ROW_COLUMNS zamiast obiektów ORM."""
+    conditions = [Measurement.ice_rink_id == bindparam("rink_id")]
+    if has_start:
+        conditions.append(Measurement.timestamp >= bindparam("start_date"))
+    if has_end:
+        conditions.append(Measurement.timestamp <= bindparam("end_date"))
+    query = select(*ROW_COLUMNS) if rows else select(Measurement).options(selectinload(Measurement.ice_rink))
+    page = (
+        query.where(*conditions)
+        .order_by(Measurement.timestamp.desc())
+        .offset(bindparam("skip"))
+        .limit(bindparam("limit"))
+    )
+    return page, select(func.count()).select_from(Measurement).where(*conditions)
+
+def _rink_page_params(rink_id, skip, limit, start_date, end_date) -> dict:
+    params = {"rink_id": rink_id, "skip": skip, "limit": limit}
+    if start_date is not None:
+        params["start_date"] = start_date
+    if end_date is not None:
+        params["end_date"] = end_date
+    return params
+
 class MeasurementRepository(BaseRepository[Measurement]):
     def __init__(self, session: AsyncSession):
         super().__init__(Measurement, session)
@@ -22,46 +91,57 @@ class MeasurementRepository(BaseRepository[Measurement]):
     ) -> Tuple[List[Measurement], int]:
         
         # Zapytanie teraz dołącza powiązany obiekt IceRink za pomocą selectinload
-        query = (
-            select(Measurement)
-            .where(Measurement.ice_rink_id == rink_id)
-            .options(selectinload(Measurement.ice_rink))
-        )
-        if start_date:
-            query = query.where(Measurement.timestamp >= start_date)
-        if end_date:
-            query = query.where(Measurement.timestamp <= end_date)
-
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await self.session.execute(count_query)).scalar_one()
-
-        items_query = query.order_by(Measurement.timestamp.desc()).offset(skip).limit(limit)
-        items = (await self.session.execute(items_query)).scalars().all()
+        query, count_query = _rink_page_statements(False, start_date is not None, end_date is not None)
+        params = _rink_page_params(rink_id, skip, limit, start_date, end_date)
+        total = (await self.session.execute(count_query, params)).scalar_one()
+        items = (await self.session.execute(query, params)).scalars().all()
 
         return items, total
+
+    async def get_measurement_rows_for_rink(
+        self,
+        rink_id: uuid.UUID,
+        skip: int = 0,
+        limit: int = 100,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Tuple[List[tuple], int]:
+        """Jak `get_measurements_for_rink`, ale zwraca krotki w układzie MEASUREMENT_FIELDS (bez ORM)."""
+        query, count_query = _rink_page_statements(True, start_date is not None, end_date is not None)
+        params = _rink_page_params(rink_id, skip, limit, start_date, end_date)
+        total = (await self.session.execute(count_query, params)).scalar_one()
+        rows = (await self.session.execute(query, params)).all()
+        return rows, total
     
     async def get_latest_for_rink(self, rink_id: uuid.UUID) -> Measurement | None:
-        query = (
-            select(Measurement)
-            .where(Measurement.ice_rink_id == rink_id)
-            .order_by(Measurement.timestamp.desc())
-            .limit(1)
-        )
-        result = await self.session.execute(query)
+        result = await self.session.execute(LATEST_FOR_RINK, {"rink_id": rink_id})
         return result.scalar_one_or_none()
     
-    async def bulk_upsert(self, forecasts_data: List[dict]):
-        if not forecasts_data:
-            return
-        
-        stmt = insert(Measurement.metadata.tables['weather_forecasts']).values(forecasts_data)
-        update_stmt = stmt.on_conflict_do_update(
-            index_elements=['ice_rink_id', 'forecast_time'],
-            set_={
-                'temperature_min': stmt.excluded.temperature_min,
-                'temperature_max': stmt.excluded.temperature_max,
-                'humidity': stmt.excluded.humidity,
-            }
+    async def get_latest_for_rinks(self, rink_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Measurement]:
+        """Ostatni pomiar każdego z lodowisk (lodowiska bez pomiarów są pomijane)."""
+        if not rink_ids:
+            return {}
+        query = select(Measurement).from_statement(LATEST_FOR_RINKS)
+        result = await self.session.execute(query, {"rink_ids": list(rink_ids)})
+        return {m.ice_rink_id: m for m in result.scalars()}
+
+    async def sum_energy_for_rinks(self, rink_ids: List[uuid.UUID], start_date: datetime) -> Dict[uuid.UUID, float]:
+        """Suma energy_consumption od `start_date` dla każdego lodowiska (bez lodowisk bez pomiarów)."""
+        if not rink_ids:
+            return {}
+        result = await self.session.execute(ENERGY_FOR_RINKS, {"rink_ids": list(rink_ids), "start_date": start_date})
+        return {rink_id: total for rink_id, total in result.all() if total is not None}
+
+    async def bulk_upsert(self, measurements_data: List[dict]) -> int:
+        if not measurements_data:
+            return 0
+        key_columns = ['ice_rink_id', 'timestamp']
+        count = await bulk_upsert(
+            self.session,
+            Measurement,
+            measurements_data,
+            index_elements=key_columns,
+            update_columns=[c for c in measurements_data[0] if c not in key_columns and c != 'id'],
         )
-        await self.session.execute(update_stmt)
-        await self.session.commit()
+        await self._commit()
+        return count
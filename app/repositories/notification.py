@@ -0,0 +1,92 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, func, text
+from app.repositories.base import BaseRepository
+from app.models import Notification, User
+
+# Oznaczenie nieudanych prób jednym zapytaniem: ponowienie (backoff) albo ostateczny błąd
+MARK_FAILED = text("""
+    UPDATE notifications AS n
+    SET retry_count = n.retry_count + 1,
+        error_message = f.error,
+        status = CASE WHEN f.final THEN 'failed' ELSE 'pending' END,
+        next_attempt_at = NOW() + f.delay_s * INTERVAL '1 second'
+    FROM unnest(CAST(:ids AS uuid[]), CAST(:errors AS text[]), CAST(:finals AS boolean[]),
+                CAST(:delays AS double precision[])) AS f(id, error, final, delay_s)
+    WHERE n.id = f.id AND n.status = 'pending' AND n.next_attempt_at = :leased_until
+""")
+
+class NotificationRepository(BaseRepository[Notification]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(Notification, session)
+
+    async def enqueue_many(self, notifications: Sequence[dict]) -> None:
+        """
+        Dodaje powiadomienia do kolejki (outbox) w bieżącej transakcji - razem ze zmianą,
+        której dotyczą. W unit_of_work zatwierdza je właściciel transakcji.
+        """
+        if notifications:
+            await self.session.execute(insert(Notification), list(notifications))
+            await self._commit()
+
+    async def claim_batch(self, limit: int, lease_s: float) -> List[dict]:
+        """
+        Pobiera do `limit` oczekujących powiadomień, których termin minął.
+
+        Wiersze blokowane przez inne workery są pomijane (SKIP LOCKED), a pobrane dostają
+        dzierżawę: `next_attempt_at` przesunięte o `lease_s`, więc po commicie nie zostaną
+        pobrane ponownie, chyba że proces padnie przed oznaczeniem wyniku. Koniec dzierżawy
+        wraca jako `leased_until` - wynik zapisuje tylko worker, który nadal ją trzyma.
+        """
+        due = (
+            select(Notification.id)
+            .where(Notification.status == 'pending', Notification.next_attempt_at <= func.now())
+            .order_by(Notification.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = (
+            update(Notification)
+            .where(Notification.id.in_(due.scalar_subquery()))
+            .values(next_attempt_at=func.now() + timedelta(seconds=lease_s))
+            .returning(Notification.id, Notification.user_id, Notification.organization_id, Notification.type,
+                       Notification.title, Notification.message, Notification.retry_count,
+                       Notification.meta.label("metadata"), Notification.next_attempt_at.label("leased_until"))
+            .cte("claimed")
+        )
+        query = select(claimed, User.email.label("user_email")).outerjoin(User, User.id == claimed.c.user_id)
+        rows = (await self.session.execute(query)).mappings().all()
+        await self._commit()
+        return [dict(row) for row in rows]
+
+    async def mark_sent(self, ids: Sequence[uuid.UUID], leased_until: datetime) -> None:
+        if ids:
+            await self.session.execute(
+                update(Notification)
+                .where(Notification.id.in_(ids), Notification.status == 'pending',
+                       Notification.next_attempt_at == leased_until)
+                .values(status='sent', sent_at=func.now(), error_message=None)
+                .execution_options(synchronize_session=False)
+            )
+            await self._commit()
+
+    async def mark_failed(self, failures: Sequence[tuple], leased_until: datetime) -> None:
+        """`failures`: krotki (id, komunikat błędu, czy ostateczny, opóźnienie kolejnej próby w s)."""
+        if failures:
+            ids, errors, finals, delays = zip(*failures)
+            await self.session.execute(MARK_FAILED, {
+                "ids": list(ids), "errors": list(errors), "finals": list(finals), "delays": list(delays),
+                "leased_until": leased_until,
+            })
+            await self._commit()
+
+    async def get_queue_stats(self) -> dict:
+        query = select(
+            func.count(),
+            func.count().filter(Notification.next_attempt_at <= func.now()),
+            func.min(Notification.next_attempt_at),
+        ).where(Notification.status == 'pending')
+        pending, due, next_attempt = (await self.session.execute(query)).one()
+        return {"pending": pending, "due": due, "next_attempt_at": next_attempt}
@@ -1,9 +1,21 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.repositories.base import BaseRepository
+from app.filters import ListOptions, EQ_IN
 from app.models import Organization
 
 class OrganizationRepository(BaseRepository[Organization]):
+    list_options = ListOptions(
+        model=Organization,
+        filters={
+            "name": ("eq", "ilike"), "type": EQ_IN, "status": EQ_IN,
+            "created_at": ("gte", "lte"),
+        },
+        sort=("name", "type", "status", "created_at", "updated_at"),
+        fields=("id", "name", "type", "status", "address", "contact_person", "contact_email",
+                "contact_phone", "tax_id", "created_at", "updated_at"),
+    )
+
     def __init__(self, session: AsyncSession):
         super().__init__(Organization, session)
 
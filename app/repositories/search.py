@@ -0,0 +1,97 @@
+import re
+import uuid
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, literal_column, or_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from app.models import ServiceTicket, TicketComment, IceRink, Organization
+
+# Stała konfiguracja (nie parametr) - inaczej planista nie dopasuje indeksów wyrażeniowych
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+# Kolumna generowana w setup_database.sql (tytuł z wagą A, opis z wagą B); nie jest mapowana w ORM
+TICKET_VECTOR = literal_column("service_tickets.search_vector", TSVECTOR)
+COMMENT_VECTOR = func.to_tsvector(SEARCH_CONFIG, TicketComment.comment)
+COMMENT_SNIPPET_LENGTH = 200
+
+def prefix_tsquery(text: str) -> Optional[str]:
+    """'lodowisko war' -> 'lodowisko:* & war:*' - każde słowo także jako prefiks; None gdy brak słów."""
+    words = re.findall(r"\w+", text.lower())
+    return " & ".join(f"{word}:*" for word in words) or None
+
+class SearchRepository:
+    def __init__(self, session: AsyncSession, similarity_threshold: float = 0.3):
+        self.session = session
+        self.similarity_threshold = similarity_threshold
+
+    async def search_tickets(self, text: str, limit: int, organization_id: Optional[uuid.UUID] = None) -> List[dict]:
+        tsquery = prefix_tsquery(text)
+        if not tsquery:
+            return []
+        query_vector = func.to_tsquery(SEARCH_CONFIG, tsquery)
+        rank = func.ts_rank_cd(TICKET_VECTOR, query_vector).label("rank")
+        query = (
+            select(ServiceTicket.id, ServiceTicket.ticket_number, ServiceTicket.title, ServiceTicket.status,
+                   ServiceTicket.priority, ServiceTicket.organization_id, ServiceTicket.ice_rink_id,
+                   ServiceTicket.created_at, rank)
+            .where(TICKET_VECTOR.op("@@")(query_vector))
+            .order_by(rank.desc(), ServiceTicket.created_at.desc())
+            .limit(limit)
+        )
+        if organization_id:
+            query = query.where(ServiceTicket.organization_id == organization_id)
+        return [dict(row._mapping) for row in await self.session.execute(query)]
+
+    async def search_comments(self, text: str, limit: int, organization_id: Optional[uuid.UUID] = None,
+                              include_internal: bool = True) -> List[dict]:
+        tsquery = prefix_tsquery(text)
+        if not tsquery:
+            return []
+        query_vector = func.to_tsquery(SEARCH_CONFIG, tsquery)
+        rank = func.ts_rank_cd(COMMENT_VECTOR, query_vector).label("rank")
+        query = (
+            select(TicketComment.id, TicketComment.ticket_id, ServiceTicket.ticket_number,
+                   func.left(TicketComment.comment, COMMENT_SNIPPET_LENGTH).label("snippet"),
+                   TicketComment.created_at, rank)
+            .join(ServiceTicket, ServiceTicket.id == TicketComment.ticket_id)
+            .where(COMMENT_VECTOR.op("@@")(query_vector))
+            .order_by(rank.desc(), TicketComment.created_at.desc())
+            .limit(limit)
+        )
+        if organization_id:
+            query = query.where(ServiceTicket.organization_id == organization_id)
+        if not include_internal:
+            query = query.where(TicketComment.is_internal.is_(False))
+        return [dict(row._mapping) for row in await self.session.execute(query)]
+
+    async def search_ice_rinks(self, text: str, limit: int, organization_id: Optional[uuid.UUID] = None) -> List[dict]:
+        # word_similarity: dopasowanie fragmentu nazwy, odporne na literówki; `%>` korzysta z indeksów gin_trgm_ops
+        rank = func.greatest(func.word_similarity(text, IceRink.name),
+                             func.word_similarity(text, IceRink.location)).label("rank")
+        query = (
+            select(IceRink.id, IceRink.name, IceRink.location, IceRink.status, IceRink.organization_id, rank)
+            .where(or_(IceRink.name.op("%>")(text), IceRink.location.op("%>")(text)))
+            .order_by(rank.desc(), IceRink.name)
+            .limit(limit)
+        )
+        if organization_id:
+            query = query.where(IceRink.organization_id == organization_id)
+        return await self._fetch_trigram(query)
+
+    async def search_organizations(self, text: str, limit: int, organization_id: Optional[uuid.UUID] = None) -> List[dict]:
+        rank = func.word_similarity(text, Organization.name).label("rank")
+        query = (
+            select(Organization.id, Organization.name, Organization.type, Organization.status, rank)
+            .where(Organization.name.op("%>")(text))
+            .order_by(rank.desc(), Organization.name)
+            .limit(limit)
+        )
+        if organization_id:
+            query = query.where(Organization.id == organization_id)
+        return await self._fetch_trigram(query)
+
+    async def _fetch_trigram(self, query) -> List[dict]:
+        # Próg operatora `%>` (domyślnie 0.6) tylko dla tej transakcji
+        await self.session.execute(
+            select(func.set_config("pg_trgm.word_similarity_threshold", str(self.similarity_threshold), True))
+        )
+        return [dict(row._mapping) for row in await self.session.execute(query)]
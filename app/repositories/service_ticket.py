@@ -1,25 +1,167 @@
 # (Nowy plik app/repositories/service_ticket.py)
 
 import uuid
-from typing import Optional
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, tuple_, update, insert
+from sqlalchemy.orm import noload
 from app.repositories.base import BaseRepository
-from app.models import ServiceTicket, TicketComment
+from app.filters import ListOptions, EQ_IN
+from app.models import ServiceTicket, TicketComment, User
+
+TICKET_STATUSES = ("new", "assigned", "in_progress", "resolved", "closed")
+TICKET_PRIORITIES = ("low", "medium", "high", "critical")
+OPEN_STATUSES = ("new", "assigned", "in_progress")
+
+# Autor komentarza bez pełnego obiektu User: tylko id i nazwa wyświetlana
+AUTHOR_DISPLAY_NAME = func.coalesce(
+    func.nullif(func.concat_ws(" ", User.first_name, User.last_name), ""), User.username
+)
+COMMENT_COLUMNS = (
+    TicketComment.id, TicketComment.user_id, TicketComment.comment, TicketComment.is_internal,
+    TicketComment.created_at, AUTHOR_DISPLAY_NAME.label("display_name"),
+)
+
+class BulkSelectionTooLarge(Exception):
+    """Filtr operacji grupowej obejmuje więcej zgłoszeń niż dopuszczalny limit."""
+
+def status_change_comment(old_status: str, new_status: str, comment_text: Optional[str] = None) -> str:
+    comment = f"Status zgłoszenia zmieniony z '{old_status}' na '{new_status}'."
+    if comment_text:
+        comment += f"\n\nKomentarz użytkownika: {comment_text}"
+    return comment
+
+def _comment_row(row) -> dict:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "comment": row.comment,
+        "is_internal": row.is_internal,
+        "created_at": row.created_at,
+        "author": {"id": row.user_id, "display_name": row.display_name},
+    }
 
 class ServiceTicketRepository(BaseRepository[ServiceTicket]):
+    list_options = ListOptions(
+        model=ServiceTicket,
+        filters={
+            "status": EQ_IN, "priority": EQ_IN, "category": EQ_IN, "source": EQ_IN,
+            "ice_rink_id": EQ_IN, "organization_id": EQ_IN, "assigned_to_id": EQ_IN, "created_by_id": EQ_IN,
+            "ticket_number": ("eq",), "title": ("ilike",),
+            "created_at": ("gte", "lte"), "updated_at": ("gte", "lte"), "sla_target": ("gte", "lte"),
+        },
+        sort=("ticket_number", "status", "priority", "category", "sla_target", "created_at", "updated_at"),
+        fields=("id", "ticket_number", "ice_rink_id", "organization_id", "created_by_id", "assigned_to_id",
+                "priority", "status", "category", "title", "description", "source", "sla_target",
+                "sla_breached_at", "resolved_at", "closed_at", "created_at", "updated_at"),
+    )
+
     def __init__(self, session: AsyncSession):
         super().__init__(ServiceTicket, session)
 
-    async def get_ticket_with_details(self, ticket_id: uuid.UUID) -> Optional[ServiceTicket]:
+    async def get_stats(self, filters: Optional[dict] = None) -> dict:
+        """
+        Liczniki zgłoszeń według statusu i priorytetu - jedno zapytanie GROUP BY
+        (indeks organization_id, status, priority, created_at).
+        """
+        query = (
+            select(ServiceTicket.status, ServiceTicket.priority, func.count())
+            .where(*self._filter_conditions(filters))
+            .group_by(ServiceTicket.status, ServiceTicket.priority)
+        )
+        matrix = {s: dict.fromkeys(TICKET_PRIORITIES, 0) for s in TICKET_STATUSES}
+        for ticket_status, priority, count in (await self.session.execute(query)).all():
+            matrix[ticket_status][priority] = count
+        by_status = {s: sum(row.values()) for s, row in matrix.items()}
+        by_priority = {p: sum(row[p] for row in matrix.values()) for p in TICKET_PRIORITIES}
+        return {
+            "total": sum(by_status.values()),
+            "open": sum(by_status[s] for s in OPEN_STATUSES),
+            "by_status": by_status,
+            "by_priority": by_priority,
+            "by_status_priority": matrix,
+        }
+
+    async def get_open_sla_targets(self) -> List[tuple]:
+        """(id, organization_id, priority, sla_target) otwartych zgłoszeń z terminem SLA - odbudowa monitora SLA."""
+        query = select(
+            ServiceTicket.id, ServiceTicket.organization_id, ServiceTicket.priority, ServiceTicket.sla_target
+        ).where(ServiceTicket.status.in_(OPEN_STATUSES), ServiceTicket.sla_target.is_not(None))
+        return (await self.session.execute(query)).all()
+
+    async def count_sla_breaches(self, organization_id: Optional[uuid.UUID] = None) -> dict:
+        """Otwarte zgłoszenia po terminie SLA wg priorytetu (indeks częściowy idx_service_tickets_sla_open)."""
+        query = (
+            select(ServiceTicket.priority, func.count())
+            .where(ServiceTicket.status.in_(OPEN_STATUSES), ServiceTicket.sla_target <= func.now())
+            .group_by(ServiceTicket.priority)
+        )
+        if organization_id:
+            query = query.where(ServiceTicket.organization_id == organization_id)
+        counts = dict.fromkeys(TICKET_PRIORITIES, 0)
+        counts.update((await self.session.execute(query)).all())
+        return counts
+
+    async def claim_sla_breaches(self, ticket_ids: List[uuid.UUID]) -> List[dict]:
+        """
+        Oznacza przekroczenie SLA (sla_breached_at) zgłoszeń, które nadal są otwarte i po terminie.
+        Zwraca tylko wiersze oznaczone tym wywołaniem - przy wielu workerach każdy termin eskaluje jeden z nich.
+        """
+        stmt = (
+            update(ServiceTicket)
+            .where(
+                ServiceTicket.id.in_(ticket_ids),
+                ServiceTicket.sla_breached_at.is_(None),
+                ServiceTicket.status.in_(OPEN_STATUSES),
+                ServiceTicket.sla_target <= func.now(),
+            )
+            .values(sla_breached_at=func.now())
+            .returning(ServiceTicket.id, ServiceTicket.ticket_number, ServiceTicket.organization_id,
+                       ServiceTicket.ice_rink_id, ServiceTicket.assigned_to_id, ServiceTicket.priority,
+                       ServiceTicket.status, ServiceTicket.sla_target, ServiceTicket.sla_breached_at)
+            .execution_options(synchronize_session=False)
+        )
+        rows = (await self.session.execute(stmt)).mappings().all()
+        await self._commit()
+        return [dict(row) for row in rows]
+
+    async def get_ticket_with_details(
+        self, ticket_id: uuid.UUID, comments_limit: int = 10
+    ) -> Optional[Tuple[ServiceTicket, List[dict], int]]:
+        """Zgłoszenie, jego `comments_limit` najnowszych komentarzy i liczba wszystkich komentarzy."""
+        query = select(ServiceTicket).where(ServiceTicket.id == ticket_id).options(noload(ServiceTicket.comments))
+        ticket = (await self.session.execute(query)).scalar_one_or_none()
+        if not ticket:
+            return None
+        comments, _ = await self.get_comments_page(ticket_id, comments_limit) if comments_limit else ([], None)
+        count_query = select(func.count()).select_from(TicketComment).where(TicketComment.ticket_id == ticket_id)
+        total = (await self.session.execute(count_query)).scalar_one()
+        return ticket, comments, total
+
+    async def get_comments_page(
+        self, ticket_id: uuid.UUID, limit: int, before: Optional[Tuple[datetime, uuid.UUID]] = None
+    ) -> Tuple[List[dict], Optional[Tuple[datetime, uuid.UUID]]]:
+        """
+        Komentarze od najnowszych, stronicowane kluczem (created_at, id) - bez OFFSET,
+        więc koszt strony nie rośnie z jej numerem. Zwraca też klucz dla następnej strony.
+        """
         query = (
-            select(ServiceTicket)
-            .where(ServiceTicket.id == ticket_id)
-            .options(selectinload(ServiceTicket.comments).selectinload(TicketComment.user))
+            select(*COMMENT_COLUMNS)
+            .join(User, User.id == TicketComment.user_id)
+            .where(TicketComment.ticket_id == ticket_id)
+            .order_by(TicketComment.created_at.desc(), TicketComment.id.desc())
+            .limit(limit + 1)
         )
-        result = await self.session.execute(query)
-        return result.scalar_one_or_none()
+        if before:
+            query = query.where(tuple_(TicketComment.created_at, TicketComment.id) < tuple_(*before))
+        rows = (await self.session.execute(query)).all()
+        next_key = (rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+        return [_comment_row(row) for row in rows[:limit]], next_key
+
+    async def ticket_exists(self, ticket_id: uuid.UUID) -> bool:
+        query = select(ServiceTicket.id).where(ServiceTicket.id == ticket_id)
+        return (await self.session.execute(query)).first() is not None
 
     async def add_comment_to_ticket(self, ticket_id: uuid.UUID, user_id: uuid.UUID, comment_data: dict) -> Optional[TicketComment]:
         ticket = await self.get_by_id(ticket_id)
@@ -32,8 +174,7 @@ class ServiceTicketRepository(BaseRepository[ServiceTicket]):
             **comment_data
         )
         self.session.add(new_comment)
-        await self.session.commit()
-        await self.session.refresh(new_comment)
+        await self._commit()
         return new_comment
 
     async def update_status(self, ticket_id: uuid.UUID, user_id: uuid.UUID, new_status: str, comment_text: Optional[str] = None) -> Optional[ServiceTicket]:
@@ -46,9 +187,7 @@ class ServiceTicketRepository(BaseRepository[ServiceTicket]):
         ticket.status = new_status
         
         # Tworzymy automatyczny komentarz systemowy
-        system_comment = f"Status zgłoszenia zmieniony z '{old_status}' na '{new_status}'."
-        if comment_text:
-            system_comment += f"\n\nKomentarz użytkownika: {comment_text}"
+        system_comment = status_change_comment(old_status, new_status, comment_text)
 
         new_comment_obj = TicketComment(
             ticket_id=ticket_id,
@@ -57,10 +196,13 @@ class ServiceTicketRepository(BaseRepository[ServiceTicket]):
             is_internal=True # Zmiany statusu są zawsze wewnętrzne
         )
         self.session.add(new_comment_obj)
-        await self.session.commit()
-        await self.session.refresh(ticket)
+        await self._commit()
         return ticket
 
+    async def get_username(self, user_id: uuid.UUID) -> Optional[str]:
+        """Nazwa użytkownika do komentarza o przypisaniu (None - brak użytkownika)."""
+        return (await self.session.execute(select(User.username).where(User.id == user_id))).scalar_one_or_none()
+
     async def assign_ticket(self, ticket_id: uuid.UUID, assigned_to_id: uuid.UUID, assigning_user_id: uuid.UUID) -> Optional[ServiceTicket]:
         # Pobieramy zgłoszenie i przyszłego przypisanego użytkownika, aby mieć jego nazwę
         from app.models import User # Import wewnątrz funkcji, by uniknąć cyklicznych zależności
@@ -82,6 +224,57 @@ class ServiceTicketRepository(BaseRepository[ServiceTicket]):
             is_internal=True
         )
         self.session.add(new_comment_obj)
-        await self.session.commit()
-        await self.session.refresh(ticket)
+        await self._commit()
         return ticket
+
+    async def bulk_update(
+        self, user_id: uuid.UUID, values: dict, comment: Callable[[Any], str], limit: int,
+        ticket_ids: Optional[List[uuid.UUID]] = None, filters: Optional[dict] = None,
+    ) -> List[dict]:
+        """
+        Ta sama zmiana (`values`) dla wielu zgłoszeń w jednej transakcji: blokada wybranych
+        wierszy, jeden UPDATE dla zmienianych i jeden wielowierszowy INSERT komentarzy
+        systemowych (`comment(stary_wiersz)`). Zgłoszenia już w docelowym stanie są pomijane.
+
+        Zwraca wynik dla każdego zgłoszenia (kolejność `ticket_ids`, przy filtrze - wg id).
+        """
+        columns = dict.fromkeys(["id", "ticket_number", "status", *values])
+        query = select(*[getattr(ServiceTicket, name) for name in columns])
+        if ticket_ids is not None:
+            query = query.where(ServiceTicket.id.in_(ticket_ids))
+        else:
+            query = query.where(*self._filter_conditions(filters))
+        # Stała kolejność blokad - równoległe operacje grupowe nie zakleszczą się
+        query = query.order_by(ServiceTicket.id).limit(limit + 1).with_for_update()
+        rows = (await self.session.execute(query)).all()
+        if len(rows) > limit:
+            raise BulkSelectionTooLarge(limit)
+
+        changed = [row for row in rows if any(getattr(row, key) != value for key, value in values.items())]
+        if changed:
+            await self.session.execute(
+                update(ServiceTicket)
+                .where(ServiceTicket.id.in_([row.id for row in changed]))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await self.session.execute(insert(TicketComment), [
+                {"ticket_id": row.id, "user_id": user_id, "comment": comment(row), "is_internal": True}
+                for row in changed
+            ])
+        await self._commit()
+
+        changed_ids = {row.id for row in changed}
+        found = {
+            row.id: {
+                "id": row.id,
+                "ticket_number": row.ticket_number,
+                "result": "updated" if row.id in changed_ids else "unchanged",
+                "status": values.get("status", row.status),
+            }
+            for row in rows
+        }
+        if ticket_ids is None:
+            return list(found.values())
+        return [found.get(ticket_id) or {"id": ticket_id, "result": "not_found"}
+                for ticket_id in dict.fromkeys(ticket_ids)]
@@ -1,6 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.models import IceRink, SystemConfig
+from app.repositories.job_run import JobRunRepository
+from app.repositories.user_session import UserSessionRepository
 
 class SystemRepository:
     def __init__(self, session: AsyncSession):
@@ -18,12 +20,23 @@ class SystemRepository:
         result = await self.session.execute(query)
         return result.scalar_one()
     
+    async def get_session_stats(self) -> dict:
+        stats = await UserSessionRepository(self.session).get_table_stats()
+        last_purge = await JobRunRepository(self.session).get_last_run("session_purge", status="success")
+        stats["last_purge"] = {
+            "finished_at": last_purge.finished_at,
+            "duration_ms": last_purge.duration_ms,
+            **last_purge.details,
+        } if last_purge else None
+        return stats
+
     async def get_full_status(self) -> dict:
         ssp_connections = await self.get_ssp_connections()
         
         # Pobieramy dynamicznie statusy z tabeli system_config
         query = select(SystemConfig).where(SystemConfig.key.in_([
-            'weather_api_status', 'ai_models_status', 'last_backup'
+            'weather_api_status', 'weather_api_last_duration', 'weather_api_failed_rinks',
+            'ai_models_status', 'last_backup'
         ]))
         result = await self.session.execute(query)
         configs = {item.key: item.value for item in result.scalars().all()}
@@ -36,6 +49,9 @@ class SystemRepository:
             "database_status": db_status,
             "ssp_connections": ssp_connections,
             "weather_api_status": configs.get('weather_api_status', 'unknown'),
+            "weather_api_last_duration": configs.get('weather_api_last_duration'),
+            "weather_api_failed_rinks": configs.get('weather_api_failed_rinks'),
             "ai_models_status": configs.get('ai_models_status', 'unknown'),
             "last_backup": configs.get('last_backup'),
+            "user_sessions": await self.get_session_stats(),
         }
@@ -35,7 +35,7 @@ class SystemConfigRepository(BaseRepository[SystemConfig]):
             )
             self.session.add(config_item)
         
-        await self.session.commit()
+        await self._commit()
 
     async def update_by_key(self, key: str, value: str, user_id: uuid.UUID) -> Optional[SystemConfig]:
         config_item = await self.get_by_key(key)
@@ -45,6 +45,5 @@ class SystemConfigRepository(BaseRepository[SystemConfig]):
         config_item.value = value
         config_item.updated_by_id = user_id
         
-        await self.session.commit()
-        await self.session.refresh(config_item)
+        await self._commit()
         return config_item
@@ -1,11 +1,24 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.repositories.base import BaseRepository
+from app.filters import ListOptions, EQ_IN
 from app.models import User
 from app.security import get_password_hash
 import uuid
 
 class UserRepository(BaseRepository[User]):
+    list_options = ListOptions(
+        model=User,
+        filters={
+            "username": ("eq", "ilike"), "email": ("eq", "ilike"), "last_name": ("ilike",),
+            "role": EQ_IN, "status": EQ_IN, "organization_id": EQ_IN,
+            "created_at": ("gte", "lte"),
+        },
+        sort=("username", "email", "last_name", "role", "status", "created_at"),
+        fields=("id", "username", "email", "first_name", "last_name", "role", "organization_id",
+                "status", "created_at", "updated_at"),
+    )
+
     def __init__(self, session: AsyncSession):
         super().__init__(User, session)
 
@@ -18,13 +31,14 @@ class UserRepository(BaseRepository[User]):
         return result.scalar_one_or_none()
 
     async def create_user(self, data: dict) -> User:
-        data["password_hash"] = get_password_hash(data.pop("password"))
+        data["password_hash"] = await get_password_hash(data.pop("password"))
         return await self.create(data)
 
     async def update_password(self, user_id: uuid.UUID, new_password: str) -> bool:
-        user = await self.get_by_id(user_id)
-        if not user:
-            return False
-        user.password_hash = get_password_hash(new_password)
-        await self.session.commit()
-        return True
+        password_hash = await get_password_hash(new_password)
+        result = await self.session.execute(
+            update(User).where(User.id == user_id).values(password_hash=password_hash).returning(User.id)
+        )
+        updated = result.scalar_one_or_none() is not None
+        await self._commit()
+        return updated
@@ -1,9 +1,15 @@
+import asyncio
 import uuid
 from datetime import datetime
+from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func, text, bindparam
 from app.repositories.base import BaseRepository
 from app.models import UserSession
+from app.session_cache import SESSION_REVOKED_CHANNEL, session_cache
+
+# Sprawdzane przy każdym żądaniu z nieznanym JTI (poza cache sesji) - zapytanie zbudowane raz
+SESSION_BY_ID = select(UserSession).where(UserSession.id == bindparam("jti"))
 
 class UserSessionRepository(BaseRepository[UserSession]):
     def __init__(self, session: AsyncSession):
@@ -18,14 +24,87 @@ class UserSessionRepository(BaseRepository[UserSession]):
         return await self.create(session_data)
 
     async def get_session(self, jti: uuid.UUID) -> UserSession | None:
-        result = await self.session.execute(select(UserSession).where(UserSession.id == jti))
+        result = await self.session.execute(SESSION_BY_ID, {"jti": jti})
         return result.scalar_one_or_none()
 
     async def deactivate_session(self, jti: uuid.UUID) -> bool:
-        session = await self.get_session(jti)
-        if not session:
-            return False
-        
-        session.is_active = False
-        await self.session.commit()
-        return True
+        """Zwraca False, jeśli sesja nie istnieje albo była już nieaktywna."""
+        result = await self.session.execute(
+            update(UserSession)
+            .where(UserSession.id == jti, UserSession.is_active.is_(True))
+            .values(is_active=False)
+            .returning(UserSession.id)
+        )
+        deactivated = result.scalar_one_or_none() is not None
+        if deactivated:
+            await self._notify_revoked([jti])
+        await self._commit()
+        session_cache.invalidate(jti)
+        return deactivated
+
+    async def _notify_revoked(self, jtis: List[uuid.UUID]) -> None:
+        # NOTIFY jest dostarczany pozostałym workerom dopiero po commicie transakcji
+        if jtis:
+            await self.session.execute(
+                text("SELECT pg_notify(:channel, jti) FROM unnest(CAST(:jtis AS text[])) AS jti"),
+                {"channel": SESSION_REVOKED_CHANNEL, "jtis": [str(j) for j in jtis]},
+            )
+
+    async def enforce_session_cap(self, user_id: uuid.UUID, max_active: int) -> List[uuid.UUID]:
+        """
+        Dezaktywuje najstarsze aktywne sesje użytkownika tak, aby po utworzeniu
+        nowej było ich najwyżej `max_active`. Zwraca JTI dezaktywowanych sesji.
+        """
+        if max_active <= 0:
+            return []
+        oldest = (
+            select(UserSession.id)
+            .where(UserSession.user_id == user_id, UserSession.is_active.is_(True),
+                   UserSession.expires_at > func.now())
+            .order_by(UserSession.created_at.desc())
+            .offset(max_active - 1)
+        )
+        result = await self.session.execute(
+            update(UserSession)
+            .where(UserSession.id.in_(oldest))
+            .values(is_active=False)
+            .returning(UserSession.id)
+        )
+        revoked = list(result.scalars().all())
+        await self._notify_revoked(revoked)
+        for jti in revoked:
+            session_cache.invalidate(jti)
+        return revoked
+
+    async def purge_expired_batch(self, batch_size: int) -> int:
+        # Krótkie transakcje po ctid zamiast jednego dużego DELETE (bez długich blokad)
+        result = await self.session.execute(
+            text("""
+                DELETE FROM user_sessions
+                WHERE ctid = ANY(ARRAY(
+                    SELECT ctid FROM user_sessions WHERE expires_at < NOW() LIMIT :batch_size
+                ))
+            """),
+            {"batch_size": batch_size},
+        )
+        await self._commit()
+        return result.rowcount
+
+    async def purge_expired(self, batch_size: int = 1000, pause_s: float = 0.05) -> int:
+        """Usuwa wygasłe sesje (również unieważnione) paczkami; zwraca liczbę usuniętych wierszy."""
+        deleted = 0
+        while True:
+            count = await self.purge_expired_batch(batch_size)
+            deleted += count
+            if count < batch_size:
+                return deleted
+            await asyncio.sleep(pause_s)
+
+    async def get_table_stats(self) -> dict:
+        result = await self.session.execute(text("""
+            SELECT pg_total_relation_size('user_sessions') AS total_bytes,
+                   GREATEST(c.reltuples, 0)::bigint AS estimated_rows
+            FROM pg_class c WHERE c.oid = 'user_sessions'::regclass
+        """))
+        row = result.one()
+        return {"total_bytes": row.total_bytes, "estimated_rows": row.estimated_rows}
@@ -1,42 +1,56 @@
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import List, NamedTuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert
-from app.repositories.base import BaseRepository
+from app.repositories.base import BaseRepository, bulk_upsert
+from app.repositories.weather_forecast_run import WeatherForecastRunRepository
 from app.models import WeatherForecast
 
+class ForecastPoint(NamedTuple):
+    """Pojedynczy termin prognozy rozpakowany z wydania (zgodny z WeatherForecastResponse)."""
+    ice_rink_id: uuid.UUID
+    weather_provider_id: uuid.UUID
+    forecast_time: datetime
+    temperature_min: float
+    temperature_max: float
+    humidity: Optional[float]
+
 class WeatherForecastRepository(BaseRepository[WeatherForecast]):
     def __init__(self, session: AsyncSession):
         super().__init__(WeatherForecast, session)
 
-    async def bulk_upsert(self, forecasts_data: List[dict]):
-        if not forecasts_data:
-            return
-        
-        stmt = insert(WeatherForecast).values(forecasts_data)
-        update_stmt = stmt.on_conflict_do_update(
-            # Ten index musi istnieć w bazie danych. Skrypt go nie tworzył,
-            # więc na razie użyjemy pól.
+    async def bulk_upsert(self, forecasts_data: List[dict]) -> int:
+        # Wymaga unikalnego indeksu uq_weather_forecasts_ice_rink_time (setup_database.sql)
+        count = await bulk_upsert(
+            self.session,
+            WeatherForecast,
+            forecasts_data,
             index_elements=['ice_rink_id', 'forecast_time'],
-            set_={
-                'temperature_min': stmt.excluded.temperature_min,
-                'temperature_max': stmt.excluded.temperature_max,
-                'humidity': stmt.excluded.humidity,
-            }
+            update_columns=['weather_provider_id', 'temperature_min', 'temperature_max', 'humidity'],
         )
-        await self.session.execute(update_stmt)
-        await self.session.commit()
+        await self._commit()
+        return count
 
     async def get_forecasts_for_rink(
         self,
         rink_id: uuid.UUID,
         days: int = 7
-    ) -> List[WeatherForecast]:
+    ) -> List[ForecastPoint | WeatherForecast]:
         now = datetime.now(timezone.utc)
         end_date = now + timedelta(days=days)
 
+        # Najnowsze wydanie prognozy obejmujące lodowisko - jeden wiersz zamiast wiersza na termin
+        run = await WeatherForecastRunRepository(self.session).get_latest_run_for_rink(rink_id)
+        if run:
+            humidity = run.humidity or [None] * len(run.forecast_times)
+            return [
+                ForecastPoint(rink_id, run.weather_provider_id, t, t_min, t_max, h)
+                for t, t_min, t_max, h in zip(run.forecast_times, run.temperature_min, run.temperature_max, humidity)
+                if now <= t <= end_date
+            ]
+
+        # Dane sprzed wersjonowania prognoz
         query = (
             select(WeatherForecast)
             .where(
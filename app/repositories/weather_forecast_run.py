@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.repositories.base import BaseRepository, bulk_upsert
+from app.models import WeatherForecastRun
+
+# Zmienne przechowywane w wydaniu prognozy jako tablice
+RUN_VARIABLES = ('temperature_min', 'temperature_max', 'humidity')
+
+def run_to_arrays(run: WeatherForecastRun) -> Dict[str, np.ndarray]:
+    """
+    Rozpakowuje wydanie prognozy do tablic NumPy (bez tworzenia obiektu na każdy termin).
+    `forecast_time` jest zwracane jako datetime64[s] w UTC, zmienne jako float32 (NaN dla braków).
+    """
+    size = len(run.forecast_times)
+    arrays = {
+        "forecast_time": np.fromiter(
+            (int(t.timestamp()) for t in run.forecast_times), dtype=np.int64, count=size
+        ).astype("datetime64[s]"),
+    }
+    for name in RUN_VARIABLES:
+        values = getattr(run, name)
+        if values is None:
+            arrays[name] = np.full(size, np.nan, dtype=np.float32)
+        elif None in values:
+            arrays[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float32)
+        else:
+            arrays[name] = np.array(values, dtype=np.float32)
+    return arrays
+
+class WeatherForecastRunRepository(BaseRepository[WeatherForecastRun]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(WeatherForecastRun, session)
+
+    async def save_runs(self, runs: List[dict]) -> int:
+        count = await bulk_upsert(
+            self.session,
+            WeatherForecastRun,
+            runs,
+            index_elements=['weather_provider_id', 'geo_cell', 'issued_at'],
+            update_columns=['ice_rink_ids', 'forecast_times', *RUN_VARIABLES],
+        )
+        await self._commit()
+        return count
+
+    async def get_latest_run_for_rink(self, rink_id: uuid.UUID) -> Optional[WeatherForecastRun]:
+        query = (
+            select(WeatherForecastRun)
+            .where(WeatherForecastRun.ice_rink_ids.contains([rink_id]))
+            .order_by(WeatherForecastRun.issued_at.desc())
+            .limit(1)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def get_runs_for_rink(
+        self,
+        rink_id: uuid.UUID,
+        issued_from: Optional[datetime] = None,
+        issued_to: Optional[datetime] = None,
+    ) -> List[WeatherForecastRun]:
+        query = (
+            select(WeatherForecastRun)
+            .where(WeatherForecastRun.ice_rink_ids.contains([rink_id]))
+            .order_by(WeatherForecastRun.issued_at.asc())
+        )
+        if issued_from:
+            query = query.where(WeatherForecastRun.issued_at >= issued_from)
+        if issued_to:
+            query = query.where(WeatherForecastRun.issued_at <= issued_to)
+        result = await self.session.execute(query)
+        return result.scalars().all()
@@ -5,11 +5,14 @@ from app.deps import (get_user_repo, get_bearer_token, get_session_repo,
                         get_current_user_payload)
 from app.repositories.user import UserRepository
 from app.repositories.user_session import UserSessionRepository
+from app.repositories.base import unit_of_work
 from app.security import (verify_password, create_access_token, 
                             create_refresh_token, decode_token)
 from app.schemas import LoginRequest, RefreshRequest, TokenResponse, TokenData, UserResponse
 from app.errors import http_401
+from app.config import get_settings
 
+settings = get_settings()
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 @router.post("/login", response_model=TokenResponse)
@@ -19,7 +22,9 @@ async def login(
     session_repo: UserSessionRepository = Depends(get_session_repo)
 ):
     user = await user_repo.get_by_username(payload.username)
-    if not user or not verify_password(payload.password, user.password_hash):
+    # Kończymy transakcję odczytu, aby nie trzymać połączenia z puli w kolejce do bcrypt
+    await user_repo.session.commit()
+    if not user or not await verify_password(payload.password, user.password_hash):
         http_401("Incorrect username or password")
 
     # Tworzymy tokeny, które teraz zawierają unikalny identyfikator 'jti'
@@ -36,8 +41,10 @@ async def login(
     exp = token_payload.get("exp")
     expires_at = datetime.fromtimestamp(exp, tz=timezone.utc)
     
-    # Tworzymy nową, aktywną sesję w bazie danych
-    await session_repo.create_session(jti=jti, user_id=user.id, expires_at=expires_at)
+    # Tworzymy nową, aktywną sesję w bazie danych (najstarsze ponad limit są dezaktywowane)
+    async with unit_of_work(session_repo.session):
+        await session_repo.enforce_session_cap(user.id, settings.session_max_per_user)
+        await session_repo.create_session(jti=jti, user_id=user.id, expires_at=expires_at)
 
     return TokenResponse(
         data=TokenData(
@@ -4,11 +4,12 @@ from typing import Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
-from app.deps import get_rink_repo, get_ticket_repo, get_measurement_repo, require_role_with_org_check
+from app.deps import get_read_rink_repo, get_read_ticket_repo, get_read_measurement_repo, require_role_with_org_check
 from app.repositories.ice_rink import IceRinkRepository
 from app.repositories.service_ticket import ServiceTicketRepository
 from app.repositories.measurement import MeasurementRepository
 from app.schemas import StandardResponse
+from app.sla import sla_monitor
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
@@ -18,6 +19,7 @@ class KpiResponse(BaseModel):
     connected_ice_rinks: int
     active_tickets: int
     critical_tickets: int
+    sla_breached_tickets: int
     avg_ice_temperature: Optional[float] = None
     total_energy_consumption: Optional[float] = None
     energy_savings: Optional[float] = None
@@ -38,9 +40,9 @@ async def get_dashboard_kpi(
     organization_id: Optional[uuid.UUID] = Query(None),
     time_range: str = Query("7d", regex="^(1d|7d|30d|90d)$"),
     user_payload: dict = Depends(require_role_with_org_check("admin", "operator", "client")),
-    rink_repo: IceRinkRepository = Depends(get_rink_repo),
-    ticket_repo: ServiceTicketRepository = Depends(get_ticket_repo),
-    measurement_repo: MeasurementRepository = Depends(get_measurement_repo)
+    rink_repo: IceRinkRepository = Depends(get_read_rink_repo),
+    ticket_repo: ServiceTicketRepository = Depends(get_read_ticket_repo),
+    measurement_repo: MeasurementRepository = Depends(get_read_measurement_repo)
 ):
     """Get dashboard KPI data"""
     # Determine organization filter
@@ -56,10 +58,15 @@ async def get_dashboard_kpi(
     active_rinks = len([r for r in rinks if r.status == "active"])
     connected_rinks = len([r for r in rinks if r.ssp_status == "connected"])
     
-    # Get ticket counts
-    tickets, total_tickets = await ticket_repo.get_paginated_list()
-    active_tickets = len([t for t in tickets if t.status in ["new", "assigned", "in_progress"]])
-    critical_tickets = len([t for t in tickets if t.priority == "critical" and t.status != "closed"])
+    # Get ticket counts (one grouped query instead of counting a single page of tickets)
+    ticket_stats = await ticket_repo.get_stats(filters)
+    active_tickets = ticket_stats["open"]
+    critical_tickets = ticket_stats["by_priority"]["critical"] - ticket_stats["by_status_priority"]["closed"]["critical"]
+    # Przekroczenia SLA z monitora w pamięci; bez nasłuchu - zapytanie po indeksie częściowym
+    if sla_monitor.ready:
+        sla_breaches = sla_monitor.breach_counts(org_id)
+    else:
+        sla_breaches = await ticket_repo.count_sla_breaches(org_id)
     
     # Calculate time range
     days = {"1d": 1, "7d": 7, "30d": 30, "90d": 90}[time_range]
@@ -70,28 +77,17 @@ async def get_dashboard_kpi(
     total_energy = None
     
     if rinks:
-        # Get latest measurements for average temperature
-        latest_measurements = []
-        for rink in rinks:
-            measurement = await measurement_repo.get_latest_for_rink(rink.id)
-            if measurement:
-                latest_measurements.append(measurement.ice_temperature)
-        
-        if latest_measurements:
-            avg_temp = sum(latest_measurements) / len(latest_measurements)
-        
-        # Get energy consumption data
-        energy_measurements = []
-        for rink in rinks:
-            measurements, _ = await measurement_repo.get_measurements_for_rink(
-                rink.id, start_date=start_date, limit=1000
-            )
-            for m in measurements:
-                if m.energy_consumption:
-                    energy_measurements.append(m.energy_consumption)
+        # Jedno zapytanie na wszystkie lodowiska (wcześniej kilka zapytań na każde lodowisko - N+1)
+        rink_ids = [rink.id for rink in rinks]
+        latest = await measurement_repo.get_latest_for_rinks(rink_ids)
+        latest_temperatures = [m.ice_temperature for m in latest.values()]
+        if latest_temperatures:
+            avg_temp = sum(latest_temperatures) / len(latest_temperatures)
         
-        if energy_measurements:
-            total_energy = sum(energy_measurements)
+        # Zużycie energii w zakresie czasu - suma liczona w bazie
+        energy = await measurement_repo.sum_energy_for_rinks(rink_ids, start_date)
+        if energy:
+            total_energy = sum(energy.values())
     
     return StandardResponse(
         data=KpiResponse(
@@ -100,6 +96,7 @@ async def get_dashboard_kpi(
             connected_ice_rinks=connected_rinks,
             active_tickets=active_tickets,
             critical_tickets=critical_tickets,
+            sla_breached_tickets=sum(sla_breaches.values()),
             avg_ice_temperature=avg_temp,
             total_energy_consumption=total_energy,
             energy_savings=0.0,  # Would need AI calculations
@@ -112,8 +109,8 @@ async def get_dashboard_map(
     organization_id: Optional[uuid.UUID] = Query(None),
     status_filter: Optional[str] = Query(None),
     user_payload: dict = Depends(require_role_with_org_check("admin", "operator", "client")),
-    rink_repo: IceRinkRepository = Depends(get_rink_repo),
-    measurement_repo: MeasurementRepository = Depends(get_measurement_repo)
+    rink_repo: IceRinkRepository = Depends(get_read_rink_repo),
+    measurement_repo: MeasurementRepository = Depends(get_read_measurement_repo)
 ):
     """Get ice rinks data for map display"""
     # Determine organization filter
@@ -128,13 +125,12 @@ async def get_dashboard_map(
     
     rinks, _ = await rink_repo.get_paginated_list(filters=filters)
     
+    latest = await measurement_repo.get_latest_for_rinks([rink.id for rink in rinks])
     map_data = []
     for rink in rinks:
         # Get current temperature
-        current_temp = None
-        measurement = await measurement_repo.get_latest_for_rink(rink.id)
-        if measurement:
-            current_temp = measurement.ice_temperature
+        measurement = latest.get(rink.id)
+        current_temp = measurement.ice_temperature if measurement else None
         
         map_data.append(MapIceRinkResponse(
             id=rink.id,
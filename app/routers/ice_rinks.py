@@ -4,9 +4,12 @@ import httpx
 from typing import List
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query
-from app.deps import require_role, get_rink_repo, get_weather_forecast_repo
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.deps import require_role, get_rink_repo, get_read_rink_repo, get_read_weather_forecast_repo
 from app.repositories.ice_rink import IceRinkRepository
 from app.repositories.weather_forecast import WeatherForecastRepository
+from app.filters import ListQuery, list_query
 from app.schemas import (IceRinkCreate, IceRinkUpdate, IceRinkResponse,
                            IceRinkDetailResponse, PaginatedResponse, WeatherForecastResponse,
                            SspTestResponse)
@@ -17,7 +20,8 @@ router = APIRouter(prefix="/api/ice-rinks", tags=["ice-rinks"])
 async def list_ice_rinks(
     page: int = 1,
     limit: int = 20,
-    repo: IceRinkRepository = Depends(get_rink_repo),
+    query: ListQuery = Depends(list_query(IceRinkRepository.list_options)),
+    repo: IceRinkRepository = Depends(get_read_rink_repo),
     user_payload: dict = Depends(require_role("admin", "operator", "client"))
 ):
     offset = (page - 1) * limit
@@ -25,14 +29,18 @@ async def list_ice_rinks(
     if user_payload.get("role") == "client":
         filters["organization_id"] = uuid.UUID(user_payload.get("organization_id"))
 
-    rinks, total = await repo.get_paginated_list(skip=offset, limit=limit, filters=filters)
-    return PaginatedResponse(
+    rinks, total = await repo.get_paginated_list(skip=offset, limit=limit, filters=filters, list_query=query)
+    response = PaginatedResponse(
         page=page, limit=limit, total=total,
         pages=(total + limit - 1) // limit if limit > 0 else 0,
         has_next=page * limit < total,
         has_prev=page > 1,
         items=rinks
     )
+    # Wybrane pola (`fields=`) nie pasują do pełnego schematu odpowiedzi
+    if query.fields:
+        return JSONResponse(jsonable_encoder(response))
+    return response
 
 @router.post("", response_model=IceRinkResponse, status_code=201)
 async def create_ice_rink(
@@ -46,7 +54,8 @@ async def create_ice_rink(
 @router.get("/{rink_id}", response_model=IceRinkDetailResponse)
 async def get_ice_rink(
     rink_id: uuid.UUID,
-    repo: IceRinkRepository = Depends(get_rink_repo),
+    repo: IceRinkRepository = Depends(get_read_rink_repo),
+    forecast_repo: WeatherForecastRepository = Depends(get_read_weather_forecast_repo),
     user_payload: dict = Depends(require_role("admin", "operator", "client"))
 ):
     rink = await repo.get_by_id_with_details(rink_id)
@@ -55,8 +64,12 @@ async def get_ice_rink(
     
     if user_payload.get("role") == "client" and str(rink.organization_id) != user_payload.get("organization_id"):
         raise HTTPException(status_code=403, detail="Forbidden")
-        
-    return rink
+
+    detail = IceRinkDetailResponse.model_validate(rink)
+    detail.weather_forecasts = [
+        WeatherForecastResponse.model_validate(f) for f in await forecast_repo.get_forecasts_for_rink(rink_id)
+    ]
+    return detail
 
 @router.put("/{rink_id}", response_model=IceRinkResponse)
 async def update_ice_rink(
@@ -74,7 +87,7 @@ async def update_ice_rink(
 async def get_weather_forecasts_for_rink(
     rink_id: uuid.UUID,
     days: int = Query(7, ge=1, le=7),
-    repo: WeatherForecastRepository = Depends(get_weather_forecast_repo),
+    repo: WeatherForecastRepository = Depends(get_read_weather_forecast_repo),
     _=Depends(require_role("admin", "operator", "client"))
 ):
     forecasts = await repo.get_forecasts_for_rink(rink_id=rink_id, days=days)
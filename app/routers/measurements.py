@@ -7,11 +7,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from openpyxl import Workbook
 
-from app.deps import require_role, get_measurement_repo, get_rink_repo
-from app.repositories.measurement import MeasurementRepository
+from app.config import get_settings
+from app.deps import require_role, get_read_measurement_repo, get_read_rink_repo, statement_timeout
+from app.repositories.measurement import MeasurementRepository, MEASUREMENT_FIELDS
 from app.repositories.ice_rink import IceRinkRepository
 from app.schemas import MeasurementResponse, PaginatedResponse
+from app.utils import paginated_json
 
+settings = get_settings()
 router = APIRouter(prefix="/api/ice-rinks/{rink_id}/measurements", tags=["measurements"])
 
 @router.get("", response_model=PaginatedResponse[MeasurementResponse])
@@ -21,25 +24,20 @@ async def list_measurements(
     limit: int = 100,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
-    repo: MeasurementRepository = Depends(get_measurement_repo),
+    repo: MeasurementRepository = Depends(get_read_measurement_repo),
     _=Depends(require_role("admin", "operator", "client"))
 ):
     offset = (page - 1) * limit
-    measurements, total = await repo.get_measurements_for_rink(
+    rows, total = await repo.get_measurement_rows_for_rink(
         rink_id=rink_id, skip=offset, limit=limit, start_date=start_date, end_date=end_date
     )
-    return PaginatedResponse(
-        page=page, limit=limit, total=total,
-        pages=(total + limit - 1) // limit if limit > 0 else 0,
-        has_next=page * limit < total,
-        has_prev=page > 1,
-        items=measurements
-    )
+    # Szybka ścieżka: krotki z bazy (float zamiast Decimal) prosto do orjson, bez obiektów ORM i Pydantic
+    return paginated_json(page, limit, total, [dict(zip(MEASUREMENT_FIELDS, row)) for row in rows])
 
 @router.get("/latest", response_model=MeasurementResponse)
 async def get_latest_measurement(
     rink_id: uuid.UUID,
-    repo: MeasurementRepository = Depends(get_measurement_repo),
+    repo: MeasurementRepository = Depends(get_read_measurement_repo),
     _=Depends(require_role("admin", "operator", "client"))
 ):
     measurement = await repo.get_latest_for_rink(rink_id)
@@ -47,13 +45,13 @@ async def get_latest_measurement(
         raise HTTPException(status_code=404, detail="No measurements found for this ice rink")
     return measurement
 
-@router.get("/export")
+@router.get("/export", dependencies=[Depends(statement_timeout(settings.db_export_statement_timeout_ms, read_only=True))])
 async def export_measurements(
     rink_id: uuid.UUID,
     format: str = Query("csv", enum=["csv", "json", "xlsx"]),
     limit: int = 1000,
-    measurement_repo: MeasurementRepository = Depends(get_measurement_repo),
-    rink_repo: IceRinkRepository = Depends(get_rink_repo),
+    measurement_repo: MeasurementRepository = Depends(get_read_measurement_repo),
+    rink_repo: IceRinkRepository = Depends(get_read_rink_repo),
     _=Depends(require_role("admin", "operator", "client"))
 ):
     rink = await rink_repo.get_by_id(rink_id)
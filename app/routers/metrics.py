@@ -0,0 +1,20 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, Response
+
+from app.config import get_settings
+from app.errors import http_401
+from app.metrics import render
+
+settings = get_settings()
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Metryki w formacie tekstowym Prometheusa (opcjonalnie chronione tokenem METRICS_TOKEN)."""
+    if settings.metrics_token and not secrets.compare_digest(authorization or "", f"Bearer {settings.metrics_token}"):
+        http_401("Invalid metrics token")
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
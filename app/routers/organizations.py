@@ -1,7 +1,10 @@
 import uuid
 from fastapi import APIRouter, Depends, HTTPException
-from app.deps import require_role, get_org_repo
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.deps import require_role, get_org_repo, get_read_org_repo
 from app.repositories.organization import OrganizationRepository
+from app.filters import ListQuery, list_query
 from app.schemas import (OrganizationCreate, OrganizationUpdate, OrganizationResponse,
                            PaginatedResponse)
 
@@ -11,18 +14,23 @@ router = APIRouter(prefix="/api/organizations", tags=["organizations"])
 async def list_organizations(
     page: int = 1,
     limit: int = 20,
-    repo: OrganizationRepository = Depends(get_org_repo),
+    query: ListQuery = Depends(list_query(OrganizationRepository.list_options)),
+    repo: OrganizationRepository = Depends(get_read_org_repo),
     _=Depends(require_role("admin", "operator"))
 ):
     offset = (page - 1) * limit
-    orgs, total = await repo.get_paginated_list(skip=offset, limit=limit)
-    return PaginatedResponse(
+    orgs, total = await repo.get_paginated_list(skip=offset, limit=limit, list_query=query)
+    response = PaginatedResponse(
         page=page, limit=limit, total=total,
         pages=(total + limit - 1) // limit,
         has_next=page * limit < total,
         has_prev=page > 1,
         items=orgs
     )
+    # Wybrane pola (`fields=`) nie pasują do pełnego schematu odpowiedzi
+    if query.fields:
+        return JSONResponse(jsonable_encoder(response))
+    return response
 
 @router.post("", response_model=OrganizationResponse, status_code=201)
 async def create_organization(
@@ -38,7 +46,7 @@ async def create_organization(
 @router.get("/{org_id}", response_model=OrganizationResponse)
 async def get_organization(
     org_id: uuid.UUID,
-    repo: OrganizationRepository = Depends(get_org_repo),
+    repo: OrganizationRepository = Depends(get_read_org_repo),
     _=Depends(require_role("admin", "operator"))
 ):
     org = await repo.get_by_id(org_id)
@@ -0,0 +1,54 @@
+import time
+import uuid
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.deps import require_role, get_read_db_session, statement_timeout
+from app.errors import http_503
+from app.repositories.search import SearchRepository
+from app.schemas import SearchResponse
+
+settings = get_settings()
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+SEARCH_TYPES = ("tickets", "comments", "ice_rinks", "organizations")
+# SQLSTATE query_canceled - przekroczony statement_timeout
+QUERY_CANCELED = "57014"
+
+@router.get("", response_model=SearchResponse,
+            dependencies=[Depends(statement_timeout(settings.search_statement_timeout_ms, read_only=True))])
+async def search(
+    q: str = Query(..., min_length=2, max_length=200),
+    types: Optional[List[Literal["tickets", "comments", "ice_rinks", "organizations"]]] = Query(None),
+    limit: int = Query(10, ge=1, le=50, description="Maximum results per type"),
+    organization_id: Optional[uuid.UUID] = None,
+    session: AsyncSession = Depends(get_read_db_session),
+    user_payload: dict = Depends(require_role("admin", "operator", "client"))
+):
+    """
+    Wyszukiwanie pełnotekstowe (zgłoszenia, komentarze) i przybliżone (nazwy lodowisk i organizacji).
+    Wyniki pogrupowane według typu, w każdej grupie od najlepiej dopasowanych.
+    """
+    is_client = user_payload.get("role") == "client"
+    if is_client:
+        organization_id = uuid.UUID(user_payload.get("organization_id"))
+
+    repo = SearchRepository(session, settings.search_similarity_threshold)
+    started = time.perf_counter()
+    results = {}
+    try:
+        for name in dict.fromkeys(types or SEARCH_TYPES):
+            if name == "comments":
+                results[name] = await repo.search_comments(q, limit, organization_id, include_internal=not is_client)
+            else:
+                results[name] = await getattr(repo, f"search_{name}")(q, limit, organization_id)
+    except DBAPIError as exc:
+        if getattr(exc.orig, "sqlstate", None) != QUERY_CANCELED:
+            raise
+        http_503("Search took too long, refine the query", code="SEARCH_TIMEOUT",
+                 details={"timeout_ms": settings.search_statement_timeout_ms})
+
+    return SearchResponse(query=q, took_ms=round((time.perf_counter() - started) * 1000, 1), **results)
@@ -1,31 +1,137 @@
 # (Nowy plik app/routers/service_tickets.py)
 
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.deps import require_role, get_ticket_repo, get_current_user_payload
-from app.repositories.service_ticket import ServiceTicketRepository
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.deps import require_role, get_ticket_repo, get_current_user_payload, get_read_ticket_repo
+from app.config import get_settings
+from app.errors import http_400, http_404
+from app.repositories.service_ticket import ServiceTicketRepository, BulkSelectionTooLarge, status_change_comment
+from app.filters import ListQuery, list_query
 from app.schemas import (ServiceTicketCreate, ServiceTicketUpdate, ServiceTicketResponse,
                            ServiceTicketDetailResponse, TicketCommentCreate, TicketCommentResponse,
-                           PaginatedResponse, ServiceTicketStatusUpdate, ServiceTicketAssign)
+                           PaginatedResponse, ServiceTicketStatusUpdate, ServiceTicketAssign,
+                           ServiceTicketStatsResponse, CursorPage, ServiceTicketBulkSelection,
+                           ServiceTicketBulkStatusUpdate, ServiceTicketBulkAssign, ServiceTicketBulkClose,
+                           BulkTicketOperationResponse)
+from app.utils import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/api/service-tickets", tags=["service-tickets"])
+settings = get_settings()
+
+async def ticket_filters(
+    status: Optional[List[Literal['new', 'assigned', 'in_progress', 'resolved', 'closed']]] = Query(None),
+    priority: Optional[List[Literal['low', 'medium', 'high', 'critical']]] = Query(None),
+    ice_rink_id: Optional[uuid.UUID] = None,
+    organization_id: Optional[uuid.UUID] = None,
+    assigned_to: Optional[uuid.UUID] = None,
+    user_payload: dict = Depends(get_current_user_payload)
+) -> dict:
+    """Filtry listy i statystyk zgłoszeń; klient widzi wyłącznie zgłoszenia swojej organizacji."""
+    filters = {}
+    if status:
+        filters["status"] = status
+    if priority:
+        filters["priority"] = priority
+    if ice_rink_id:
+        filters["ice_rink_id"] = ice_rink_id
+    if organization_id:
+        filters["organization_id"] = organization_id
+    if assigned_to:
+        filters["assigned_to_id"] = assigned_to
+    if user_payload.get("role") == "client":
+        filters["organization_id"] = uuid.UUID(user_payload.get("organization_id"))
+    return filters
 
 @router.get("", response_model=PaginatedResponse[ServiceTicketResponse])
 async def list_service_tickets(
     page: int = 1,
     limit: int = 20,
-    repo: ServiceTicketRepository = Depends(get_ticket_repo),
+    filters: dict = Depends(ticket_filters),
+    query: ListQuery = Depends(list_query(ServiceTicketRepository.list_options)),
+    repo: ServiceTicketRepository = Depends(get_read_ticket_repo),
     _=Depends(require_role("admin", "operator", "client"))
 ):
     offset = (page - 1) * limit
-    tickets, total = await repo.get_paginated_list(skip=offset, limit=limit)
-    return PaginatedResponse(
+    tickets, total = await repo.get_paginated_list(skip=offset, limit=limit, filters=filters, list_query=query)
+    response = PaginatedResponse(
         page=page, limit=limit, total=total,
         pages=(total + limit - 1) // limit if limit > 0 else 0,
         has_next=page * limit < total,
         has_prev=page > 1,
         items=tickets
     )
+    # Wybrane pola (`fields=`) nie pasują do pełnego schematu odpowiedzi
+    if query.fields:
+        return JSONResponse(jsonable_encoder(response))
+    return response
+
+@router.get("/stats", response_model=ServiceTicketStatsResponse)
+async def get_service_ticket_stats(
+    filters: dict = Depends(ticket_filters),
+    repo: ServiceTicketRepository = Depends(get_read_ticket_repo),
+    _=Depends(require_role("admin", "operator", "client"))
+):
+    return await repo.get_stats(filters)
+
+def _bulk_selection(payload: ServiceTicketBulkSelection) -> dict:
+    """Wybór zgłoszeń operacji grupowej jako argumenty `bulk_update`."""
+    if (payload.ticket_ids is None) == (payload.filter is None):
+        http_400("Provide either ticket_ids or filter", code="INVALID_BULK_SELECTION")
+    if payload.ticket_ids is not None:
+        if not 0 < len(payload.ticket_ids) <= settings.ticket_bulk_max:
+            http_400(f"ticket_ids must contain 1-{settings.ticket_bulk_max} ids", code="BULK_LIMIT_EXCEEDED")
+        return {"ticket_ids": payload.ticket_ids}
+    filters = payload.filter.model_dump(exclude_none=True)
+    # Pusty filtr objąłby wszystkie zgłoszenia
+    if not filters:
+        http_400("filter must contain at least one condition", code="INVALID_BULK_SELECTION")
+    return {"filters": filters}
+
+async def _run_bulk(repo: ServiceTicketRepository, user_payload: dict, payload: ServiceTicketBulkSelection,
+                    values: dict, comment) -> BulkTicketOperationResponse:
+    selection = _bulk_selection(payload)
+    try:
+        results = await repo.bulk_update(user_payload.get("sub"), values, comment, settings.ticket_bulk_max, **selection)
+    except BulkSelectionTooLarge:
+        http_400(f"filter matches more than {settings.ticket_bulk_max} tickets", code="BULK_LIMIT_EXCEEDED")
+    return BulkTicketOperationResponse(
+        matched=sum(r["result"] != "not_found" for r in results),
+        updated=sum(r["result"] == "updated" for r in results),
+        results=results,
+    )
+
+@router.post("/bulk/status", response_model=BulkTicketOperationResponse)
+async def bulk_update_ticket_status(
+    payload: ServiceTicketBulkStatusUpdate,
+    repo: ServiceTicketRepository = Depends(get_ticket_repo),
+    user_payload: dict = Depends(require_role("admin", "operator"))
+):
+    return await _run_bulk(repo, user_payload, payload, {"status": payload.status},
+                           lambda row: status_change_comment(row.status, payload.status, payload.comment))
+
+@router.post("/bulk/assign", response_model=BulkTicketOperationResponse)
+async def bulk_assign_tickets(
+    payload: ServiceTicketBulkAssign,
+    repo: ServiceTicketRepository = Depends(get_ticket_repo),
+    user_payload: dict = Depends(require_role("admin", "operator"))
+):
+    username = await repo.get_username(payload.assigned_to_id)
+    if username is None:
+        http_404("User to assign not found")
+    return await _run_bulk(repo, user_payload, payload, {"assigned_to_id": payload.assigned_to_id},
+                           lambda row: f"Zgłoszenie przypisano do użytkownika: {username}.")
+
+@router.post("/bulk/close", response_model=BulkTicketOperationResponse)
+async def bulk_close_tickets(
+    payload: ServiceTicketBulkClose,
+    repo: ServiceTicketRepository = Depends(get_ticket_repo),
+    user_payload: dict = Depends(require_role("admin", "operator"))
+):
+    return await _run_bulk(repo, user_payload, payload, {"status": "closed"},
+                           lambda row: status_change_comment(row.status, "closed", payload.comment))
 
 @router.post("", response_model=ServiceTicketResponse, status_code=status.HTTP_201_CREATED)
 async def create_service_ticket(
@@ -50,13 +156,33 @@ async def create_service_ticket(
 @router.get("/{ticket_id}", response_model=ServiceTicketDetailResponse)
 async def get_service_ticket(
     ticket_id: uuid.UUID,
-    repo: ServiceTicketRepository = Depends(get_ticket_repo),
+    comments_limit: int = Query(10, ge=0, le=100),
+    repo: ServiceTicketRepository = Depends(get_read_ticket_repo),
+    _=Depends(require_role("admin", "operator", "client"))
+):
+    details = await repo.get_ticket_with_details(ticket_id, comments_limit)
+    if not details:
+        raise HTTPException(status_code=404, detail="Service ticket not found")
+    ticket, comments, comments_total = details
+    return ServiceTicketDetailResponse(
+        **ServiceTicketResponse.model_validate(ticket).model_dump(),
+        comments=comments,
+        comments_total=comments_total,
+    )
+
+@router.get("/{ticket_id}/comments", response_model=CursorPage[TicketCommentResponse])
+async def list_ticket_comments(
+    ticket_id: uuid.UUID,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    repo: ServiceTicketRepository = Depends(get_read_ticket_repo),
     _=Depends(require_role("admin", "operator", "client"))
 ):
-    ticket = await repo.get_ticket_with_details(ticket_id)
-    if not ticket:
+    before = decode_cursor(cursor) if cursor else None
+    comments, next_key = await repo.get_comments_page(ticket_id, limit, before)
+    if not comments and not await repo.ticket_exists(ticket_id):
         raise HTTPException(status_code=404, detail="Service ticket not found")
-    return ticket
+    return CursorPage(limit=limit, next_cursor=encode_cursor(*next_key) if next_key else None, items=comments)
 
 @router.put("/{ticket_id}", response_model=ServiceTicketResponse)
 async def update_service_ticket(
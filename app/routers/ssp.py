@@ -4,12 +4,13 @@ from fastapi import APIRouter, Depends, HTTPException, Header
 from typing import Optional
 from pydantic import BaseModel
 
-from app.deps import get_measurement_repo, get_ticket_repo, get_rink_repo, require_role
+from app.deps import get_measurement_repo, get_ticket_repo, get_rink_repo, require_role, get_read_rink_repo
 from app.repositories.measurement import MeasurementRepository
 from app.repositories.service_ticket import ServiceTicketRepository
 from app.repositories.ice_rink import IceRinkRepository
 from app.schemas import StandardResponse
 from app.errors import http_401, http_404
+from app.metrics import SSP_INGESTED_ROWS
 
 router = APIRouter(prefix="/api/ssp", tags=["ssp"])
 
@@ -70,6 +71,7 @@ async def receive_ssp_data(
     }
     
     await measurement_repo.create(measurement_data)
+    SSP_INGESTED_ROWS.labels("measurements").inc()
     
     return StandardResponse(
         data={
@@ -109,6 +111,7 @@ async def receive_ssp_alarms(
     }
     
     ticket = await ticket_repo.create(ticket_data)
+    SSP_INGESTED_ROWS.labels("alarms").inc()
     
     return StandardResponse(
         data={
@@ -119,7 +122,7 @@ async def receive_ssp_alarms(
 
 @router.get("/connections", response_model=StandardResponse[list])
 async def get_ssp_connections(
-    rink_repo: IceRinkRepository = Depends(get_rink_repo),
+    rink_repo: IceRinkRepository = Depends(get_read_rink_repo),
     _=Depends(require_role("admin", "operator"))
 ):
     """Get status of all SSP connections"""
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
-from app.deps import require_role, get_db_session, get_system_config_repo
+from app.deps import require_role, get_db_session, get_system_config_repo, get_job_run_repo
 from app.repositories.system import SystemRepository
 from app.repositories.system_config import SystemConfigRepository
-from app.schemas import SystemConfigUpdate, SystemConfigResponse
+from app.repositories.job_run import JobRunRepository
+from app.scheduler import scheduler
+from app.session_cache import session_cache
+from app.sla import sla_monitor
+from app.notifications import notification_dispatcher
+from app.audit import audit_log
+from app.slow_queries import slow_query_log
+from app.repositories.notification import NotificationRepository
+from app.db import engine, read_engine, pool_stats, read_replica
+from app.schemas import SystemConfigUpdate, SystemConfigResponse, JobInfoResponse, JobRunResponse
 
 router = APIRouter(prefix="/api/system", tags=["system"])
 
@@ -25,12 +34,36 @@ async def system_status(
         status_data = { "database_status": "error" }
     else:
         status_data = await repo.get_full_status()
+    # Statystyki dotyczą workera, który obsłużył zapytanie
+    status_data["session_cache"] = session_cache.stats()
+    status_data["read_replica"] = read_replica.stats()
+    status_data["sla_monitor"] = sla_monitor.stats()
+    status_data["audit_log"] = audit_log.stats()
+    status_data["slow_queries"] = slow_query_log.stats()
+    if is_db_ok:
+        status_data["notifications"] = {**await NotificationRepository(session).get_queue_stats(),
+                                        **notification_dispatcher.stats()}
+    status_data["db_pool"] = {"primary": pool_stats(engine), "replica": pool_stats(read_engine)}
 
     return {
         "success": True,
         "data": status_data,
     }
 
+@router.get("/slow-queries")
+async def list_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    _=Depends(require_role("admin"))
+):
+    """
+    Returns the most recent slow SQL statements recorded by this worker and the
+    EXPLAIN plans captured for statements that were slow repeatedly.
+    """
+    return {
+        "success": True,
+        "data": slow_query_log.snapshot(limit),
+    }
+
 @router.get("/config", response_model=List[SystemConfigResponse])
 async def get_system_config(
     repo: SystemConfigRepository = Depends(get_system_config_repo),
@@ -57,3 +90,42 @@ async def update_system_config_value(
     if not updated_config:
         raise HTTPException(status_code=404, detail=f"Configuration key '{key}' not found.")
     return updated_config
+
+@router.get("/jobs", response_model=List[JobInfoResponse])
+async def list_jobs(
+    repo: JobRunRepository = Depends(get_job_run_repo),
+    _=Depends(require_role("admin"))
+):
+    """
+    Lists registered background jobs with their most recent run.
+    """
+    return [
+        JobInfoResponse(name=job.name, interval_seconds=job.seconds, last_run=await repo.get_last_run(job.name))
+        for job in scheduler.jobs
+    ]
+
+@router.get("/jobs/runs", response_model=List[JobRunResponse])
+async def list_job_runs(
+    job_name: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    repo: JobRunRepository = Depends(get_job_run_repo),
+    _=Depends(require_role("admin"))
+):
+    """
+    Returns the run history (duration and outcome) of background jobs.
+    """
+    return await repo.list_runs(job_name=job_name, limit=limit)
+
+@router.post("/jobs/{job_name}/run", status_code=202)
+async def trigger_job(
+    job_name: str,
+    _=Depends(require_role("admin"))
+):
+    """
+    Triggers a background job immediately. Runs at most once across all workers.
+    """
+    if not scheduler.get_job(job_name):
+        raise HTTPException(status_code=404, detail=f"Job '{job_name}' not found.")
+    if not await scheduler.trigger(job_name):
+        raise HTTPException(status_code=409, detail=f"Job '{job_name}' is already running.")
+    return {"success": True, "data": {"job_name": job_name, "status": "started"}}
@@ -1,7 +1,8 @@
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.deps import require_role, get_user_repo, get_current_user_payload
+from app.deps import require_role, get_user_repo, get_current_user_payload, get_read_user_repo
 from app.repositories.user import UserRepository
+from app.filters import ListQuery, list_query
 from app.schemas import (UserCreate, UserResponse, UserUpdate,
                          PasswordUpdate)
 from app.security import verify_password
@@ -13,7 +14,8 @@ router = APIRouter(prefix="/api/users", tags=["users"])
 async def list_users(
     page: int = 1,
     limit: int = 20,
-    repo: UserRepository = Depends(get_user_repo),
+    query: ListQuery = Depends(list_query(UserRepository.list_options)),
+    repo: UserRepository = Depends(get_read_user_repo),
     user_payload: dict = Depends(require_role("admin", "operator"))
 ):
     offset = (page - 1) * limit
@@ -22,10 +24,11 @@ async def list_users(
         # Konwersja stringa z tokena na UUID dla repozytorium
         filters["organization_id"] = uuid.UUID(user_payload.get("organization_id"))
 
-    users, total = await repo.get_paginated_list(skip=offset, limit=limit, filters=filters)
+    users, total = await repo.get_paginated_list(skip=offset, limit=limit, filters=filters, list_query=query)
     
     paginated_data = paginate(total, page, limit)
-    paginated_data['users'] = [UserResponse.model_validate(u) for u in users]
+    # Przy `fields=` repozytorium zwraca już słowniki z wybranymi kolumnami
+    paginated_data['users'] = users if query.fields else [UserResponse.model_validate(u) for u in users]
     
     return {"success": True, "data": paginated_data}
 
@@ -46,7 +49,7 @@ async def create_user(
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: uuid.UUID,
-    repo: UserRepository = Depends(get_user_repo),
+    repo: UserRepository = Depends(get_read_user_repo),
     _=Depends(require_role("admin", "operator"))
 ):
     user = await repo.get_by_id(user_id)
@@ -95,7 +98,7 @@ async def update_password(
         if not payload.current_password:
             raise HTTPException(status_code=422, detail="Field 'current_password' is required for non-admin users.")
         
-        if not verify_password(payload.current_password, target_user.password_hash):
+        if not await verify_password(payload.current_password, target_user.password_hash):
             raise HTTPException(status_code=400, detail="Incorrect current password.")
         
         await repo.update_password(user_id, payload.new_password)
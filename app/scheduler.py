@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import get_settings
+from app.db import engine, SessionLocal
+from app.metrics import observe_job
+from app.repositories.job_run import JobRunRepository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+JobFunc = Callable[[], Awaitable[Optional[dict]]]
+
+@dataclass
+class Job:
+    name: str
+    func: JobFunc
+    seconds: int
+    wait_first: bool = False
+
+def lock_key(job_name: str) -> int:
+    """Stabilny 64-bitowy klucz blokady doradczej (advisory lock) dla nazwy zadania."""
+    digest = hashlib.blake2b(f"ice_db.job.{job_name}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+class JobScheduler:
+    """
+    Harmonogram zadań cyklicznych bezpieczny przy wielu procesach i węzłach.
+
+    Każdy worker co `SCHEDULER_POLL_S` próbuje przejąć blokadę doradczą PostgreSQL
+    danego zadania (`pg_try_advisory_lock`). Tylko proces, który ją uzyska, sprawdza
+    w `job_runs`, czy minął interwał od ostatniego uruchomienia, i ewentualnie
+    wykonuje zadanie. Blokada jest trzymana na osobnym połączeniu przez cały czas
+    wykonania i zwalniana automatycznie, gdy proces padnie.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._manual_runs: Set[asyncio.Task] = set()
+        self._started_at: Optional[datetime] = None
+        self.host = f"{socket.gethostname()}:{os.getpid()}"
+
+    def job(self, name: str, seconds: int, wait_first: bool = False):
+        """Rejestruje zadanie - odpowiednik `repeat_every(seconds=..., wait_first=...)`."""
+        def decorator(func: JobFunc) -> JobFunc:
+            self._jobs[name] = Job(name=name, func=func, seconds=seconds, wait_first=wait_first)
+            return func
+        return decorator
+
+    @property
+    def jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def get_job(self, name: str) -> Optional[Job]:
+        return self._jobs.get(name)
+
+    def start(self) -> None:
+        self._started_at = datetime.now(timezone.utc)
+        for job in self._jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"job:{job.name}"))
+
+    async def stop(self) -> None:
+        tasks = self._tasks + list(self._manual_runs)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def trigger(self, name: str) -> bool:
+        """
+        Ręczne uruchomienie zadania w tle (z pominięciem interwału).
+        Zwraca False, jeśli zadanie jest właśnie wykonywane przez dowolny proces.
+        """
+        job = self._jobs[name]
+        # Blokadę na chwilę przejmują też zwykłe sprawdzenia harmonogramu, stąd kilka prób
+        for attempt in range(5):
+            conn = await self._try_lock(job.name)
+            if conn is not None:
+                break
+            await asyncio.sleep(0.1 * (attempt + 1))
+        else:
+            return False
+        task = asyncio.create_task(self._run_locked(job, "manual", conn))
+        self._manual_runs.add(task)
+        task.add_done_callback(self._manual_runs.discard)
+        return True
+
+    async def _loop(self, job: Job) -> None:
+        poll = max(1, min(job.seconds, settings.scheduler_poll_s))
+        while True:
+            try:
+                conn = await self._try_lock(job.name)
+                if conn is not None:
+                    due = False
+                    try:
+                        due = await self._is_due(job)
+                    finally:
+                        if not due:
+                            await self._release(job.name, conn)
+                    if due:
+                        await self._run_locked(job, "schedule", conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Scheduler tick failed for job '{job.name}'")
+            await asyncio.sleep(poll)
+
+    async def _is_due(self, job: Job) -> bool:
+        now = datetime.now(timezone.utc)
+        async with SessionLocal() as session:
+            last_run = await JobRunRepository(session).get_last_run(job.name)
+        if last_run is None:
+            return not job.wait_first or (now - self._started_at).total_seconds() >= job.seconds
+        return (now - last_run.started_at).total_seconds() >= job.seconds
+
+    async def _run_locked(self, job: Job, trigger: str, conn: AsyncConnection) -> None:
+        try:
+            async with SessionLocal() as session:
+                repo = JobRunRepository(session)
+                run = await repo.start_run(job.name, trigger, self.host)
+                logger.info(f"Job '{job.name}' started ({trigger}) on {self.host}.")
+                started = time.perf_counter()
+                try:
+                    details = await job.func()
+                except Exception as e:
+                    logger.exception(f"Job '{job.name}' failed")
+                    observe_job(job.name, "error", time.perf_counter() - started)
+                    await repo.finish_run(run.id, run.started_at, "error", error_message=str(e))
+                else:
+                    observe_job(job.name, "success", time.perf_counter() - started)
+                    await repo.finish_run(run.id, run.started_at, "success", details=details)
+                    logger.info(f"Job '{job.name}' finished.")
+        finally:
+            await self._release(job.name, conn)
+
+    async def _try_lock(self, job_name: str) -> Optional[AsyncConnection]:
+        conn = await engine.connect()
+        try:
+            acquired = (await conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": lock_key(job_name)}
+            )).scalar()
+            await conn.commit()
+        except BaseException:
+            # Przerwane po pg_try_advisory_lock blokada mogła zostać założona - sesja jest zamykana
+            await conn.invalidate()
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return None
+        return conn
+
+    async def _release(self, job_name: str, conn: AsyncConnection) -> None:
+        released = False
+        try:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": lock_key(job_name)})
+            await conn.commit()
+            released = True
+        finally:
+            if not released:
+                # Blokada sesji wróciłaby do puli z połączeniem - zamknięcie sesji serwera ją zwalnia
+                await conn.invalidate()
+            await conn.close()
+
+scheduler = JobScheduler()
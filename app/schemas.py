@@ -26,6 +26,12 @@ class PaginatedResponse(BaseModel, Generic[T]):
     has_prev: bool
     items: List[T]
 
+class CursorPage(BaseModel, Generic[T]):
+    """Strona stronicowana kluczem (keyset); `next_cursor` przekazuje się jako `cursor` w kolejnym żądaniu."""
+    limit: int
+    next_cursor: Optional[str] = None
+    items: List[T]
+
 class StandardPaginatedResponse(BaseModel, Generic[T]):
     success: bool = True
     data: PaginatedResponse[T]
@@ -210,10 +216,16 @@ class TicketCommentBase(BaseModel):
 class TicketCommentCreate(TicketCommentBase):
     pass
 
+class CommentAuthor(BaseModel):
+    id: uuid.UUID
+    display_name: str
+
 class TicketCommentResponse(TicketCommentBase, OrmBase):
     id: uuid.UUID
     user_id: uuid.UUID
     created_at: datetime
+    # Nie `user` - relacja ORM ładowana leniwie; przy obiektach ORM pole zostaje puste
+    author: Optional[CommentAuthor] = None
 
 class ServiceTicketBase(BaseModel):
     category: str
@@ -238,9 +250,20 @@ class ServiceTicketResponse(ServiceTicketBase, OrmBase):
     assigned_to_id: Optional[uuid.UUID] = None
     status: str
     source: str
+    sla_target: Optional[datetime] = None
+    sla_breached_at: Optional[datetime] = None
+    resolved_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+class ServiceTicketStatsResponse(BaseModel):
+    total: int
+    open: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+    by_status_priority: Dict[str, Dict[str, int]]
+
 class ServiceTicketStatusUpdate(BaseModel):
     status: Literal['new', 'assigned', 'in_progress', 'resolved', 'closed']
     comment: Optional[str] = None
@@ -248,6 +271,41 @@ class ServiceTicketStatusUpdate(BaseModel):
 class ServiceTicketAssign(BaseModel):
     assigned_to_id: uuid.UUID
 
+class ServiceTicketBulkFilter(BaseModel):
+    status: Optional[List[Literal['new', 'assigned', 'in_progress', 'resolved', 'closed']]] = None
+    priority: Optional[List[Literal['low', 'medium', 'high', 'critical']]] = None
+    category: Optional[str] = None
+    source: Optional[Literal['manual', 'automatic', 'system']] = None
+    ice_rink_id: Optional[uuid.UUID] = None
+    organization_id: Optional[uuid.UUID] = None
+    assigned_to_id: Optional[uuid.UUID] = None
+
+class ServiceTicketBulkSelection(BaseModel):
+    """Zgłoszenia objęte operacją: lista `ticket_ids` albo `filter` (dokładnie jedno z nich)."""
+    ticket_ids: Optional[List[uuid.UUID]] = None
+    filter: Optional[ServiceTicketBulkFilter] = None
+
+class ServiceTicketBulkStatusUpdate(ServiceTicketBulkSelection):
+    status: Literal['new', 'assigned', 'in_progress', 'resolved', 'closed']
+    comment: Optional[str] = None
+
+class ServiceTicketBulkAssign(ServiceTicketBulkSelection):
+    assigned_to_id: uuid.UUID
+
+class ServiceTicketBulkClose(ServiceTicketBulkSelection):
+    comment: Optional[str] = None
+
+class BulkTicketResult(BaseModel):
+    id: uuid.UUID
+    ticket_number: Optional[str] = None
+    result: Literal['updated', 'unchanged', 'not_found']
+    status: Optional[str] = None
+
+class BulkTicketOperationResponse(BaseModel):
+    matched: int
+    updated: int
+    results: List[BulkTicketResult]
+
 # =================
 #  Detailed Responses (with relations)
 # =================
@@ -257,7 +315,9 @@ class IceRinkDetailResponse(IceRinkResponse):
     weather_forecasts: List[WeatherForecastResponse] = []
 
 class ServiceTicketDetailResponse(ServiceTicketResponse):
+    # Tylko najnowsze komentarze; pełna lista: GET /api/service-tickets/{id}/comments
     comments: List[TicketCommentResponse] = []
+    comments_total: int = 0
 
 # =================
 #  Authentication
@@ -293,6 +353,26 @@ class SystemConfigResponse(OrmBase):
     updated_at: datetime
     updated_by_id: Optional[uuid.UUID] = None
 
+# =================
+#  Background Jobs
+# =================
+class JobRunResponse(OrmBase):
+    id: uuid.UUID
+    job_name: str
+    trigger: str
+    status: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    host: Optional[str] = None
+    details: Dict[str, Any] = {}
+    error_message: Optional[str] = None
+
+class JobInfoResponse(BaseModel):
+    name: str
+    interval_seconds: int
+    last_run: Optional[JobRunResponse] = None
+
 # =================
 #  SSP Connection Test
 # =================
@@ -302,3 +382,48 @@ class SspTestResponse(BaseModel):
     response_time_ms: float
     last_communication: Optional[datetime] = None
     error_message: Optional[str] = None
+
+# =================
+#  Search
+# =================
+class TicketSearchHit(BaseModel):
+    id: uuid.UUID
+    ticket_number: str
+    title: str
+    status: str
+    priority: str
+    organization_id: uuid.UUID
+    ice_rink_id: uuid.UUID
+    created_at: datetime
+    rank: float
+
+class CommentSearchHit(BaseModel):
+    id: uuid.UUID
+    ticket_id: uuid.UUID
+    ticket_number: str
+    snippet: str
+    created_at: datetime
+    rank: float
+
+class IceRinkSearchHit(BaseModel):
+    id: uuid.UUID
+    name: str
+    location: str
+    status: str
+    organization_id: uuid.UUID
+    rank: float
+
+class OrganizationSearchHit(BaseModel):
+    id: uuid.UUID
+    name: str
+    type: str
+    status: str
+    rank: float
+
+class SearchResponse(BaseModel):
+    query: str
+    took_ms: float
+    tickets: List[TicketSearchHit] = []
+    comments: List[CommentSearchHit] = []
+    ice_rinks: List[IceRinkSearchHit] = []
+    organizations: List[OrganizationSearchHit] = []
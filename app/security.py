@@ -1,4 +1,6 @@
+import asyncio
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -10,15 +12,30 @@ from app.config import get_settings
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 settings = get_settings()
 
-def get_password_hash(password: str) -> str:
+# bcrypt zwalnia GIL, więc wątki liczą hashe równolegle, nie blokując pętli zdarzeń.
+# Liczba wątków ogranicza współbieżność - nadmiarowe logowania czekają w kolejce puli.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.password_hash_workers),
+    thread_name_prefix="password-hash",
+)
+
+def _hash_sync(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_password(plain_password: str, password_hash: str) -> bool:
+def _verify_sync(plain_password: str, password_hash: str) -> bool:
     try:
         return pwd_context.verify(plain_password, password_hash)
     except Exception:
         return False
 
+async def get_password_hash(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, _hash_sync, password)
+
+async def verify_password(plain_password: str, password_hash: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(
+        _hash_executor, _verify_sync, plain_password, password_hash
+    )
+
 # Zaktualizowana funkcja, która ZAWSZE dodaje JTI
 def _create_token(sub: str, role: str, organization_id: Optional[str], expires_delta: timedelta, token_type: str) -> str:
     now = datetime.now(tz=timezone.utc)
@@ -43,3 +60,12 @@ def create_refresh_token(sub: str, role: str, organization_id: Optional[str], ex
 
 def decode_token(token: str) -> dict:
     return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+
+def token_subject(authorization: Optional[str]) -> Optional[str]:
+    """Zwraca `sub` z nagłówka Authorization albo None (bez zgłaszania błędów)."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return decode_token(authorization.split(" ", 1)[1].strip()).get("sub")
+    except Exception:
+        return None
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Kanał NOTIFY, którym workery informują się nawzajem o unieważnionych sesjach (payload = JTI)
+SESSION_REVOKED_CHANNEL = "session_revoked"
+
+class SessionCache:
+    """
+    Ograniczony (LRU) cache zweryfikowanych sesji w pamięci procesu.
+
+    Wpis żyje najwyżej `ttl` sekund i nigdy dłużej niż `exp` tokena. Unieważnienia
+    z innych workerów przychodzą przez LISTEN/NOTIFY; gdy nasłuch nie działa,
+    cache jest pomijany, więc opóźnienie unieważnienia jest ograniczone.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[uuid.UUID, float]" = OrderedDict()
+        self.listening = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revocations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0 and self.listening
+
+    def is_valid(self, jti: uuid.UUID) -> bool:
+        if not self.enabled:
+            return False
+        expires_at = self._entries.get(jti)
+        if expires_at is None or expires_at <= time.time():
+            if expires_at is not None:
+                del self._entries[jti]
+            self.misses += 1
+            return False
+        self._entries.move_to_end(jti)
+        self.hits += 1
+        return True
+
+    def add(self, jti: uuid.UUID, token_exp: float) -> None:
+        if not self.enabled:
+            return
+        self._entries[jti] = min(time.time() + self.ttl, float(token_exp))
+        self._entries.move_to_end(jti)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, jti: uuid.UUID) -> None:
+        if self._entries.pop(jti, None) is not None:
+            self.revocations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "revocations": self.revocations,
+        }
+
+class RevocationListener:
+    """Nasłuchuje kanału SESSION_REVOKED_CHANNEL na osobnym połączeniu asyncpg."""
+
+    def __init__(self, cache: SessionCache, reconnect_delay: float = 5.0):
+        self.cache = cache
+        self.reconnect_delay = reconnect_delay
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="session-revocation-listener")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.cache.listening = False
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            self.cache.invalidate(uuid.UUID(payload))
+        except ValueError:
+            logger.warning(f"Ignoring malformed session revocation payload: {payload!r}")
+
+    async def _run(self) -> None:
+        dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(SESSION_REVOKED_CHANNEL, self._on_notify)
+                # Wpisy sprzed nasłuchu mogły przegapić unieważnienia
+                self.cache.clear()
+                self.cache.listening = True
+                await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Session revocation listener error: {e!r}")
+            finally:
+                self.cache.listening = False
+                self.cache.clear()
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+session_cache = SessionCache(max_size=settings.session_cache_size, ttl=settings.session_cache_ttl_s)
+revocation_listener = RevocationListener(session_cache)
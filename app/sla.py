@@ -0,0 +1,287 @@
+import asyncio
+import heapq
+import json
+import logging
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.config import get_settings
+from app.db import SessionLocal
+from app.notifications import notification_dispatcher
+from app.rate_limiter import backoff_delay
+from app.repositories.base import unit_of_work
+from app.repositories.notification import NotificationRepository
+from app.repositories.service_ticket import ServiceTicketRepository, OPEN_STATUSES, TICKET_PRIORITIES
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Kanał NOTIFY wyzwalacza notify_ticket_sla_change (payload = JSON ze stanem zgłoszenia)
+TICKET_SLA_CHANNEL = "ticket_sla"
+
+BreachHandler = Callable[[dict], Awaitable[None]]
+
+@dataclass
+class SlaEntry:
+    deadline: datetime
+    organization_id: uuid.UUID
+    priority: str
+
+def breach_notifications(event: dict) -> List[dict]:
+    """Powiadomienia o przekroczeniu SLA: w aplikacji dla organizacji i e-mail do przypisanego serwisanta."""
+    title = f"Przekroczono SLA zgłoszenia {event['ticket_number']}"
+    message = (f"Zgłoszenie {event['ticket_number']} (priorytet {event['priority']}) nie zostało rozwiązane "
+               f"do {event['sla_target']:%Y-%m-%d %H:%M %Z}.")
+    metadata = {"ticket_id": str(event["id"]), "event": "sla_breach"}
+    notifications = [{"type": "in_app", "user_id": event["assigned_to_id"], "organization_id": event["organization_id"],
+                      "title": title, "message": message, "meta": metadata}]
+    if event["assigned_to_id"]:
+        notifications.append({"type": "email", "user_id": event["assigned_to_id"],
+                              "organization_id": event["organization_id"],
+                              "title": title, "message": message, "meta": metadata})
+    return notifications
+
+class SlaMonitor:
+    """
+    Terminy SLA otwartych zgłoszeń w pamięci workera - kopiec (heap) według `sla_target`.
+
+    Stan jest odbudowywany z bazy przy starcie (i po utracie połączenia), a potem
+    aktualizowany powiadomieniami wyzwalacza z każdego zapisu zgłoszenia. Pętla czeka
+    dokładnie do najbliższego terminu; po jego upływie zgłoszenie trafia do liczników
+    przekroczeń, a eskalację (sla_breached_at, powiadomienia w outboxie, zarejestrowane
+    handlery) wykonuje jeden worker - ten, któremu uda się oznaczyć wiersz w bazie.
+    Nieudana eskalacja (np. chwilowa awaria bazy) jest ponawiana z wykładniczym backoffem.
+    """
+
+    def __init__(self, reconnect_delay: float = 5.0, retry_base_s: float = 5.0, retry_cap_s: float = 300.0):
+        self.reconnect_delay = reconnect_delay
+        self.retry_base_s = retry_base_s
+        self.retry_cap_s = retry_cap_s
+        self._entries: Dict[uuid.UUID, SlaEntry] = {}
+        self._heap: List[Tuple[datetime, uuid.UUID]] = []
+        self._breached: Set[uuid.UUID] = set()
+        self._breach_counts: Counter = Counter()
+        self._handlers: List[BreachHandler] = []
+        # Przekroczone zgłoszenia, których eskalacja się nie udała, i termin kolejnej próby
+        self._retry: Set[uuid.UUID] = set()
+        self._retry_at: Optional[datetime] = None
+        self._retry_attempt = 0
+        self._pending: Optional[List[str]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.ready = False
+        self.escalations = 0
+
+    def on_breach(self, handler: BreachHandler) -> BreachHandler:
+        """Rejestruje handler eskalacji - wywoływany raz na przekroczony termin (w całym klastrze)."""
+        self._handlers.append(handler)
+        return handler
+
+    # --- Stan w pamięci ---
+
+    def apply(self, ticket_id: uuid.UUID, organization_id: uuid.UUID, priority: str, status: str,
+              sla_target: Optional[datetime]) -> None:
+        self.remove(ticket_id)
+        if status not in OPEN_STATUSES or sla_target is None:
+            return
+        self._entries[ticket_id] = SlaEntry(sla_target, organization_id, priority)
+        heapq.heappush(self._heap, (sla_target, ticket_id))
+        if self._heap[0][1] == ticket_id and self._wakeup is not None:
+            self._wakeup.set()
+
+    def remove(self, ticket_id: uuid.UUID) -> None:
+        # Wpis w kopcu zostaje i jest pomijany przy zdejmowaniu (lazy deletion)
+        entry = self._entries.pop(ticket_id, None)
+        if entry is not None and ticket_id in self._breached:
+            self._breached.discard(ticket_id)
+            self._breach_counts[(entry.organization_id, entry.priority)] -= 1
+
+    def pop_due(self, now: datetime) -> List[uuid.UUID]:
+        """Zdejmuje z kopca zgłoszenia po terminie i liczy je jako przekroczone."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, ticket_id = heapq.heappop(self._heap)
+            if self._is_stale(deadline, ticket_id):
+                continue
+            entry = self._entries[ticket_id]
+            self._breached.add(ticket_id)
+            self._breach_counts[(entry.organization_id, entry.priority)] += 1
+            due.append(ticket_id)
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._heap = [(e.deadline, i) for i, e in self._entries.items() if i not in self._breached]
+            heapq.heapify(self._heap)
+        return due
+
+    def pop_retries(self, now: datetime) -> List[uuid.UUID]:
+        """Zgłoszenia do ponownej eskalacji, jeśli minął termin próby (bez zamkniętych w międzyczasie)."""
+        if not self._retry or self._retry_at > now:
+            return []
+        due = [ticket_id for ticket_id in self._retry if ticket_id in self._breached]
+        self._retry.clear()
+        return due
+
+    def schedule_retry(self, ticket_ids: List[uuid.UUID], now: datetime) -> None:
+        self._retry.update(ticket_ids)
+        delay = backoff_delay(self._retry_attempt, self.retry_base_s, self.retry_cap_s)
+        self._retry_attempt += 1
+        self._retry_at = now + timedelta(seconds=delay)
+
+    def next_deadline(self) -> Optional[datetime]:
+        while self._heap and self._is_stale(*self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _is_stale(self, deadline: datetime, ticket_id: uuid.UUID) -> bool:
+        entry = self._entries.get(ticket_id)
+        return entry is None or entry.deadline != deadline or ticket_id in self._breached
+
+    def breach_counts(self, organization_id: Optional[uuid.UUID] = None) -> Dict[str, int]:
+        """Otwarte zgłoszenia po terminie wg priorytetu - bez zapytania do bazy."""
+        counts = dict.fromkeys(TICKET_PRIORITIES, 0)
+        for (org_id, priority), count in self._breach_counts.items():
+            if organization_id is None or org_id == organization_id:
+                counts[priority] += count
+        return counts
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._heap.clear()
+        self._breached.clear()
+        self._breach_counts.clear()
+        # Odbudowa wczytuje przekroczone zgłoszenia ponownie - eskalują przy kolejnym pop_due
+        self._retry.clear()
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "open_with_deadline": len(self._entries),
+            "breached": len(self._breached),
+            "next_deadline": self.next_deadline(),
+            "escalations": self.escalations,
+            "escalation_retries": len(self._retry),
+        }
+
+    # --- Zadania w tle ---
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._listen(), name="sla-monitor-listener"),
+            asyncio.create_task(self._timer(), name="sla-monitor-timer"),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self.ready = False
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        # Podczas odbudowy powiadomienia czekają, aż stan z bazy zostanie wczytany
+        if self._pending is not None:
+            self._pending.append(payload)
+        else:
+            self._apply_payload(payload)
+
+    def _apply_payload(self, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            ticket_id = uuid.UUID(data["id"])
+            if "status" not in data:
+                self.remove(ticket_id)
+                return
+            sla_target = datetime.fromisoformat(data["sla_target"]) if data["sla_target"] else None
+            self.apply(ticket_id, uuid.UUID(data["organization_id"]), data["priority"], data["status"], sla_target)
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed ticket SLA payload: {payload!r}")
+
+    async def _rebuild(self) -> None:
+        self._pending = []
+        try:
+            async with SessionLocal() as session:
+                rows = await ServiceTicketRepository(session).get_open_sla_targets()
+            self.clear()
+            for ticket_id, organization_id, priority, sla_target in rows:
+                self.apply(ticket_id, organization_id, priority, "new", sla_target)
+            for payload in self._pending:
+                self._apply_payload(payload)
+        finally:
+            self._pending = None
+        self._wakeup.set()
+        logger.info(f"SLA monitor loaded {len(self._entries)} open tickets.")
+
+    async def _listen(self) -> None:
+        dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(TICKET_SLA_CHANNEL, self._on_notify)
+                # Zmiany sprzed nasłuchu mogły nie dotrzeć - stan wczytujemy od nowa
+                await self._rebuild()
+                self.ready = True
+                await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"SLA monitor listener error: {e!r}")
+            finally:
+                self.ready = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _timer(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = datetime.now(timezone.utc)
+            due = self.pop_due(now) + self.pop_retries(now)
+            if due:
+                try:
+                    await self._escalate(due)
+                    self._retry_attempt = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # Odbudowa stanu jest tylko po zerwaniu nasłuchu - zgłoszenia wracają do ponowienia
+                    logger.exception(f"SLA escalation of {len(due)} tickets failed, retrying")
+                    self.schedule_retry(due, datetime.now(timezone.utc))
+            deadline = self.next_deadline()
+            if self._retry and (deadline is None or self._retry_at < deadline):
+                deadline = self._retry_at
+            timeout = None if deadline is None else max(0.0, (deadline - datetime.now(timezone.utc)).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _escalate(self, ticket_ids: List[uuid.UUID]) -> None:
+        async with SessionLocal() as session:
+            async with unit_of_work(session):
+                events = await ServiceTicketRepository(session).claim_sla_breaches(ticket_ids)
+                # Powiadomienia zapisywane w tej samej transakcji co eskalacja (outbox)
+                await NotificationRepository(session).enqueue_many(
+                    [n for event in events for n in breach_notifications(event)]
+                )
+        if events:
+            notification_dispatcher.wake()
+        for event in events:
+            self.escalations += 1
+            logger.warning(f"SLA breached for ticket {event['ticket_number']} "
+                           f"(priority {event['priority']}, target {event['sla_target']:%Y-%m-%d %H:%M %Z}).")
+            for handler in self._handlers:
+                try:
+                    await handler(event)
+                except Exception:
+                    logger.exception(f"SLA breach handler {handler!r} failed")
+
+sla_monitor = SlaMonitor()
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import query_stats
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# EXPLAIN obsługuje tylko zapytania DML (nie SET, SHOW, LISTEN itp.)
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|MERGE|VALUES)\b", re.IGNORECASE)
+# EXPLAIN ANALYZE wykonuje zapytanie ponownie - tylko dla odczytów (dodatkowo w transakcji READ ONLY)
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+SHARE|FOR\s+NO\s+KEY)\b", re.IGNORECASE)
+MAX_SHAPE_LENGTH = 4000
+MAX_PENDING_EXPLAINS = 20
+# Nazwa instrukcji przygotowanej na czas EXPLAIN (jedno zadanie EXPLAIN na worker)
+EXPLAIN_STATEMENT = "slow_query_explain"
+
+# Zapytania zadania EXPLAIN (w tym samo ponowne wykonanie) nie trafiają do dziennika
+_explaining: ContextVar[bool] = ContextVar("slow_query_explaining", default=False)
+
+def redact(parameters, executemany: bool = False):
+    """Parametry bez wartości: typ (i długość sekwencji) każdego z nich."""
+    if executemany:
+        return f"{len(parameters)} rows"
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    return [_redact_value(value) for value in parameters or ()]
+
+def _redact_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+def is_read_only(statement: str) -> bool:
+    return bool(_READ_ONLY.match(statement)) and not _WRITES.search(statement)
+
+async def _execute_arguments(conn, parameters) -> str:
+    """
+    Argumenty EXECUTE jako literały SQL - EXECUTE nie przyjmuje parametrów wiązanych.
+    Wartości cytuje serwer (quote_nullable) według typów parametrów przygotowanej instrukcji.
+    """
+    if not parameters:
+        return ""
+    types = (await conn.exec_driver_sql(
+        "SELECT parameter_types::text[] FROM pg_prepared_statements WHERE name = $1", (EXPLAIN_STATEMENT,)
+    )).scalar_one()
+    quoted = " || ', ' || ".join(f"quote_nullable(CAST(${i} AS {type_}))" for i, type_ in enumerate(types, 1))
+    literals = (await conn.exec_driver_sql(f"SELECT {quoted}", parameters)).scalar_one()
+    return f"({literals})"
+
+class SlowQueryLog:
+    """
+    Dziennik wolnych zapytań SQL w pamięci workera.
+
+    Zapytanie trwające co najmniej `threshold_ms` trafia do bufora cyklicznego (ostatnie
+    `buffer_size` wpisów) z kształtem, parametrami bez wartości, czasem i trasą HTTP.
+    Kształt, który był wolny `explain_after` razy, dostaje plan z EXPLAIN (ANALYZE, BUFFERS)
+    wykonany w tle na tym samym silniku; plan jest odświeżany najwyżej raz na `plan_ttl_s`.
+    Plan jest ogólny (parametry jako $n), więc nie zawiera wartości parametrów.
+    """
+
+    def __init__(self, threshold_ms: float, buffer_size: int, explain_after: int, explain_timeout_ms: int,
+                 plan_ttl_s: float):
+        self.threshold_s = threshold_ms / 1000
+        self.explain_after = explain_after
+        self.explain_timeout_ms = explain_timeout_ms
+        self.plan_ttl_s = plan_ttl_s
+        self.entries: Deque[dict] = deque(maxlen=buffer_size)
+        # Liczba wolnych wykonań kształtu i ostatni plan kształtu
+        self._offenders: Dict[str, int] = {}
+        self._plans: Dict[str, dict] = {}
+        # Wartości parametrów są trzymane tylko do wykonania EXPLAIN
+        self._pending: Deque[Tuple[AsyncEngine, str, str, object]] = deque()
+        self._queued: Set[str] = set()
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.explained = 0
+        self.explain_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def instrument_engine(self, engine: AsyncEngine, pool: str) -> None:
+        # Czas zapytania mierzy query_stats (before_cursor_execute)
+        @event.listens_for(engine.sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            duration = query_stats.query_duration(context)
+            if duration >= self.threshold_s:
+                self.record(engine, pool, statement, parameters, executemany, duration)
+
+    def record(self, engine: AsyncEngine, pool: str, statement: str, parameters, executemany: bool,
+               duration_s: float) -> None:
+        if _explaining.get():
+            return
+        shape = query_stats.statement_shape(statement)[:MAX_SHAPE_LENGTH]
+        if len(self._offenders) >= 1000 and shape not in self._offenders:
+            self._offenders.clear()
+        count = self._offenders[shape] = self._offenders.get(shape, 0) + 1
+        self.recorded += 1
+        self.entries.append({
+            "timestamp": datetime.now(timezone.utc),
+            "route": query_stats.current_route(),
+            "pool": pool,
+            "duration_ms": round(duration_s * 1000, 2),
+            "shape": shape,
+            "parameters": redact(parameters, executemany),
+        })
+        if (self.running and not executemany and self.explain_after and count >= self.explain_after
+                and shape not in self._queued and len(self._pending) < MAX_PENDING_EXPLAINS
+                and _EXPLAINABLE.match(statement)):
+            plan = self._plans.get(shape)
+            if plan is None or time.monotonic() - plan["captured"] >= self.plan_ttl_s:
+                self._queued.add(shape)
+                self._pending.append((engine, shape, statement, parameters))
+                self._ready.set()
+
+    def start(self) -> None:
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="slow-query-explain")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._pending.clear()
+        self._queued.clear()
+
+    async def _run(self) -> None:
+        _explaining.set(True)
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._pending:
+                engine, shape, statement, parameters = self._pending.popleft()
+                try:
+                    await self._explain(engine, shape, statement, parameters)
+                except Exception as e:
+                    self.explain_errors += 1
+                    logger.warning(f"EXPLAIN of slow query failed: {e!r}")
+                finally:
+                    self._queued.discard(shape)
+
+    async def _explain(self, engine: AsyncEngine, shape: str, statement: str, parameters) -> None:
+        analyze = is_read_only(statement)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        started = time.perf_counter()
+        # Połączenie zamykane bez commit - transakcja jest wycofywana
+        async with engine.connect() as conn:
+            if analyze:
+                await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}")
+            # Plan ogólny pokazuje parametry jako $n - wartości (loginy, e-maile, tokeny) nie trafiają do planu.
+            # Dotyczy tylko instrukcji przygotowanych, stąd PREPARE + EXPLAIN EXECUTE.
+            await conn.exec_driver_sql("SET LOCAL plan_cache_mode = force_generic_plan")
+            await conn.exec_driver_sql(f"PREPARE {EXPLAIN_STATEMENT} AS {statement}")
+            try:
+                arguments = await _execute_arguments(conn, parameters)
+                result = await conn.exec_driver_sql(f"EXPLAIN ({options}) EXECUTE {EXPLAIN_STATEMENT}{arguments}")
+                plan = result.scalar()
+            finally:
+                # PREPARE żyje w sesji, nie w transakcji - połączenie nie może wrócić z nim do puli
+                await conn.rollback()
+                await conn.exec_driver_sql(f"DEALLOCATE {EXPLAIN_STATEMENT}")
+        self.explained += 1
+        self._plans[shape] = {
+            "captured": time.monotonic(),
+            "captured_at": datetime.now(timezone.utc),
+            "analyze": analyze,
+            "explain_ms": round((time.perf_counter() - started) * 1000, 2),
+            "plan": plan[0] if isinstance(plan, list) and plan else plan,
+        }
+
+    def snapshot(self, limit: int) -> dict:
+        """Najnowsze wpisy (od najnowszego) i plany kształtów, które w nich występują."""
+        entries: List[dict] = list(self.entries)[-limit:][::-1]
+        shapes = {entry["shape"] for entry in entries}
+        plans = [
+            {"shape": shape, "slow_count": self._offenders.get(shape, 0),
+             **{key: value for key, value in plan.items() if key != "captured"}}
+            for shape, plan in self._plans.items() if shape in shapes
+        ]
+        return {"threshold_ms": self.threshold_s * 1000, "entries": entries, "plans": plans, **self.stats()}
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "buffered": len(self.entries),
+            "recorded": self.recorded,
+            "explained": self.explained,
+            "explain_errors": self.explain_errors,
+            # W kolejce lub w trakcie wykonywania
+            "pending_explains": len(self._queued),
+        }
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.slow_query_ms,
+    buffer_size=settings.slow_query_buffer_size,
+    explain_after=settings.slow_query_explain_after,
+    explain_timeout_ms=settings.slow_query_explain_timeout_ms,
+    plan_ttl_s=settings.slow_query_plan_ttl_s,
+)
@@ -1,84 +1,183 @@
 import asyncio
+import time
 import httpx
+from collections import Counter
 from datetime import datetime, timezone
-from fastapi_utils.tasks import repeat_every
+from app.config import get_settings
 from app.db import SessionLocal
+from app.geo import centroid, group_by_cell
+from app.repositories.base import unit_of_work
+from app.rate_limiter import TokenBucket, backoff_delay
+from app.scheduler import scheduler
 from app.repositories.ice_rink import IceRinkRepository
 from app.repositories.weather_provider import WeatherProviderRepository
-from app.repositories.weather_forecast import WeatherForecastRepository
+from app.repositories.weather_forecast_run import WeatherForecastRunRepository
 from app.repositories.system_config import SystemConfigRepository
+from app.repositories.user_session import UserSessionRepository
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
-@repeat_every(seconds=60 * 60 * 3, wait_first=True)
+# Kody HTTP, przy których ponawiamy zapytanie (limit dostawcy, chwilowe błędy serwera)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class WeatherTaskError(RuntimeError):
+    """Błąd konfiguracji zadania (status już zapisany w system_config)."""
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+def _parse_run(data: dict) -> dict:
+    """Zamienia odpowiedź OpenWeatherMap na tablice wartości jednego wydania prognozy."""
+    items = sorted(data.get('list', []), key=lambda item: item['dt'])
+    return {
+        "forecast_times": [datetime.fromtimestamp(item['dt'], tz=timezone.utc) for item in items],
+        "temperature_min": [item['main']['temp'] for item in items],
+        "temperature_max": [item['main']['temp'] for item in items],
+        "humidity": [item['main'].get('humidity') for item in items],
+    }
+
+async def _fetch_forecast(client: httpx.AsyncClient, url: str, bucket: TokenBucket,
+                          failures: Counter, key) -> dict:
+    """
+    Pobiera jedną prognozę z ponowieniami (backoff z jitterem).
+    Każda nieudana próba jest zliczana w `failures` pod kluczem `key`.
+    """
+    retries = settings.weather_fetch_retries
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            failures[key] += 1
+            if attempt >= retries or not _is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, settings.weather_fetch_backoff_s)
+            logger.warning(f"Attempt {attempt + 1} failed for '{key}': {e!r}. Retrying in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+@scheduler.job("weather_forecasts", seconds=60 * 60 * 3, wait_first=True)
 async def fetch_weather_forecasts_task():
     logger.info("Running OpenWeatherMap forecast background task...")
-    
+    started = time.perf_counter()
+
     try:
         async with SessionLocal() as session:
             rink_repo = IceRinkRepository(session)
             provider_repo = WeatherProviderRepository(session)
-            forecast_repo = WeatherForecastRepository(session)
+            run_repo = WeatherForecastRunRepository(session)
             config_repo = SystemConfigRepository(session)
-            
+
             provider = await provider_repo.get_active_provider()
-            rinks, _ = await rink_repo.get_paginated_list(limit=1000)
-            
+            rinks = await rink_repo.get_all_with_coordinates()
+
             if not provider or provider.name != 'OpenWeatherMap' or not rinks:
                 status_msg = "error: No active OpenWeatherMap provider or no rinks found."
                 logger.warning(status_msg)
                 await config_repo.set_config_value("weather_api_status", status_msg)
-                return
-
-            has_errors = False
-            all_forecasts_to_save = []
-            async with httpx.AsyncClient() as client:
-                for rink in rinks:
-                    if not rink.latitude or not rink.longitude:
-                        continue
-                    
-                    url = provider.api_endpoint.format(lat=rink.latitude, lon=rink.longitude) + f"&appid={provider.api_key}"
-                    
-                    try:
-                        response = await client.get(url, timeout=10)
-                        response.raise_for_status()
-                        
-                        data = response.json()
-                        forecast_list = data.get('list', [])
-                        for item in forecast_list:
-                            forecast_data = {
-                                "ice_rink_id": rink.id,
-                                "weather_provider_id": provider.id,
-                                "forecast_time": datetime.fromtimestamp(item['dt'], tz=timezone.utc),
-                                "temperature_min": item['main']['temp'],
-                                "temperature_max": item['main']['temp'],
-                                "humidity": item['main']['humidity'],
-                            }
-                            all_forecasts_to_save.append(forecast_data)
-                        logger.info(f"Successfully fetched {len(forecast_list)} forecasts for rink '{rink.name}'.")
-
-                    except Exception as e:
-                        has_errors = True
-                        logger.error(f"An error occurred for rink '{rink.name}': {e}")
-                    
-                    await asyncio.sleep(1)
-
-            # --- KLUCZOWA POPRAWKA: Przywrócenie zapisu do bazy ---
-            if all_forecasts_to_save:
-                await forecast_repo.bulk_upsert(all_forecasts_to_save)
-                logger.info(f"Successfully saved/updated {len(all_forecasts_to_save)} forecast records in DB.")
-            
-            if has_errors:
-                await config_repo.set_config_value("weather_api_status", "degraded")
-            else:
-                await config_repo.set_config_value("weather_api_status", "ok")
-                await config_repo.set_config_value("weather_api_last_success", str(datetime.now()))
+                raise WeatherTaskError(status_msg)
+
+            concurrency = max(1, settings.weather_fetch_concurrency)
+            bucket = TokenBucket(
+                rate=provider.rate_limit or 60,
+                period=settings.weather_rate_limit_period_s,
+                capacity=concurrency,
+            )
+            semaphore = asyncio.Semaphore(concurrency)
+            failures: Counter = Counter()
 
+            # Jedno zapytanie do API na komórkę geograficzną, wynik trafia do wszystkich jej lodowisk
+            cells = group_by_cell(
+                rinks,
+                mode=settings.weather_geo_cell_mode,
+                precision=settings.weather_geo_cell_precision,
+            )
+            logger.info(f"Fetching forecasts for {len(rinks)} rinks using {len(cells)} API calls.")
+
+            # Wszystkie komórki z jednego przebiegu zadania mają wspólny czas wydania
+            issued_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+            async def fetch_for_cell(cell: str, cell_rinks: list) -> dict:
+                lat, lon = centroid(cell_rinks)
+                url = provider.api_endpoint.format(lat=lat, lon=lon) + f"&appid={provider.api_key}"
+                async with semaphore:
+                    data = await _fetch_forecast(client, url, bucket, failures, cell)
+                run = _parse_run(data)
+                logger.info(f"Successfully fetched {len(run['forecast_times'])} forecasts for cell '{cell}' ({len(cell_rinks)} rinks).")
+                return {
+                    "weather_provider_id": provider.id,
+                    "geo_cell": cell,
+                    "issued_at": issued_at,
+                    "latitude": lat,
+                    "longitude": lon,
+                    "ice_rink_ids": [r.id for r in cell_rinks],
+                    **run,
+                }
+
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with httpx.AsyncClient(timeout=settings.weather_fetch_timeout_s, limits=limits) as client:
+                results = await asyncio.gather(
+                    *(fetch_for_cell(cell, members) for cell, members in cells.items()),
+                    return_exceptions=True,
+                )
+
+            runs_to_save = []
+            failed_rinks = 0
+            for (cell, cell_rinks), result in zip(cells.items(), results):
+                if isinstance(result, Exception):
+                    failed_rinks += len(cell_rinks)
+                    names = ", ".join(r.name for r in cell_rinks)
+                    logger.error(f"An error occurred for cell '{cell}' ({names}) after {failures[cell]} failed attempt(s): {result}")
+                elif result["forecast_times"]:
+                    runs_to_save.append(result)
+
+            # Prognozy i statusy zapisujemy w jednej transakcji
+            async with unit_of_work(session):
+                # Jeden wiersz na komórkę i wydanie - historia prognoz nie jest nadpisywana
+                if runs_to_save:
+                    await run_repo.save_runs(runs_to_save)
+                    logger.info(f"Saving {len(runs_to_save)} forecast runs issued at {issued_at.isoformat()}.")
+
+                duration = time.perf_counter() - started
+                await config_repo.set_config_value("weather_api_last_duration", f"{duration:.2f}")
+                await config_repo.set_config_value("weather_api_failed_rinks", f"{failed_rinks}/{len(rinks)}")
+                if failed_rinks:
+                    await config_repo.set_config_value("weather_api_status", "degraded")
+                else:
+                    await config_repo.set_config_value("weather_api_status", "ok")
+                    await config_repo.set_config_value("weather_api_last_success", str(datetime.now()))
+
+    except WeatherTaskError:
+        raise
     except Exception as e:
         logger.critical(f"CRITICAL ERROR in background task: {e}", exc_info=True)
         async with SessionLocal() as session:
             config_repo = SystemConfigRepository(session)
             await config_repo.set_config_value("weather_api_status", f"critical_error: {e}")
+        raise
+
+    logger.info(f"Weather forecast task finished in {time.perf_counter() - started:.2f}s.")
+    # Podsumowanie trafia do job_runs.details
+    return {
+        "rinks": len(rinks),
+        "api_calls": len(cells),
+        "failed_rinks": failed_rinks,
+        "runs_saved": len(runs_to_save),
+    }
 
-    logger.info("Weather forecast task finished.")
+@scheduler.job("session_purge", seconds=settings.session_purge_interval_s)
+async def purge_expired_sessions_task():
+    started = time.perf_counter()
+    async with SessionLocal() as session:
+        deleted = await UserSessionRepository(session).purge_expired(settings.session_purge_batch_size)
+    duration = time.perf_counter() - started
+    logger.info(f"Purged {deleted} expired user sessions in {duration:.2f}s.")
+    return {
+        "deleted": deleted,
+        "rows_per_s": round(deleted / duration, 1) if duration > 0 else None,
+    }
@@ -0,0 +1,141 @@
+"""
+Benchmark: opóźnienie zapytań zmieniających dane bez audytu, z kolejką audytu (zapis w tle przez COPY)
+i - dla porównania - z zapisem wpisu audytu w każdym zapytaniu (INSERT + commit).
+
+Każdy tryb wysyła N zapytań POST /api/service-tickets/{id}/comments z zadaną współbieżnością.
+Po trybie z kolejką sprawdza, że w audit.audit_logs jest po jednym wpisie na zapytanie.
+Uruchomienie (na bazie testowej z kontem admin / admin123 - dane mają prefiks "bench-audit"):
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench.bench_audit --requests 2000 --concurrency 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import text
+
+from app.audit import MUTATING_METHODS, AuditLogger, AuditMiddleware, request_entry
+from app.config import get_settings
+from app.db import SessionLocal, engine
+from app.main import create_app
+from app.models import AuditLog
+
+USER_AGENT = "bench-audit"
+
+class InlineAuditMiddleware(AuditMiddleware):
+    """Wariant odrzucony: wpis audytu zapisywany w ścieżce zapytania (osobny INSERT + commit)."""
+
+    async def __call__(self, scope, receive, send):
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        await self.app(scope, receive, send_with_status)
+        entry = request_entry(scope, status_code, time.perf_counter() - started)
+        if entry is not None and scope["method"] in MUTATING_METHODS:
+            async with SessionLocal() as session:
+                session.add(AuditLog(**entry))
+                await session.commit()
+
+async def _seed() -> str:
+    async with SessionLocal() as session:
+        await _cleanup(session)
+        admin = (await session.execute(text("SELECT id, organization_id FROM users WHERE username = 'admin'"))).one()
+        rink_id = (await session.execute(text("""
+            INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by)
+            VALUES (:org, 'bench-audit', 'bench', 'bench', 100, :admin) RETURNING id
+        """), {"org": admin.organization_id, "admin": admin.id})).scalar_one()
+        ticket_id = (await session.execute(text("""
+            INSERT INTO service_tickets (ice_rink_id, organization_id, created_by, priority, status, category,
+                                         source, title, description)
+            VALUES (:rink, :org, :admin, 'low', 'new', 'bench-audit', 'manual', 'Audit', 'Audit') RETURNING id
+        """), {"rink": rink_id, "org": admin.organization_id, "admin": admin.id})).scalar_one()
+        await session.commit()
+        return str(ticket_id)
+
+async def _cleanup(session) -> None:
+    await session.execute(text("DELETE FROM service_tickets WHERE category = 'bench-audit'"))
+    await session.execute(text("DELETE FROM ice_rinks WHERE name = 'bench-audit'"))
+    await session.execute(text("DELETE FROM audit.audit_logs WHERE user_agent = :ua"), {"ua": USER_AGENT})
+    await session.commit()
+
+async def _audit_rows() -> tuple:
+    """Liczba wpisów i wpisów z użytkownikiem (login jest wykonywany bez tokena)."""
+    async with SessionLocal() as session:
+        return tuple((await session.execute(text(
+            "SELECT count(*), count(user_id) FROM audit.audit_logs WHERE user_agent = :ua"
+        ), {"ua": USER_AGENT})).one())
+
+async def _run(app, ticket_id: str, requests: int, concurrency: int) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60,
+                                 headers={"User-Agent": USER_AGENT}) as client:
+        login = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['data']['access_token']}"}
+        latencies = []
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                response = await client.post(f"/api/service-tickets/{ticket_id}/comments",
+                                             json={"comment": f"bench {i}"}, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        # Rozgrzewka (połączenia w puli, przygotowane zapytania)
+        for _ in range(20):
+            await client.post(f"/api/service-tickets/{ticket_id}/comments", json={"comment": "warmup"},
+                              headers=headers)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies + [time.perf_counter() - started]
+
+def _report(label: str, result: list) -> None:
+    *latencies, duration = result
+    q = statistics.quantiles(latencies, n=100)
+    print(f"{label:<22} p50 {q[49]:6.2f} ms  p95 {q[94]:6.2f} ms  p99 {q[98]:6.2f} ms  "
+          f"{len(latencies) / duration:7.0f} req/s")
+
+async def main(requests: int, concurrency: int) -> None:
+    settings = get_settings()
+    ticket_id = await _seed()
+    try:
+        settings.audit_enabled = False
+        plain = create_app()
+        inline = create_app()
+        inline.add_middleware(InlineAuditMiddleware, audit=None)
+
+        audit = AuditLogger(max_queue=10000, batch_size=500, flush_interval_s=1, drain_timeout_s=10)
+        queued = create_app()
+        queued.add_middleware(AuditMiddleware, audit=audit)
+
+        print(f"{requests} x POST /comments, concurrency {concurrency}")
+        _report("no audit", await _run(plain, ticket_id, requests, concurrency))
+        audit.start()
+        result = await _run(queued, ticket_id, requests, concurrency)
+        await audit.stop()
+        _report("queued audit (COPY)", result)
+        queued_rows = await _audit_rows()
+        _report("inline audit (INSERT)", await _run(inline, ticket_id, requests, concurrency))
+
+        # Login też zmienia dane (POST) - jeden wpis więcej na tryb
+        print(f"audit rows (all, with user) after queued run: {queued_rows}, stats: {audit.stats()}")
+        assert queued_rows == (requests + 21, requests + 20), "audit entries lost"
+    finally:
+        async with SessionLocal() as session:
+            await _cleanup(session)
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
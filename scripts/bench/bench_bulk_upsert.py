@@ -0,0 +1,79 @@
+"""
+Benchmark zapisu prognoz pogody: INSERT ... VALUES w paczkach vs COPY + merge.
+
+Uruchomienie (na bazie testowej - skrypt dodaje lodowiska z prefiksem "bench-"):
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench.bench_bulk_upsert --rows 100000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.db import SessionLocal
+from app.models import WeatherForecast
+from app.repositories.base import bulk_upsert
+
+SLOTS_PER_RINK = 40
+
+async def _seed_rinks(count: int) -> tuple[list[uuid.UUID], uuid.UUID]:
+    async with SessionLocal() as session:
+        await session.execute(text("DELETE FROM ice_rinks WHERE name LIKE 'bench-%'"))
+        admin = (await session.execute(text("SELECT id, organization_id FROM users WHERE username = 'admin'"))).one()
+        provider_id = (await session.execute(text("SELECT id FROM weather_providers LIMIT 1"))).scalar_one()
+        rink_ids = [uuid.uuid4() for _ in range(count)]
+        await session.execute(
+            text("""
+                INSERT INTO ice_rinks (id, organization_id, name, location, chiller_type, max_power_consumption, created_by)
+                VALUES (:id, :org, :name, 'bench', 'bench', 100, :admin)
+            """),
+            [{"id": rid, "org": admin.organization_id, "name": f"bench-{i}", "admin": admin.id} for i, rid in enumerate(rink_ids)],
+        )
+        await session.commit()
+        return rink_ids, provider_id
+
+def _rows(rink_ids, provider_id, offset: float) -> list[dict]:
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return [
+        {
+            "ice_rink_id": rid,
+            "weather_provider_id": provider_id,
+            "forecast_time": start + timedelta(hours=3 * slot),
+            "temperature_min": round(offset + slot * 0.1, 2),
+            "temperature_max": round(offset + slot * 0.1, 2),
+            "humidity": 50.0,
+        }
+        for rid in rink_ids
+        for slot in range(SLOTS_PER_RINK)
+    ]
+
+async def main(rows: int) -> None:
+    rink_ids, provider_id = await _seed_rinks(max(1, rows // SLOTS_PER_RINK))
+    for method in ("values", "copy"):
+        # Pierwsze przejście to wstawienie, drugie to aktualizacja istniejących wierszy
+        for phase, offset in (("insert", 0.0), ("update", 1.0)):
+            data = _rows(rink_ids, provider_id, offset)
+            async with SessionLocal() as session:
+                if phase == "insert":
+                    await session.execute(text("DELETE FROM weather_forecasts WHERE ice_rink_id = ANY(:ids)"), {"ids": rink_ids})
+                started = time.perf_counter()
+                await bulk_upsert(
+                    session, WeatherForecast, data,
+                    index_elements=["ice_rink_id", "forecast_time"],
+                    update_columns=["temperature_min", "temperature_max", "humidity"],
+                    method=method,
+                )
+                await session.commit()
+                elapsed = time.perf_counter() - started
+            print(f"{method:>6} {phase:>6}: {len(data):>7} rows in {elapsed:6.2f}s ({len(data) / elapsed:,.0f} rows/s)")
+
+    async with SessionLocal() as session:
+        await session.execute(text("DELETE FROM ice_rinks WHERE name LIKE 'bench-%'"))
+        await session.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    asyncio.run(main(parser.parse_args().rows))
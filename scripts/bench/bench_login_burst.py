@@ -0,0 +1,73 @@
+"""
+Benchmark: opóźnienie niezwiązanego endpointu (GET /api/auth/me) podczas serii logowań.
+
+Porównuje bcrypt liczony w pętli zdarzeń (dawne zachowanie) z pulą wątków z app.security.
+Wymaga bazy z kontem admin / admin123 (setup_database.sql):
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench.bench_login_burst --logins 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app import security
+from app.main import app
+from app.routers import auth
+
+async def _blocking_verify(plain_password: str, password_hash: str) -> bool:
+    return security._verify_sync(plain_password, password_hash)
+
+async def _probe(client: httpx.AsyncClient, token: str, stop: asyncio.Event, interval: float) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+async def _run(logins: int, interval: float) -> dict:
+    credentials = {"username": "admin", "password": "admin123"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        token = (await client.post("/api/auth/login", json=credentials)).json()["data"]["access_token"]
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, token, stop, interval))
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.post("/api/auth/login", json=credentials) for _ in range(logins)))
+        burst = time.perf_counter() - start
+        stop.set()
+        latencies = sorted(await probe)
+    assert all(r.status_code == 200 for r in responses)
+    return {
+        "burst_s": burst,
+        "probes": len(latencies),
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "max_ms": latencies[-1],
+    }
+
+async def _compare(logins: int, interval: float) -> None:
+    pooled_verify = auth.verify_password
+    for label, verify in (("blocking", _blocking_verify), ("thread pool", pooled_verify)):
+        auth.verify_password = verify
+        r = await _run(logins, interval)
+        print(
+            f"{label:>12}: {logins} logins in {r['burst_s']:.2f}s | /api/auth/me "
+            f"p50 {r['p50_ms']:.1f} ms, p99 {r['p99_ms']:.1f} ms, max {r['max_ms']:.1f} ms ({r['probes']} probes)"
+        )
+    auth.verify_password = pooled_verify
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.01, help="Odstęp między zapytaniami sondy (s)")
+    args = parser.parse_args()
+    asyncio.run(_compare(args.logins, args.interval))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: lista pomiarów lodowiska - obiekty ORM + Pydantic (dawna ścieżka) vs krotki + orjson.
+
+Przy okazji sprawdza, że obie ścieżki dają identyczne bajty odpowiedzi.
+Uruchomienie (na bazie testowej - skrypt dodaje lodowisko "bench-measurements"):
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench.bench_measurement_list --rows 5000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import text
+
+from app.db import SessionLocal, engine
+from app.repositories.measurement import MEASUREMENT_FIELDS, MeasurementRepository
+from app.schemas import MeasurementResponse, PaginatedResponse
+from app.utils import paginated_json
+
+PAGE_ADAPTER = TypeAdapter(PaginatedResponse[MeasurementResponse])
+
+async def _seed(rows: int):
+    async with SessionLocal() as session:
+        await session.execute(text("DELETE FROM ice_rinks WHERE name = 'bench-measurements'"))
+        admin = (await session.execute(text("SELECT id, organization_id FROM users WHERE username = 'admin'"))).one()
+        rink_id = (await session.execute(text("""
+            INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by)
+            VALUES (:org, 'bench-measurements', 'bench', 'bench', 100, :admin) RETURNING id
+        """), {"org": admin.organization_id, "admin": admin.id})).scalar_one()
+        await session.execute(text("""
+            INSERT INTO measurements (ice_rink_id, timestamp, ice_temperature, chiller_power, chiller_status,
+                                      ambient_temperature, humidity, energy_consumption, quality_score)
+            SELECT :rink, NOW() - make_interval(secs => g * 60.123456), -5 + (g % 300) / 100.0, 40 + g % 17,
+                   'running', CASE WHEN g % 7 = 0 THEN NULL ELSE 12.5 END, 55.10, g / 3.0, 1.00
+            FROM generate_series(1, :rows) g
+        """), {"rink": rink_id, "rows": rows})
+        await session.commit()
+        return rink_id
+
+async def _old_path(repo: MeasurementRepository, rink_id, limit: int) -> bytes:
+    items, total = await repo.get_measurements_for_rink(rink_id=rink_id, skip=0, limit=limit)
+    page = PaginatedResponse(
+        page=1, limit=limit, total=total,
+        pages=(total + limit - 1) // limit if limit > 0 else 0,
+        has_next=limit < total, has_prev=False, items=items,
+    )
+    # Tak samo jak FastAPI dla `response_model`: walidacja, potem serializacja pydantic-core
+    return PAGE_ADAPTER.dump_json(PAGE_ADAPTER.validate_python(page))
+
+async def _new_path(repo: MeasurementRepository, rink_id, limit: int) -> bytes:
+    rows, total = await repo.get_measurement_rows_for_rink(rink_id=rink_id, skip=0, limit=limit)
+    return paginated_json(1, limit, total, [dict(zip(MEASUREMENT_FIELDS, row)) for row in rows]).body
+
+async def main(rows: int, limit: int, repeat: int) -> None:
+    rink_id = await _seed(rows)
+    try:
+        async with SessionLocal() as session:
+            repo = MeasurementRepository(session)
+            old, new = await _old_path(repo, rink_id, limit), await _new_path(repo, rink_id, limit)
+            assert old == new, "response bodies differ"
+            print(f"identical bodies: {len(new):,} bytes for {min(rows, limit)} items")
+
+            for name, path in (("orm+pydantic", _old_path), ("rows+orjson", _new_path)):
+                timings = []
+                for _ in range(repeat):
+                    session.expunge_all()
+                    started = time.perf_counter()
+                    await path(repo, rink_id, limit)
+                    timings.append((time.perf_counter() - started) * 1000)
+                print(f"{name:>13}: median {statistics.median(timings):7.1f} ms, min {min(timings):7.1f} ms")
+    finally:
+        async with SessionLocal() as session:
+            await session.execute(text("DELETE FROM ice_rinks WHERE name = 'bench-measurements'"))
+            await session.commit()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit, args.repeat))
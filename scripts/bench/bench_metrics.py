@@ -0,0 +1,66 @@
+"""
+Benchmark: koszt MetricsMiddleware na zapytanie (bez bazy i bez HTTP - wywołania ASGI w pętli).
+
+Porównuje prosty endpoint bez middleware i z middleware. Tryb wieloprocesowy (pliki mmap)
+jest używany, gdy ustawiono PROMETHEUS_MULTIPROC_DIR:
+    python -m scripts.bench.bench_metrics --requests 20000
+    PROMETHEUS_MULTIPROC_DIR=$(mktemp -d) python -m scripts.bench.bench_metrics --requests 20000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi import FastAPI
+
+from app.metrics import MULTIPROCESS, MetricsMiddleware, render
+
+def _app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.get("/api/ice-rinks/{rink_id}")
+    async def get_rink(rink_id: uuid.UUID):
+        return {"id": str(rink_id)}
+
+    return app
+
+async def _run(app, requests: int) -> float:
+    path = f"/api/ice-rinks/{uuid.uuid4()}"
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": [],
+             "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(500):
+        await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+async def main(requests: int) -> None:
+    plain, instrumented = _app(False), _app(True)
+    # Naprzemiennie, najlepszy z trzech przebiegów
+    results = {"plain": [], "metrics": []}
+    for _ in range(3):
+        results["plain"].append(await _run(plain, requests))
+        results["metrics"].append(await _run(instrumented, requests))
+    base, with_metrics = min(results["plain"]), min(results["metrics"])
+    print(f"{requests} requests per run, mode: {'multiprocess (mmap)' if MULTIPROCESS else 'single process'}")
+    print(f"no middleware      {base:7.1f} us/request")
+    print(f"MetricsMiddleware  {with_metrics:7.1f} us/request  (+{with_metrics - base:.1f} us)")
+    started = time.perf_counter()
+    body, _ = render()
+    print(f"/metrics render    {(time.perf_counter() - started) * 1000:7.1f} ms ({len(body)} bytes)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,143 @@
+"""
+Benchmark dyspozytora powiadomień (outbox) - kilka dyspozytorów naraz, jak kilka workerów API.
+
+Skrypt uruchamia lokalne atrapy serwera webhooków (HTTP) i SMTP, dodaje N powiadomień
+(webhook + e-mail, część webhooków za pierwszym razem zwraca 503), opróżnia kolejkę
+i sprawdza, że żadne powiadomienie nie zostało doręczone dwa razy.
+Uruchomienie (na bazie testowej - powiadomienia mają metadata.bench = true):
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench.bench_notifications --notifications 5000 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+from sqlalchemy import text
+
+from app.db import SessionLocal, engine
+from app.notifications import NotificationDispatcher, SmtpSender
+
+async def _webhook_server(delivered: Counter, attempts: Counter, latency_s: float):
+    """Atrapa odbiorcy webhooków (HTTP/1.1 keep-alive); ścieżka /flaky odpowiada 503 przy pierwszej próbie."""
+    async def handle(reader, writer):
+        while request_line := await reader.readline():
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))))
+            await asyncio.sleep(latency_s)
+            attempts[body["id"]] += 1
+            if b"/flaky" in request_line and attempts[body["id"]] == 1:
+                status = b"503 Service Unavailable"
+            else:
+                delivered[body["id"]] += 1
+                status = b"204 No Content"
+            writer.write(b"HTTP/1.1 " + status + b"\r\ncontent-length: 0\r\n\r\n")
+            await writer.drain()
+        writer.close()
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+async def _smtp_server(delivered: Counter):
+    """Atrapa serwera SMTP; identyfikator powiadomienia jest w temacie wiadomości."""
+    async def handle(reader, writer):
+        writer.write(b"220 mock\r\n")
+        in_data, subject = False, None
+        while line := await reader.readline():
+            if in_data:
+                if line.startswith(b"Subject: "):
+                    subject = line[9:].strip().decode()
+                if line == b".\r\n":
+                    in_data = False
+                    delivered[subject] += 1
+                    writer.write(b"250 queued\r\n")
+            elif line[:4].upper() == b"DATA":
+                in_data = True
+                writer.write(b"354 go ahead\r\n")
+            elif line[:4].upper() == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+async def _seed(count: int, webhook_port: int) -> None:
+    async with SessionLocal() as session:
+        await session.execute(text("DELETE FROM notifications WHERE metadata ? 'bench'"))
+        # Co 4. powiadomienie to e-mail, co 10. webhook trafia na /flaky (jedna nieudana próba)
+        await session.execute(text("""
+            INSERT INTO notifications (type, title, message, metadata)
+            SELECT CASE WHEN g % 4 = 0 THEN 'email' ELSE 'webhook' END, 'bench-' || g, 'Alarm lodowiska nr ' || g,
+                   jsonb_build_object('bench', true, 'email', 'ops' || g || '@example.com',
+                                      'url', 'http://127.0.0.1:' || CAST(:port AS int) ||
+                                             CASE WHEN g % 10 = 1 THEN '/flaky' ELSE '/hook' END)
+            FROM generate_series(1, :count) g
+        """), {"count": count, "port": webhook_port})
+        await session.commit()
+
+async def _outcome() -> dict:
+    async with SessionLocal() as session:
+        rows = await session.execute(text(
+            "SELECT status, count(*), sum(retry_count) FROM notifications WHERE metadata ? 'bench' GROUP BY status"
+        ))
+        return {status: (count, retries) for status, count, retries in rows}
+
+async def main(count: int, workers: int, batch_size: int, concurrency: int, latency_ms: float) -> None:
+    delivered, attempts, emails = Counter(), Counter(), Counter()
+    webhook = await _webhook_server(delivered, attempts, latency_ms / 1000)
+    smtp = await _smtp_server(emails)
+    webhook_port = webhook.sockets[0].getsockname()[1]
+    smtp_port = smtp.sockets[0].getsockname()[1]
+    await _seed(count, webhook_port)
+
+    dispatchers = []
+    for _ in range(workers):
+        # Backoff 0 s - ponowienia /flaky odbywają się w tym samym przebiegu
+        dispatcher = NotificationDispatcher(batch_size=batch_size, concurrency=concurrency, poll_s=0.2, lease_s=60,
+                                            max_retries=3, backoff_base_s=0, backoff_cap_s=0)
+        dispatcher.open()
+        dispatcher.smtp = SmtpSender("127.0.0.1", smtp_port, "bench@localhost", connections=2)
+        dispatchers.append(dispatcher)
+
+    async def drain(dispatcher: NotificationDispatcher) -> None:
+        idle = 0
+        while idle < 3:
+            idle = 0 if await dispatcher.dispatch_once() else idle + 1
+            if idle:
+                await asyncio.sleep(0.05)
+
+    try:
+        async with webhook, smtp:
+            started = time.perf_counter()
+            await asyncio.gather(*(drain(d) for d in dispatchers))
+            duration = time.perf_counter() - started
+        outcome = await _outcome()
+        duplicates = sum(1 for n in delivered.values() if n > 1) + sum(1 for n in emails.values() if n > 1)
+        print(f"{count:,} notifications, {workers} dispatchers x batch {batch_size} x concurrency {concurrency}, "
+              f"webhook latency {latency_ms:.0f} ms")
+        print(f"drained in {duration:.2f}s ({count / duration:,.0f} notifications/s)")
+        print(f"webhooks delivered {sum(delivered.values()):,}, e-mails delivered {sum(emails.values()):,}, "
+              f"duplicates {duplicates}")
+        print("status (count, retries):", outcome)
+        print("sent per dispatcher:", [d.sent for d in dispatchers])
+        assert duplicates == 0, "notification delivered more than once"
+    finally:
+        for dispatcher in dispatchers:
+            await dispatcher.close()
+        async with SessionLocal() as session:
+            await session.execute(text("DELETE FROM notifications WHERE metadata ? 'bench'"))
+            await session.commit()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notifications", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.notifications, args.workers, args.batch_size, args.concurrency, args.latency_ms))
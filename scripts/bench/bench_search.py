@@ -0,0 +1,114 @@
+"""
+Benchmark /api/search na dużym zbiorze zgłoszeń (domyślnie milion) względem budżetu czasu.
+
+Uruchomienie (na bazie testowej z kontem admin / admin123 - skrypt dodaje dane z prefiksem "bench-search"):
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench.bench_search --tickets 1000000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.db import SessionLocal, engine
+from app.main import app
+
+WORDS = ("sprężarka", "agregat", "chłodzenie", "lodowisko", "temperatura", "awaria", "alarm", "czujnik",
+         "ciśnienie", "glikol", "pompa", "zawór", "wentylator", "skraplacz", "parownik", "taśma", "rolba",
+         "bandy", "oświetlenie", "zasilanie", "falownik", "sterownik", "wilgotność", "szron", "wyciek",
+         "przegląd", "kalibracja", "serwis", "wymiana", "hałas")
+QUERIES = ("awaria spręż", "wyciek glikol", "falownik", "temp", "przegląd pompa zawór", "lodowisko kraków")
+
+def _word(expr: str) -> str:
+    return f"(ARRAY{list(WORDS)})[1 + ({expr}) % {len(WORDS)}]"
+
+async def _seed(tickets: int) -> None:
+    async with SessionLocal() as session:
+        await _cleanup(session)
+        await session.execute(text("SET LOCAL statement_timeout = 0"))
+        admin = (await session.execute(text("SELECT id, organization_id FROM users WHERE username = 'admin'"))).one()
+        await session.execute(text("""
+            INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by)
+            SELECT :org, 'bench-search lodowisko ' || g, 'bench-search ' || (ARRAY['Warszawa','Kraków','Gdańsk','Poznań'])[1 + g % 4],
+                   'bench', 100, :admin
+            FROM generate_series(1, 200) g
+        """), {"org": admin.organization_id, "admin": admin.id})
+        # Wyzwalacz numeru zgłoszenia obcina licznik do 4 cyfr - przy seedowaniu numery nadajemy sami
+        await session.execute(text("ALTER TABLE service_tickets DISABLE TRIGGER generate_ticket_number_trigger"))
+        await session.execute(text(f"""
+            INSERT INTO service_tickets (ticket_number, ice_rink_id, organization_id, created_by, priority, status,
+                                         category, title, description, created_at)
+            WITH rinks AS (SELECT array_agg(id) AS ids FROM ice_rinks WHERE name LIKE 'bench-search%')
+            SELECT 'BENCH-' || g, rinks.ids[1 + g % 200], :org, :admin,
+                   (ARRAY['low','medium','high','critical'])[1 + g % 4],
+                   (ARRAY['new','assigned','in_progress','resolved','closed'])[1 + g % 5],
+                   'bench-search',
+                   {_word('g * 7')} || ' ' || {_word('g * 13 + 1')} || ' ' || {_word('g * 17 + 2')},
+                   {_word('g * 3')} || ' ' || {_word('g * 11 + 3')} || ' ' || {_word('g * 19 + 5')} || ' ' ||
+                   {_word('g * 23 + 7')} || ' ' || {_word('g * 29 + 11')} || ' nr ' || g,
+                   NOW() - make_interval(mins => g)
+            FROM generate_series(1, :tickets) g, rinks
+        """), {"tickets": tickets, "org": admin.organization_id, "admin": admin.id})
+        await session.execute(text("ALTER TABLE service_tickets ENABLE TRIGGER generate_ticket_number_trigger"))
+        await session.execute(text(f"""
+            INSERT INTO ticket_comments (ticket_id, user_id, comment, created_at)
+            SELECT id, created_by, 'Diagnoza: ' || {_word("abs(hashtext(ticket_number))")} || ' ' ||
+                   {_word("abs(hashtext(ticket_number)) / 7")}, created_at
+            FROM service_tickets WHERE category = 'bench-search' AND ticket_number::text LIKE '%0'
+        """))
+        await session.commit()
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SET statement_timeout = 0"))
+        await conn.execute(text("VACUUM ANALYZE service_tickets, ticket_comments, ice_rinks, organizations"))
+
+async def _cleanup(session) -> None:
+    await session.execute(text("SET LOCAL statement_timeout = 0"))
+    await session.execute(text("DELETE FROM service_tickets WHERE category = 'bench-search'"))
+    await session.execute(text("DELETE FROM ice_rinks WHERE name LIKE 'bench-search%'"))
+    await session.commit()
+
+async def _measure(repeat: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        login = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['data']['access_token']}"}
+        budget = get_settings().search_statement_timeout_ms
+        print(f"budget {budget} ms (SEARCH_STATEMENT_TIMEOUT_MS)")
+        print(f"{'query':<24} {'p50 ms':>8} {'max ms':>8} {'hits':>6}  top ticket")
+        for q in QUERIES:
+            timings, response = [], None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get("/api/search", params={"q": q}, headers=headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            body = response.json()
+            if response.status_code != 200:
+                print(f"{q:<24} {response.status_code} {body}")
+                continue
+            hits = sum(len(body[k]) for k in ("tickets", "comments", "ice_rinks", "organizations"))
+            top = body["tickets"][0]["title"] if body["tickets"] else "-"
+            print(f"{q:<24} {statistics.median(timings):>8.1f} {max(timings):>8.1f} {hits:>6}  {top}")
+
+async def main(tickets: int, repeat: int, keep: bool) -> None:
+    started = time.perf_counter()
+    await _seed(tickets)
+    print(f"seeded {tickets:,} tickets in {time.perf_counter() - started:.0f}s")
+    try:
+        await _measure(repeat)
+    finally:
+        if not keep:
+            async with SessionLocal() as session:
+                await _cleanup(session)
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    args = parser.parse_args()
+    asyncio.run(main(args.tickets, args.repeat, args.keep))
@@ -0,0 +1,112 @@
+"""
+Mikro-benchmark narzutu na zapytanie dla najczęstszych odczytów repozytoriów.
+
+Porównuje zapytania budowane przez select() przy każdym wywołaniu (dawna ścieżka)
+z zapytaniami zbudowanymi raz w repozytoriach (bindparam), każde z cache prepared
+statements włączonym i wyłączonym.
+Uruchomienie (na bazie testowej - skrypt dodaje lodowisko "bench-statements"):
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench.bench_statement_cache --calls 2000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.config import get_settings
+from app.models import Measurement, UserSession
+from app.repositories.measurement import MeasurementRepository
+from app.repositories.user_session import UserSessionRepository
+
+def _select_queries(rink_id, jti, measurement_id):
+    """Te same zapytania budowane przy każdym wywołaniu (jak przed zmianą)."""
+    async def latest(session):
+        query = select(Measurement).where(Measurement.ice_rink_id == rink_id).order_by(Measurement.timestamp.desc()).limit(1)
+        return (await session.execute(query)).scalar_one_or_none()
+
+    async def get_session(session):
+        return (await session.execute(select(UserSession).where(UserSession.id == jti))).scalar_one_or_none()
+
+    async def get_by_id(session):
+        return (await session.execute(select(Measurement).filter_by(id=measurement_id))).scalar_one_or_none()
+
+    async def page(session):
+        query = select(Measurement).where(Measurement.ice_rink_id == rink_id).options(selectinload(Measurement.ice_rink))
+        await session.execute(select(func.count()).select_from(query.subquery()))
+        return (await session.execute(query.order_by(Measurement.timestamp.desc()).offset(0).limit(20))).scalars().all()
+
+    return {"get_latest_for_rink": latest, "get_session": get_session, "get_by_id": get_by_id,
+            "get_measurements_for_rink": page}
+
+def _cached_queries(rink_id, jti, measurement_id):
+    return {
+        "get_latest_for_rink": lambda s: MeasurementRepository(s).get_latest_for_rink(rink_id),
+        "get_session": lambda s: UserSessionRepository(s).get_session(jti),
+        "get_by_id": lambda s: MeasurementRepository(s).get_by_id(measurement_id),
+        "get_measurements_for_rink": lambda s: MeasurementRepository(s).get_measurements_for_rink(rink_id, 0, 20),
+    }
+
+async def _seed(session_factory):
+    async with session_factory() as session:
+        await session.execute(text("DELETE FROM ice_rinks WHERE name = 'bench-statements'"))
+        admin = (await session.execute(text("SELECT id, organization_id FROM users WHERE username = 'admin'"))).one()
+        rink_id = (await session.execute(text("""
+            INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by)
+            VALUES (:org, 'bench-statements', 'bench', 'bench', 100, :admin) RETURNING id
+        """), {"org": admin.organization_id, "admin": admin.id})).scalar_one()
+        measurement_id = (await session.execute(text("""
+            INSERT INTO measurements (ice_rink_id, timestamp, ice_temperature, chiller_power, chiller_status, energy_consumption)
+            SELECT :rink, NOW() - make_interval(mins => g), -5, 40, 'running', g FROM generate_series(1, 100) g
+            RETURNING id
+        """), {"rink": rink_id})).scalars().first()
+        jti = uuid.uuid4()
+        await session.execute(text("INSERT INTO user_sessions (id, user_id, expires_at) VALUES (:id, :user, :exp)"),
+                              {"id": jti, "user": admin.id, "exp": datetime.now(timezone.utc) + timedelta(hours=1)})
+        await session.commit()
+        return rink_id, jti, measurement_id
+
+async def _cleanup(session_factory, jti):
+    async with session_factory() as session:
+        await session.execute(text("DELETE FROM ice_rinks WHERE name = 'bench-statements'"))
+        await session.execute(text("DELETE FROM user_sessions WHERE id = :id"), {"id": jti})
+        await session.commit()
+
+async def _measure(session_factory, query, calls: int) -> float:
+    async with session_factory() as session:
+        for _ in range(50):
+            await query(session)
+        started = time.perf_counter()
+        for _ in range(calls):
+            await query(session)
+            session.expunge_all()
+        await session.rollback()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+async def main(calls: int) -> None:
+    url = get_settings().database_url
+    engines = {
+        "prepared cache": create_async_engine(url, pool_size=1),
+        "no prepared cache": create_async_engine(url, pool_size=1, connect_args={"prepared_statement_cache_size": 0}),
+    }
+    factories = {name: async_sessionmaker(e, expire_on_commit=False, class_=AsyncSession) for name, e in engines.items()}
+    ids = await _seed(factories["prepared cache"])
+    try:
+        print(f"{'query':<26} {'engine':<18} {'select() us':>12} {'cached us':>10}")
+        for name in _select_queries(*ids):
+            for engine_name, factory in factories.items():
+                old = await _measure(factory, _select_queries(*ids)[name], calls)
+                new = await _measure(factory, _cached_queries(*ids)[name], calls)
+                print(f"{name:<26} {engine_name:<18} {old:>12.0f} {new:>10.0f}")
+    finally:
+        await _cleanup(factories["prepared cache"], ids[1])
+        for e in engines.values():
+            await e.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().calls))
@@ -0,0 +1,102 @@
+"""
+Benchmark: zamknięcie N zgłoszeń - N wywołań PUT /{id}/status (dawna ścieżka) vs jedno POST /bulk/close.
+
+Sprawdza też, że obie ścieżki zostawiają te same statusy i po jednym komentarzu systemowym na zgłoszenie.
+Uruchomienie (na bazie testowej z kontem admin / admin123 - skrypt dodaje dane z prefiksem "bench-bulk"):
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench.bench_ticket_bulk --tickets 300
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import text
+
+from app.db import SessionLocal, engine
+from app.main import app
+
+async def _seed(tickets: int) -> list:
+    async with SessionLocal() as session:
+        await _cleanup(session)
+        admin = (await session.execute(text("SELECT id, organization_id FROM users WHERE username = 'admin'"))).one()
+        rink_id = (await session.execute(text("""
+            INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by)
+            VALUES (:org, 'bench-bulk', 'bench', 'bench', 100, :admin) RETURNING id
+        """), {"org": admin.organization_id, "admin": admin.id})).scalar_one()
+        ids = (await session.execute(text("""
+            INSERT INTO service_tickets (ice_rink_id, organization_id, created_by, priority, status, category,
+                                         source, title, description)
+            SELECT :rink, :org, :admin, 'high', 'new', 'bench-bulk', 'automatic', 'Alarm ' || g, 'Alarm z SSP nr ' || g
+            FROM generate_series(1, :tickets) g
+            RETURNING id
+        """), {"rink": rink_id, "org": admin.organization_id, "admin": admin.id, "tickets": tickets})).scalars().all()
+        await session.commit()
+        return [str(i) for i in ids]
+
+async def _reopen(ids: list) -> None:
+    async with SessionLocal() as session:
+        await session.execute(text("UPDATE service_tickets SET status = 'new' WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                              {"ids": ids})
+        await session.execute(text("DELETE FROM ticket_comments WHERE ticket_id = ANY(CAST(:ids AS uuid[]))"),
+                              {"ids": ids})
+        await session.commit()
+
+async def _state(ids: list) -> tuple:
+    async with SessionLocal() as session:
+        return (await session.execute(text("""
+            SELECT count(*) FILTER (WHERE status = 'closed' AND closed_at IS NOT NULL),
+                   (SELECT count(*) FROM ticket_comments WHERE ticket_id = ANY(CAST(:ids AS uuid[])))
+            FROM service_tickets WHERE id = ANY(CAST(:ids AS uuid[]))
+        """), {"ids": ids})).one()
+
+async def _cleanup(session) -> None:
+    await session.execute(text("DELETE FROM service_tickets WHERE category = 'bench-bulk'"))
+    await session.execute(text("DELETE FROM ice_rinks WHERE name = 'bench-bulk'"))
+    await session.commit()
+
+async def main(tickets: int) -> None:
+    ids = await _seed(tickets)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            login = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+            headers = {"Authorization": f"Bearer {login.json()['data']['access_token']}"}
+
+            started = time.perf_counter()
+            for ticket_id in ids:
+                response = await client.put(f"/api/service-tickets/{ticket_id}/status",
+                                            json={"status": "closed", "comment": "storm"}, headers=headers)
+                response.raise_for_status()
+            single = (time.perf_counter() - started) * 1000
+            single_state = await _state(ids)
+
+            await _reopen(ids)
+            started = time.perf_counter()
+            response = await client.post("/api/service-tickets/bulk/close",
+                                         json={"ticket_ids": ids, "comment": "storm"}, headers=headers)
+            response.raise_for_status()
+            bulk = (time.perf_counter() - started) * 1000
+            assert response.json()["updated"] == tickets
+            assert await _state(ids) == single_state == (tickets, tickets), "final state differs"
+
+            await _reopen(ids)
+            started = time.perf_counter()
+            response = await client.post("/api/service-tickets/bulk/close",
+                                         json={"filter": {"category": "bench-bulk", "status": ["new"]}}, headers=headers)
+            response.raise_for_status()
+            by_filter = (time.perf_counter() - started) * 1000
+            assert response.json()["updated"] == tickets
+
+            print(f"{tickets} tickets, identical final state (closed + 1 system comment each)")
+            print(f"{'PUT /{id}/status x' + str(tickets):<28} {single:8.0f} ms")
+            print(f"{'POST /bulk/close (ids)':<28} {bulk:8.0f} ms")
+            print(f"{'POST /bulk/close (filter)':<28} {by_filter:8.0f} ms")
+    finally:
+        async with SessionLocal() as session:
+            await _cleanup(session)
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", type=int, default=300)
+    asyncio.run(main(parser.parse_args().tickets))
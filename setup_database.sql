@@ -11,6 +11,9 @@ CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 -- Włączenie rozszerzenia dla szyfrowania
 CREATE EXTENSION IF NOT EXISTS "pgcrypto";
 
+-- Włączenie rozszerzenia dla wyszukiwania przybliżonego (trigramy)
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
+
 -- =====================================================
 -- 1. TWORZENIE SCHEMATÓW
 -- =====================================================
@@ -44,6 +47,57 @@ $$ language 'plpgsql';
 -- Sekwencja dla numerów zgłoszeń
 CREATE SEQUENCE IF NOT EXISTS ticket_sequence START 1;
 
+-- Czas na rozwiązanie zgłoszenia wg priorytetu (klucze sla.hours.<priorytet> w system_config)
+CREATE OR REPLACE FUNCTION ticket_sla_interval(ticket_priority VARCHAR)
+RETURNS INTERVAL AS $$
+DECLARE
+    hours NUMERIC;
+BEGIN
+    SELECT value::numeric INTO hours FROM system_config WHERE key = 'sla.hours.' || ticket_priority;
+    RETURN COALESCE(hours, CASE ticket_priority WHEN 'critical' THEN 4 WHEN 'high' THEN 8 WHEN 'medium' THEN 24 ELSE 72 END)
+           * INTERVAL '1 hour';
+END;
+$$ language 'plpgsql' STABLE;
+
+-- Cel SLA oraz znaczniki resolved_at / closed_at zgłoszenia - ustawiane przy każdym zapisie
+CREATE OR REPLACE FUNCTION set_ticket_sla_fields()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        NEW.sla_target := COALESCE(NEW.sla_target, NEW.created_at + ticket_sla_interval(NEW.priority));
+    ELSIF NEW.priority IS DISTINCT FROM OLD.priority AND NEW.sla_target IS NOT DISTINCT FROM OLD.sla_target THEN
+        -- Zmiana priorytetu przelicza cel od momentu utworzenia zgłoszenia
+        NEW.sla_target := NEW.created_at + ticket_sla_interval(NEW.priority);
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.sla_target IS DISTINCT FROM OLD.sla_target THEN
+        NEW.sla_breached_at := NULL;
+    END IF;
+    IF NEW.status IN ('new', 'assigned', 'in_progress') THEN
+        NEW.resolved_at := NULL;
+        NEW.closed_at := NULL;
+    ELSE
+        NEW.resolved_at := COALESCE(NEW.resolved_at, NOW());
+        NEW.closed_at := CASE WHEN NEW.status = 'closed' THEN COALESCE(NEW.closed_at, NOW()) END;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Powiadomienie monitora SLA workerów API (kanał ticket_sla) o zmianie terminu lub statusu zgłoszenia
+CREATE OR REPLACE FUNCTION notify_ticket_sla_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('ticket_sla', json_build_object('id', OLD.id)::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('ticket_sla', json_build_object(
+        'id', NEW.id, 'organization_id', NEW.organization_id, 'priority', NEW.priority,
+        'status', NEW.status, 'sla_target', NEW.sla_target)::text);
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
 -- =====================================================
 -- 3. TWORZENIE TABEL
 -- =====================================================
@@ -150,6 +204,25 @@ CREATE TABLE weather_forecasts (
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- 3.6a. Tabela: weather_forecast_runs (Historia wydań prognoz - jeden wiersz na komórkę i wydanie)
+CREATE TABLE weather_forecast_runs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    weather_provider_id UUID NOT NULL REFERENCES weather_providers(id) ON DELETE RESTRICT,
+    geo_cell VARCHAR(64) NOT NULL,
+    issued_at TIMESTAMPTZ NOT NULL,
+    latitude NUMERIC(10,8) NOT NULL,
+    longitude NUMERIC(11,8) NOT NULL,
+    ice_rink_ids UUID[] NOT NULL,
+    forecast_times TIMESTAMPTZ[] NOT NULL,
+    temperature_min REAL[] NOT NULL,
+    temperature_max REAL[] NOT NULL,
+    humidity REAL[],
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE(weather_provider_id, geo_cell, issued_at),
+    CHECK (cardinality(forecast_times) = cardinality(temperature_min)
+           AND cardinality(forecast_times) = cardinality(temperature_max))
+);
+
 -- 3.7. Tabela: measurements (Pomiary z Lodowisk)
 CREATE TABLE measurements (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -216,8 +289,15 @@ CREATE TABLE service_tickets (
     sla_target TIMESTAMPTZ,
     resolved_at TIMESTAMPTZ,
     closed_at TIMESTAMPTZ,
+    -- Moment eskalacji przekroczonego SLA (jedna eskalacja na termin, także przy wielu workerach)
+    sla_breached_at TIMESTAMPTZ,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- Wyszukiwanie pełnotekstowe (/api/search): tytuł ważniejszy od opisu
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
 );
 
 -- 3.11. Tabela: ticket_comments (Komentarze do Zgłoszeń)
@@ -260,6 +340,8 @@ CREATE TABLE notifications (
     retry_count INTEGER NOT NULL DEFAULT 0,
     error_message TEXT,
     metadata JSONB NOT NULL DEFAULT '{}',
+    -- Najbliższa próba wysłania (backoff po błędzie, dzierżawa pobranej partii)
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
@@ -284,11 +366,26 @@ CREATE TABLE user_sessions (
     is_active BOOLEAN NOT NULL DEFAULT true
 );
 
+-- 3.16. Tabela: job_runs (Historia uruchomień zadań w tle)
+CREATE TABLE job_runs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    job_name VARCHAR(100) NOT NULL,
+    trigger VARCHAR(20) NOT NULL DEFAULT 'schedule' CHECK (trigger IN ('schedule', 'manual')),
+    status VARCHAR(20) NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'success', 'error')),
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    duration_ms INTEGER,
+    host VARCHAR(255),
+    details JSONB NOT NULL DEFAULT '{}',
+    error_message TEXT
+);
+
 -- =====================================================
 -- 4. TWORZENIE INDEKSÓW
 -- =====================================================
 CREATE INDEX idx_organizations_status ON organizations(status);
 CREATE INDEX idx_organizations_type ON organizations(type);
+CREATE INDEX idx_organizations_name_trgm ON organizations USING GIN (name gin_trgm_ops);
 CREATE INDEX idx_users_role ON users(role);
 CREATE INDEX idx_users_status ON users(status);
 CREATE INDEX idx_users_organization_id ON users(organization_id);
@@ -297,9 +394,15 @@ CREATE INDEX idx_ice_rinks_organization_id ON ice_rinks(organization_id);
 CREATE INDEX idx_ice_rinks_status ON ice_rinks(status);
 CREATE INDEX idx_ice_rinks_ssp_status ON ice_rinks(ssp_status);
 CREATE INDEX idx_ice_rinks_location ON ice_rinks(location);
+CREATE INDEX idx_ice_rinks_name_trgm ON ice_rinks USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_ice_rinks_location_trgm ON ice_rinks USING GIN (location gin_trgm_ops);
 CREATE INDEX idx_weather_providers_status ON weather_providers(status);
-CREATE INDEX idx_weather_forecasts_ice_rink_time ON weather_forecasts(ice_rink_id, forecast_time);
+-- Unikalny indeks wymagany przez upsert prognoz (ON CONFLICT (ice_rink_id, forecast_time))
+CREATE UNIQUE INDEX uq_weather_forecasts_ice_rink_time ON weather_forecasts(ice_rink_id, forecast_time);
 CREATE INDEX idx_weather_forecasts_time ON weather_forecasts(forecast_time);
+CREATE INDEX idx_weather_forecast_runs_rinks ON weather_forecast_runs USING GIN (ice_rink_ids);
+CREATE INDEX idx_weather_forecast_runs_issued_at ON weather_forecast_runs(issued_at);
+-- Upsert pomiarów (ON CONFLICT (ice_rink_id, timestamp)) korzysta z ograniczenia UNIQUE(ice_rink_id, timestamp) tabeli
 CREATE INDEX idx_measurements_ice_rink_time ON measurements(ice_rink_id, timestamp);
 CREATE INDEX idx_measurements_timestamp ON measurements(timestamp);
 CREATE INDEX idx_measurements_data_source ON measurements(data_source);
@@ -307,13 +410,20 @@ CREATE INDEX idx_ai_models_status ON ai_models(status);
 CREATE INDEX idx_ai_models_type ON ai_models(type);
 CREATE INDEX idx_theoretical_consumption_ice_rink_time ON theoretical_consumption(ice_rink_id, timestamp);
 CREATE INDEX idx_theoretical_consumption_ai_model ON theoretical_consumption(ai_model_id);
-CREATE INDEX idx_service_tickets_status ON service_tickets(status);
+-- Filtry i liczniki zgłoszeń (GET /api/service-tickets, /stats): z organizacją i bez niej
+CREATE INDEX idx_service_tickets_org_status_priority ON service_tickets(organization_id, status, priority, created_at DESC);
+CREATE INDEX idx_service_tickets_status_priority ON service_tickets(status, priority, created_at DESC);
 CREATE INDEX idx_service_tickets_priority ON service_tickets(priority);
 CREATE INDEX idx_service_tickets_ice_rink_id ON service_tickets(ice_rink_id);
 CREATE INDEX idx_service_tickets_assigned_to ON service_tickets(assigned_to);
 CREATE INDEX idx_service_tickets_created_at ON service_tickets(created_at);
-CREATE INDEX idx_ticket_comments_ticket_id ON ticket_comments(ticket_id);
+-- Otwarte zgłoszenia z terminem SLA (odbudowa monitora SLA, licznik przekroczeń bez monitora)
+CREATE INDEX idx_service_tickets_sla_open ON service_tickets(sla_target) WHERE status IN ('new', 'assigned', 'in_progress');
+-- Najnowsze komentarze zgłoszenia i stronicowanie kluczem (created_at, id)
+CREATE INDEX idx_ticket_comments_ticket_created ON ticket_comments(ticket_id, created_at DESC, id DESC);
 CREATE INDEX idx_ticket_comments_created_at ON ticket_comments(created_at);
+CREATE INDEX idx_service_tickets_search ON service_tickets USING GIN (search_vector);
+CREATE INDEX idx_ticket_comments_search ON ticket_comments USING GIN (to_tsvector('simple', comment));
 CREATE INDEX idx_audit_logs_timestamp ON audit.audit_logs(timestamp);
 CREATE INDEX idx_audit_logs_user_id ON audit.audit_logs(user_id);
 CREATE INDEX idx_audit_logs_action ON audit.audit_logs(action);
@@ -324,8 +434,13 @@ CREATE INDEX idx_notifications_organization_id ON notifications(organization_id)
 CREATE INDEX idx_notifications_status ON notifications(status);
 CREATE INDEX idx_notifications_type ON notifications(type);
 CREATE INDEX idx_notifications_created_at ON notifications(created_at);
+-- Kolejka dyspozytora powiadomień (outbox): oczekujące wg terminu próby
+CREATE INDEX idx_notifications_pending ON notifications(next_attempt_at) WHERE status = 'pending';
 CREATE INDEX idx_system_config_category ON system_config(category);
-CREATE INDEX idx_user_sessions_user_id ON user_sessions(user_id);
+-- Tylko aktywne sesje (limit sesji przy logowaniu); wygasłe usuwa zadanie session_purge
+CREATE INDEX idx_user_sessions_active_user ON user_sessions(user_id, created_at DESC) WHERE is_active;
+CREATE INDEX idx_user_sessions_expires_at ON user_sessions(expires_at);
+CREATE INDEX idx_job_runs_job_started ON job_runs(job_name, started_at DESC);
 
 -- =====================================================
 -- 5. TWORZENIE TRIGGERÓW
@@ -338,11 +453,15 @@ CREATE TRIGGER update_ai_models_updated_at BEFORE UPDATE ON ai_models FOR EACH R
 CREATE TRIGGER update_service_tickets_updated_at BEFORE UPDATE ON service_tickets FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_system_config_updated_at BEFORE UPDATE ON system_config FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER generate_ticket_number_trigger BEFORE INSERT ON service_tickets FOR EACH ROW EXECUTE FUNCTION generate_ticket_number();
+CREATE TRIGGER set_ticket_sla_fields_trigger BEFORE INSERT OR UPDATE ON service_tickets FOR EACH ROW EXECUTE FUNCTION set_ticket_sla_fields();
+CREATE TRIGGER notify_ticket_sla_change_trigger AFTER INSERT OR DELETE OR UPDATE OF status, priority, sla_target, organization_id ON service_tickets FOR EACH ROW EXECUTE FUNCTION notify_ticket_sla_change();
 
 -- =====================================================
 -- 6. TWORZENIE WIDOKÓW
 -- =====================================================
 CREATE VIEW dashboard_kpi AS SELECT COUNT(DISTINCT ir.id) as total_ice_rinks, COUNT(DISTINCT CASE WHEN ir.status = 'active' THEN ir.id END) as active_ice_rinks, COUNT(DISTINCT CASE WHEN ir.ssp_status = 'connected' THEN ir.id END) as connected_ice_rinks, COUNT(DISTINCT CASE WHEN st.status IN ('new', 'assigned', 'in_progress') THEN st.id END) as active_tickets, COUNT(DISTINCT CASE WHEN st.priority = 'critical' THEN st.id END) as critical_tickets, AVG(m.ice_temperature) as avg_ice_temperature, SUM(m.energy_consumption) as total_energy_consumption FROM ice_rinks ir LEFT JOIN measurements m ON ir.id = m.ice_rink_id AND m.timestamp >= NOW() - INTERVAL '24 hours' LEFT JOIN service_tickets st ON ir.id = st.ice_rink_id AND st.status NOT IN ('resolved', 'closed') WHERE ir.status != 'inactive';
+-- Najnowsza prognoza dla każdego lodowiska i terminu, rozpakowana z wydań (do analiz i trenowania modeli)
+CREATE VIEW weather_forecasts_latest AS SELECT DISTINCT ON (r.ice_rink_id, f.forecast_time) r.ice_rink_id, wr.weather_provider_id, wr.issued_at, f.forecast_time, f.temperature_min, f.temperature_max, f.humidity FROM weather_forecast_runs wr CROSS JOIN LATERAL unnest(wr.ice_rink_ids) AS r(ice_rink_id) CROSS JOIN LATERAL unnest(wr.forecast_times, wr.temperature_min, wr.temperature_max, wr.humidity) AS f(forecast_time, temperature_min, temperature_max, humidity) ORDER BY r.ice_rink_id, f.forecast_time, wr.issued_at DESC;
 CREATE VIEW energy_savings AS SELECT ir.id as ice_rink_id, ir.name as ice_rink_name, ir.organization_id, m.timestamp, m.energy_consumption as actual_consumption, tc.theoretical_consumption, (tc.theoretical_consumption - m.energy_consumption) as energy_saved, CASE WHEN tc.theoretical_consumption > 0 THEN ((tc.theoretical_consumption - m.energy_consumption) / tc.theoretical_consumption * 100) ELSE 0 END as savings_percentage FROM measurements m JOIN ice_rinks ir ON m.ice_rink_id = ir.id LEFT JOIN theoretical_consumption tc ON m.ice_rink_id = tc.ice_rink_id AND m.timestamp = tc.timestamp WHERE m.timestamp >= NOW() - INTERVAL '30 days';
 
 -- =====================================================
@@ -367,7 +486,11 @@ FROM (
         ('system.version', '1.0.0', 'Wersja systemu', 'general'),
         ('security.session_timeout', '3600', 'Timeout sesji w sekundach', 'security'),
         ('ai.model_retraining_interval', '168', 'Interwał retrenowania modeli AI w godzinach', 'ai'),
-        ('weather.update_interval', '900', 'Interwał aktualizacji prognoz pogodowych w sekundach', 'weather')
+        ('weather.update_interval', '900', 'Interwał aktualizacji prognoz pogodowych w sekundach', 'weather'),
+        ('sla.hours.critical', '4', 'Czas na rozwiązanie zgłoszenia krytycznego w godzinach', 'general'),
+        ('sla.hours.high', '8', 'Czas na rozwiązanie zgłoszenia o wysokim priorytecie w godzinach', 'general'),
+        ('sla.hours.medium', '24', 'Czas na rozwiązanie zgłoszenia o średnim priorytecie w godzinach', 'general'),
+        ('sla.hours.low', '72', 'Czas na rozwiązanie zgłoszenia o niskim priorytecie w godzinach', 'general')
 ) AS v(key, value, description, category)
 CROSS JOIN (SELECT id FROM ins_admin) a;
 
@@ -398,6 +521,7 @@ COMMENT ON TABLE user_permissions IS 'Tabela uprawnień użytkowników do moduł
 COMMENT ON TABLE ice_rinks IS 'Tabela lodowisk monitorowanych przez system';
 COMMENT ON TABLE weather_providers IS 'Tabela dostawców danych pogodowych';
 COMMENT ON TABLE weather_forecasts IS 'Tabela prognoz pogodowych dla lodowisk';
+COMMENT ON TABLE weather_forecast_runs IS 'Historia wydań prognoz pogodowych (tablice wartości per zmienna)';
 COMMENT ON TABLE measurements IS 'Tabela pomiarów z lodowisk (dane szeregów czasowych)';
 COMMENT ON TABLE ai_models IS 'Tabela modeli AI i ich metryk';
 COMMENT ON TABLE theoretical_consumption IS 'Tabela teoretycznego zużycia energii obliczonego przez AI';
@@ -406,7 +530,8 @@ COMMENT ON TABLE ticket_comments IS 'Tabela komentarzy do zgłoszeń serwisowych
 COMMENT ON TABLE audit.audit_logs IS 'Tabela logów audytowych systemu';
 COMMENT ON TABLE notifications IS 'Tabela powiadomień systemowych';
 COMMENT ON TABLE system_config IS 'Tabela konfiguracji systemu';
-COMMENT ON TABLE user_sessions IS 'Tabela do śledzenia aktywnych sesji (tokenów JWT) dla mechanizmu wylogowania.';
+COMMENT ON TABLE user_sessions IS 'Tabela do śledzenia aktywnych sesji (tokenów JWT) dla mechanizmu wylogowania. Wygasłe wiersze usuwa zadanie session_purge.';
+COMMENT ON TABLE job_runs IS 'Historia uruchomień zadań w tle (czas trwania i wynik).';
 
 -- =====================================================
 -- 10. POLITYKI RETENCJI (PRZYKŁADY)
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+import pytest
+
+from app.query_stats import track_queries
+
+@pytest.fixture
+def query_budget():
+    """
+    Limit zapytań SQL dla bloku kodu (np. jednego zapytania HTTP przez ASGITransport):
+
+        with query_budget(5):
+            await client.get("/api/dashboard/kpi", headers=headers)
+
+    Test nie przechodzi, gdy blok wykona więcej zapytań niż `max_queries` albo powtórzy
+    ten sam kształt zapytania co najmniej `repeat_threshold` razy (N+1).
+    """
+    @contextmanager
+    def budget(max_queries: int, repeat_threshold: int = 3):
+        with track_queries() as stats:
+            yield stats
+        listing = "\n".join(f"  {count}x {statement}" for statement, count in stats.statements.most_common())
+        assert stats.count <= max_queries, f"{stats.count} SQL queries, budget {max_queries}:\n{listing}"
+        repeated = stats.repeated(repeat_threshold)
+        assert not repeated, "repeated SQL (N+1):\n" + "\n".join(f"  {count}x {shape}" for shape, count in repeated)
+
+    return budget
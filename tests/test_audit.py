@@ -0,0 +1,157 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+
+import asyncpg
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+
+from app.audit import AuditLogger, AuditMiddleware, request_entry
+
+class ListAuditLogger(AuditLogger):
+    """Zapis do listy zamiast COPY do bazy."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**{"max_queue": 100, "batch_size": 10, "flush_interval_s": 0.01, "drain_timeout_s": 1,
+                            **kwargs})
+        self.rows = []
+
+    async def _write(self, batch):
+        self.rows.extend(batch)
+
+def _app(audit: AuditLogger, user_id: uuid.UUID) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(AuditMiddleware, audit=audit)
+
+    @app.put("/api/service-tickets/{ticket_id}/status")
+    async def update_ticket_status(ticket_id: uuid.UUID, request: Request):
+        request.state.user_id = str(user_id)
+        return {"ok": True}
+
+    @app.get("/api/service-tickets/{ticket_id}")
+    async def get_ticket(ticket_id: uuid.UUID):
+        return {"ok": True}
+
+    @app.post("/api/users")
+    async def create_user():
+        raise HTTPException(status_code=403)
+
+    return app
+
+def test_mutations_are_recorded_off_request_path():
+    async def run():
+        audit, user_id, ticket_id = ListAuditLogger(), uuid.uuid4(), uuid.uuid4()
+        audit.start()
+        transport = httpx.ASGITransport(app=_app(audit, user_id), client=("10.0.0.7", 5000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test",
+                                     headers={"User-Agent": "pytest"}) as client:
+            await client.put(f"/api/service-tickets/{ticket_id}/status")
+            await client.get(f"/api/service-tickets/{ticket_id}")
+            await client.post("/api/users")
+            await client.delete("/api/unknown")
+        # Zapytania tylko dodały wpisy do kolejki - zapis następuje przy zamknięciu
+        assert audit.rows == [] and audit.recorded == 2
+        await audit.stop()
+        return audit.rows, user_id, ticket_id
+
+    (update, denied), user_id, ticket_id = asyncio.run(run())
+    assert (update["action"], update["module"], update["resource_type"]) == \
+        ("update_ticket_status", "service-tickets", "ticket")
+    assert (update["user_id"], update["resource_id"], update["result"]) == (user_id, ticket_id, "success")
+    assert (update["ip_address"], update["user_agent"]) == ("10.0.0.7", "pytest")
+    assert update["details"]["path"] == "/api/service-tickets/{ticket_id}/status"
+    assert (denied["action"], denied["user_id"], denied["result"]) == ("create_user", None, "failure")
+    assert denied["details"]["status_code"] == 403
+
+def test_full_queue_drops_entries_and_failed_batches_are_retried():
+    class FlakyAuditLogger(ListAuditLogger):
+        failures = 1
+
+        async def _write(self, batch):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("database is down")
+            await super()._write(batch)
+
+    async def run():
+        audit = FlakyAuditLogger(max_queue=5, batch_size=3, flush_interval_s=60)
+        audit.start()
+        for i in range(8):
+            audit.record({"n": i})
+        # Nieudana partia wraca na początek kolejki, kolejny flush zapisuje wszystko w kolejności
+        assert await audit.flush() is False
+        assert await audit.flush() is True
+        await audit.stop()
+        return audit
+
+    audit = asyncio.run(run())
+    assert (audit.dropped, audit.failed_batches, audit.written) == (3, 1, 5)
+    assert [row["n"] for row in audit.rows] == [0, 1, 2, 3, 4]
+
+def test_invalid_client_host_is_stored_without_ip():
+    scope = {"route": _app(None, uuid.uuid4()).routes[-1], "method": "POST", "path_params": {},
+             "client": ("testclient", 50000), "headers": []}
+    assert request_entry(scope, 201, 0.01)["ip_address"] is None
+    scope["client"] = ("::ffff:10.0.0.7", 1)
+    assert request_entry(scope, 201, 0.01)["ip_address"] == "::ffff:10.0.0.7"
+
+def test_rows_rejected_by_database_are_dropped_not_retried():
+    class StrictAuditLogger(AuditLogger):
+        def __init__(self):
+            super().__init__(max_queue=100, batch_size=10, flush_interval_s=60, drain_timeout_s=1)
+            self.rows = []
+
+        async def _copy(self, batch):
+            if any(entry["n"] % 4 == 0 for entry in batch):
+                raise asyncpg.InvalidTextRepresentationError("invalid input syntax for type inet")
+            self.rows.extend(batch)
+
+    async def run():
+        audit = StrictAuditLogger()
+        audit.start()
+        for i in range(1, 10):
+            audit.record({"n": i})
+        assert await audit.flush() is True
+        await audit.stop()
+        return audit
+
+    audit = asyncio.run(run())
+    assert [row["n"] for row in audit.rows] == [1, 2, 3, 5, 6, 7, 9]
+    assert (audit.rejected, audit.written, audit.failed_batches, audit.stats()["queued"]) == (2, 7, 0, 0)
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+def test_copy_skips_entries_with_invalid_column_values():
+    from sqlalchemy import text
+
+    from app.db import SessionLocal, engine
+
+    def entry(ip: str, details: dict) -> dict:
+        return {"timestamp": datetime.now(timezone.utc), "user_id": None, "action": "test_audit_copy",
+                "module": "test", "resource_type": "test", "resource_id": None, "ip_address": ip,
+                "user_agent": "test-audit-copy", "details": details, "result": "success", "error_message": None}
+
+    async def run():
+        audit = AuditLogger(max_queue=100, batch_size=10, flush_interval_s=60, drain_timeout_s=1)
+        audit.start()
+        try:
+            # Błąd po stronie klienta (INET) i po stronie bazy (\u0000 w jsonb)
+            for entry_ in (entry("10.0.0.1", {}), entry("testclient", {}), entry("10.0.0.2", {"x": "\u0000"}),
+                           entry("10.0.0.3", {})):
+                audit.record(entry_)
+            assert await audit.flush() is True
+            async with SessionLocal() as session:
+                ips = (await session.execute(text(
+                    "SELECT host(ip_address) FROM audit.audit_logs WHERE user_agent = 'test-audit-copy' ORDER BY 1"
+                ))).scalars().all()
+                await session.execute(text("DELETE FROM audit.audit_logs WHERE user_agent = 'test-audit-copy'"))
+                await session.commit()
+            return audit, ips
+        finally:
+            await audit.stop()
+            await engine.dispose()
+
+    audit, ips = asyncio.run(run())
+    assert ips == ["10.0.0.1", "10.0.0.3"]
+    assert (audit.rejected, audit.written) == (2, 2)
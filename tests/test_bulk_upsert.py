@@ -0,0 +1,81 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.models import Measurement
+from app.repositories.base import PG_MAX_BIND_PARAMS, bulk_upsert
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+class RecordingSession:
+    """Zbiera wykonywane zapytania zamiast wysyłać je do bazy."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+def _measurements(rink_id, count: int, temperature: float = -5.0) -> list:
+    return [
+        {"ice_rink_id": rink_id, "timestamp": START + timedelta(minutes=i), "ice_temperature": temperature,
+         "chiller_power": 50, "chiller_status": "running", "energy_consumption": 10}
+        for i in range(count)
+    ]
+
+def test_values_are_chunked_by_bind_parameter_limit_and_deduplicated():
+    rink_id = uuid.uuid4()
+    # Drugi zestaw ma te same klucze - zostaje ostatnie wystąpienie
+    rows = _measurements(rink_id, 5000) + _measurements(rink_id, 5000, temperature=-7.0)
+    session = RecordingSession()
+
+    count = asyncio.run(bulk_upsert(session, Measurement, rows, index_elements=["ice_rink_id", "timestamp"],
+                                    update_columns=["ice_temperature"], method="values"))
+
+    assert count == 5000
+    compiled = [s.compile(dialect=postgresql.dialect()) for s in session.statements]
+    # 6 kolumn + 3 wartości domyślne po stronie Pythona (id, data_source, quality_score) na wiersz
+    assert len(compiled) == 2
+    assert all(len(c.params) <= PG_MAX_BIND_PARAMS for c in compiled)
+    assert sum(len(c.params) for c in compiled) == 5000 * 9
+    temperatures = {v for c in compiled for k, v in c.params.items() if k.startswith("ice_temperature")}
+    assert temperatures == {-7.0}
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+@pytest.mark.parametrize("method", ["values", "copy"])
+def test_measurement_upsert_updates_existing_rows(method):
+    from app.db import SessionLocal, engine
+    from app.repositories.measurement import MeasurementRepository
+
+    async def run():
+        try:
+            async with SessionLocal() as session:
+                admin = (await session.execute(text(
+                    "SELECT id, organization_id FROM users WHERE username = 'admin'"))).one()
+                rink_id = (await session.execute(text("""
+                    INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption,
+                                           created_by)
+                    VALUES (:org, 'test-bulk-upsert', 'test', 'test', 100, :admin) RETURNING id
+                """), {"org": admin.organization_id, "admin": admin.id})).scalar_one()
+                try:
+                    assert await MeasurementRepository(session).bulk_upsert(_measurements(rink_id, 10)) == 10
+                    rows = _measurements(rink_id, 20, temperature=-6.0) + _measurements(rink_id, 5, temperature=-8.0)
+                    assert await bulk_upsert(session, Measurement, rows, index_elements=["ice_rink_id", "timestamp"],
+                                             update_columns=["ice_temperature"], method=method) == 20
+                    await session.commit()
+                    return (await session.execute(text("""
+                        SELECT ice_temperature::float, count(*) FROM measurements WHERE ice_rink_id = :rink
+                        GROUP BY 1 ORDER BY 1
+                    """), {"rink": rink_id})).all()
+                finally:
+                    await session.execute(text("DELETE FROM ice_rinks WHERE id = :rink"), {"rink": rink_id})
+                    await session.commit()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) == [(-8.0, 5), (-6.0, 15)]
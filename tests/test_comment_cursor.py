@@ -0,0 +1,106 @@
+"""
+Kursor keyset komentarzy zgłoszeń.
+
+Test stronicowania z bazą wymaga jednorazowej bazy załadowanej z setup_database.sql (konto admin / admin123):
+    DB_TESTS=1 DATABASE_URL=postgresql+asyncpg://... python -m pytest tests/test_comment_cursor.py
+"""
+import asyncio
+import base64
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.utils import decode_cursor, encode_cursor
+
+def test_cursor_round_trip_keeps_microseconds_and_offset():
+    comment_id = uuid.uuid4()
+    for created_at in (datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+                       datetime(2026, 3, 1, 14, 30, 15, 1, tzinfo=timezone(timedelta(hours=2)))):
+        cursor = encode_cursor(created_at, comment_id)
+        assert "=" not in cursor
+        decoded_at, decoded_id = decode_cursor(cursor)
+        assert (decoded_at, decoded_id) == (created_at, comment_id)
+        assert decoded_at.utcoffset() == created_at.utcoffset()
+
+@pytest.mark.parametrize("cursor", [
+    "garbage!",
+    "Zm9v",  # "foo" - bez separatora
+    encode_cursor(datetime(2026, 3, 1, tzinfo=timezone.utc), uuid.uuid4())[:-5],
+    encode_cursor(datetime(2026, 3, 1, tzinfo=timezone.utc), uuid.uuid4())[:21],
+    base64.urlsafe_b64encode(b"\xff\xfe|x").decode(),
+    # Data bez strefy nie da się porównać z timestamptz
+    base64.urlsafe_b64encode(f"2026-03-01T12:00:00|{uuid.uuid4()}".encode()).decode(),
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+    assert exc.value.detail["error"]["code"] == "INVALID_CURSOR"
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+def test_pages_cover_all_comments_when_created_at_ties():
+    from app.db import SessionLocal, engine
+    from app.main import app
+
+    async def main():
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                login = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+                data = login.json()["data"]
+                headers = {"Authorization": f"Bearer {data['access_token']}"}
+                async with SessionLocal() as session:
+                    ticket_id = await _seed_ticket(session, data["user"])
+                try:
+                    ids, cursor = [], None
+                    while True:
+                        url = f"/api/service-tickets/{ticket_id}/comments?limit=3"
+                        page = (await client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers))
+                        assert page.status_code == 200
+                        ids += [item["id"] for item in page.json()["items"]]
+                        cursor = page.json()["next_cursor"]
+                        if cursor is None:
+                            break
+                    bad = await client.get(f"/api/service-tickets/{ticket_id}/comments?cursor=garbage!",
+                                           headers=headers)
+                    return ids, bad
+                finally:
+                    async with SessionLocal() as session:
+                        await session.execute(text("DELETE FROM service_tickets WHERE id = :id"), {"id": ticket_id})
+                        await session.commit()
+        finally:
+            await engine.dispose()
+
+    ids, bad = asyncio.run(main())
+    # 5 komentarzy z tym samym created_at i 3 starsze
+    assert len(ids) == 8 and len(set(ids)) == 8
+    assert bad.status_code == 400
+
+async def _seed_ticket(session, user: dict) -> uuid.UUID:
+    rink_id = (await session.execute(text("SELECT id FROM ice_rinks WHERE organization_id = :org LIMIT 1"),
+                                     {"org": user["organization_id"]})).scalar()
+    if rink_id is None:
+        rink_id = (await session.execute(text("""
+            INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by)
+            VALUES (:org, 'test-comment-cursor', 'test', 'test', 100, :user) RETURNING id
+        """), {"org": user["organization_id"], "user": user["id"]})).scalar_one()
+    ticket_id = (await session.execute(text("""
+        INSERT INTO service_tickets (ice_rink_id, organization_id, created_by, priority, status, category,
+                                     source, title, description)
+        VALUES (:rink, :org, :user, 'low', 'new', 'test-comment-cursor', 'manual', 'Cursor', 'Cursor')
+        RETURNING id
+    """), {"rink": rink_id, "org": user["organization_id"], "user": user["id"]})).scalar_one()
+    await session.execute(text("""
+        INSERT INTO ticket_comments (ticket_id, user_id, comment, created_at)
+        SELECT :ticket, :user, 'comment ' || n,
+               CASE WHEN n <= 5 THEN timestamptz '2026-03-01 12:00:00.123456+00'
+                    ELSE timestamptz '2026-03-01 11:00:00+00' - make_interval(secs => n) END
+        FROM generate_series(1, 8) n
+    """), {"ticket": ticket_id, "user": user["id"]})
+    await session.commit()
+    return ticket_id
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from app.db import InstrumentedPool
+
+class FakeDBAPIConnection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def _refuse():
+    raise ConnectionRefusedError("database is down")
+
+def test_timeouts_and_connect_errors_are_not_counted_as_acquisitions():
+    async def run():
+        pool = InstrumentedPool(FakeDBAPIConnection, pool_size=1, max_overflow=0, timeout=0.05)
+        first = await greenlet_spawn(pool.connect)
+        with pytest.raises(exc.TimeoutError):
+            await greenlet_spawn(pool.connect)
+        first.close()
+
+        refusing = InstrumentedPool(_refuse, pool_size=1, max_overflow=0, timeout=0.05)
+        with pytest.raises(ConnectionRefusedError):
+            await greenlet_spawn(refusing.connect)
+        return pool.stats(), refusing.stats()
+
+    stats, refusing = asyncio.run(run())
+    assert (stats["acquired"], stats["timeouts"], stats["waiting"]) == (1, 1, 0)
+    # Czas oczekiwania tylko udanego pobrania - bez 50 ms timeoutu
+    assert stats["wait_max_ms"] < 50
+    assert (refusing["acquired"], refusing["timeouts"], refusing["waiting"], refusing["wait_avg_ms"]) == (0, 0, 0, 0.0)
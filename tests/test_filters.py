@@ -0,0 +1,62 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.filters import build_conditions, list_query
+from app.repositories.service_ticket import ServiceTicketRepository
+
+def _parse(filter=(), sort=None, fields=None):
+    dependency = list_query(ServiceTicketRepository.list_options)
+    return asyncio.run(dependency(filter=list(filter), sort=sort, fields=fields))
+
+def test_filters_are_parsed_and_coerced():
+    rink_id = uuid.uuid4()
+    query = _parse(
+        filter=[f"ice_rink_id:eq:{rink_id}", "status:in:new,assigned", "created_at:gte:2024-01-01T00:00:00Z"],
+        sort="-priority,created_at",
+        fields="id,status",
+    )
+    assert query.filters[0] == ("ice_rink_id", "eq", rink_id)
+    assert query.filters[1] == ("status", "in", ["new", "assigned"])
+    assert isinstance(query.filters[2][2], datetime)
+    assert query.sort == [("priority", True), ("created_at", False)]
+    assert query.fields == ["id", "status"]
+
+def test_default_sort_is_newest_first():
+    assert _parse().sort == [("created_at", True)]
+
+@pytest.mark.parametrize("kwargs", [
+    {"filter": ["description:eq:x"]},
+    {"filter": ["status:gte:new"]},
+    {"filter": ["status"]},
+    {"filter": ["ice_rink_id:eq:not-a-uuid"]},
+    {"sort": "description"},
+    {"fields": "id,alarm_data"},
+])
+def test_rejects_fields_outside_allow_list(kwargs):
+    with pytest.raises(HTTPException) as exc:
+        _parse(**kwargs)
+    assert exc.value.status_code == 400
+
+def test_ilike_escapes_wildcards():
+    query = _parse(filter=["title:ilike:50%_off"])
+    model = ServiceTicketRepository.list_options.model
+    sql = str(build_conditions(model, query)[0].compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+    assert "ILIKE" in sql and "ESCAPE '/'" in sql and "/_off" in sql
+
+def test_ticket_filters_scope_clients_to_own_organization():
+    from app.routers.service_tickets import ticket_filters
+
+    own_org, other_org = uuid.uuid4(), uuid.uuid4()
+    client = {"role": "client", "organization_id": str(own_org)}
+    filters = asyncio.run(ticket_filters(
+        status=["new", "assigned"], priority=None, ice_rink_id=None,
+        organization_id=other_org, assigned_to=None, user_payload=client,
+    ))
+    assert filters == {"status": ["new", "assigned"], "organization_id": own_org}
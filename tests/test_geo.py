@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+from app.geo import cell_key, centroid, geohash_encode, group_by_cell
+
+def test_geohash_known_value():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+def test_nearby_rinks_share_cell():
+    rinks = [
+        SimpleNamespace(name="A", latitude=52.2297, longitude=21.0122),
+        SimpleNamespace(name="B", latitude=52.2299, longitude=21.0125),
+        SimpleNamespace(name="C", latitude=50.0647, longitude=19.9450),
+    ]
+    cells = group_by_cell(rinks, mode="geohash", precision=6)
+    assert sorted(len(v) for v in cells.values()) == [1, 2]
+
+    cells = group_by_cell(rinks, mode="off")
+    assert len(cells) == 3
+
+def test_round_mode_and_centroid():
+    assert cell_key(52.2297, 21.0122, mode="round", precision=2) == "52.23:21.01"
+    points = [SimpleNamespace(latitude=1.0, longitude=2.0), SimpleNamespace(latitude=3.0, longitude=4.0)]
+    assert centroid(points) == (2.0, 3.0)
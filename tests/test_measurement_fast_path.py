@@ -0,0 +1,23 @@
+import uuid
+from datetime import datetime, timezone
+
+from asyncpg.pgproto import pgproto
+from pydantic import TypeAdapter
+
+from app.repositories.measurement import MEASUREMENT_FIELDS
+from app.schemas import MeasurementResponse, PaginatedResponse
+from app.utils import paginated_json
+
+def test_fast_path_matches_response_model_bytes():
+    rows = [
+        (datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc), -5.25, 40.0, "praca", None, 55.1, 1234.57,
+         "ssp", 1.0, pgproto.UUID(str(uuid.uuid4())), uuid.uuid4()),
+        (datetime(2024, 1, 1, 11, 59, 0, 123456, tzinfo=timezone.utc), 0.1, 0.0, "stop", 12.5, None, 0.33,
+         "manual", 0.95, uuid.uuid4(), uuid.uuid4()),
+    ]
+    items = [dict(zip(MEASUREMENT_FIELDS, row)) for row in rows]
+    adapter = TypeAdapter(PaginatedResponse[MeasurementResponse])
+    expected = adapter.dump_json(adapter.validate_python({
+        "page": 2, "limit": 2, "pages": 3, "total": 5, "has_next": True, "has_prev": True, "items": items,
+    }))
+    assert paginated_json(2, 2, 5, items).body == expected
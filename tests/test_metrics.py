@@ -0,0 +1,55 @@
+import asyncio
+import uuid
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from prometheus_client import REGISTRY
+
+from app import query_stats
+from app.metrics import MetricsMiddleware, render
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/api/test-metrics/{item_id}")
+    async def get_item(item_id: uuid.UUID):
+        if query_stats.current() is None or query_stats.current().count != 0:
+            raise HTTPException(status_code=500)
+        return {"ok": True}
+
+    @app.post("/api/test-metrics")
+    async def create_item():
+        raise HTTPException(status_code=409)
+
+    route = "/api/test-metrics/{item_id}"
+    before = (_sample("http_requests_total", method="GET", route=route, status="200"),
+              _sample("http_requests_total", method="GET", route="other", status="404"),
+              _sample("http_requests_total", method="other", route="other", status="404"))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for _ in range(3):
+                assert (await client.get(f"/api/test-metrics/{uuid.uuid4()}")).status_code == 200
+            await client.post("/api/test-metrics")
+            await client.get("/api/test-metrics-missing")
+            # Dowolne tokeny metody od klienta nie tworzą nowych serii
+            for method in ("FOO", "X-RANDOM-1", "X-RANDOM-2"):
+                await client.request(method, "/api/test-metrics-missing")
+
+    asyncio.run(run())
+    # Każdy identyfikator trafia do jednej serii - etykietą jest szablon trasy, nie ścieżka
+    assert _sample("http_requests_total", method="GET", route=route, status="200") == before[0] + 3
+    assert _sample("http_requests_total", method="GET", route="other", status="404") == before[1] + 1
+    assert _sample("http_requests_total", method="other", route="other", status="404") == before[2] + 3
+    assert b'method="FOO"' not in render()[0]
+    assert _sample("http_requests_total", method="POST", route="/api/test-metrics", status="409") >= 1
+    assert _sample("http_request_duration_seconds_count", method="GET", route=route) >= 3
+    assert _sample("http_request_db_queries_sum", method="GET", route=route) == 0
+
+    body, content_type = render()
+    assert content_type.startswith("text/plain")
+    assert b'http_requests_total{method="GET",route="/api/test-metrics/{item_id}",status="200"}' in body
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from app.notifications import HttpSender, NotificationDispatcher, SmtpSender, DeliveryError
+
+def _notification(type_: str, **metadata) -> dict:
+    return {"id": uuid.uuid4(), "type": type_, "title": "Alarm", "message": "Temperatura lodu -1.5",
+            "organization_id": None, "retry_count": 0, "metadata": metadata, "user_email": None}
+
+async def _smtp_server(received: list):
+    """Minimalny serwer SMTP: odrzuca adresy zawierające 'reject'."""
+    async def handle(reader, writer):
+        writer.write(b"220 mock\r\n")
+        in_data = False
+        while line := await reader.readline():
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    received.append(line)
+                    writer.write(b"250 queued\r\n")
+            elif line[:4].upper() == b"DATA":
+                in_data = True
+                writer.write(b"354 go ahead\r\n")
+            elif line[:4].upper() == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                break
+            elif line[:4].upper() == b"RCPT" and b"reject" in line:
+                writer.write(b"550 no such user\r\n")
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+def test_webhook_errors_are_classified():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response({"/ok": 204, "/busy": 503}.get(request.url.path, 400))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            sender = HttpSender(client)
+            await sender.send(_notification("webhook", url="http://hook/ok"))
+            errors = []
+            for notification in (_notification("webhook", url="http://hook/busy"),
+                                 _notification("webhook", url="http://hook/bad"),
+                                 _notification("webhook"), _notification("sms", phone="+48100200300")):
+                try:
+                    await sender.send(notification)
+                except DeliveryError as e:
+                    errors.append(e.retryable)
+            return errors
+
+    assert asyncio.run(run()) == [True, False, False, False]
+
+def test_smtp_batch_reports_each_message():
+    async def run():
+        received = []
+        server = await _smtp_server(received)
+        port = server.sockets[0].getsockname()[1]
+        sender = SmtpSender("127.0.0.1", port, "noreply@test", connections=2)
+        batch = [_notification("email", email=f"user{i}@test") for i in range(5)]
+        batch.append(_notification("email", email="reject@test"))
+        batch.append(_notification("email"))
+        async with server:
+            results = await sender.send_batch(batch)
+        return received, [results[n["id"]] for n in batch]
+
+    received, results = asyncio.run(run())
+    assert len(received) == 5
+    assert results[:5] == [None] * 5
+    assert [r.retryable for r in results[5:]] == [False, False]
+
+class SlowHttpSender:
+    """Webhook `slow` odpowiada dopiero po `delay_s` - dłużej niż dzierżawa partii."""
+
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+
+    async def send(self, notification: dict) -> None:
+        if notification["metadata"].get("url") == "http://hook/slow":
+            await asyncio.sleep(self.delay_s)
+
+async def _seed_webhooks(session, *urls: str) -> list:
+    rows = await session.execute(text("""
+        INSERT INTO notifications (type, title, message, metadata)
+        SELECT 'webhook', 'test-lease', 'test', jsonb_build_object('url', url)
+        FROM unnest(CAST(:urls AS text[])) AS url
+        RETURNING id
+    """), {"urls": list(urls)})
+    ids = list(rows.scalars())
+    await session.commit()
+    return ids
+
+async def _notification_states(session, ids: list) -> list:
+    rows = await session.execute(text("""
+        SELECT status, retry_count FROM notifications WHERE id = ANY(CAST(:ids AS uuid[]))
+        ORDER BY array_position(CAST(:ids AS uuid[]), id)
+    """), {"ids": ids})
+    return [tuple(row) for row in rows]
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+def test_delivery_outlasting_the_lease_is_cut_off_and_retried():
+    from app.db import SessionLocal, engine
+
+    async def run():
+        try:
+            async with SessionLocal() as session:
+                ids = await _seed_webhooks(session, "http://hook/fast", "http://hook/slow")
+            try:
+                dispatcher = NotificationDispatcher(batch_size=1000, concurrency=2, poll_s=1, lease_s=0.6,
+                                                    max_retries=6, backoff_base_s=30, backoff_cap_s=60)
+                dispatcher.http = SlowHttpSender(delay_s=5)
+                started = asyncio.get_running_loop().time()
+                await dispatcher.dispatch_once()
+                elapsed = asyncio.get_running_loop().time() - started
+                async with SessionLocal() as session:
+                    return elapsed, await _notification_states(session, ids)
+            finally:
+                async with SessionLocal() as session:
+                    await session.execute(text("DELETE FROM notifications WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                                          {"ids": ids})
+                    await session.commit()
+        finally:
+            await engine.dispose()
+
+    elapsed, states = asyncio.run(run())
+    assert elapsed < 0.6
+    # Szybki webhook wysłany, wolny wraca do kolejki jako ponawialny błąd
+    assert states == [("sent", 0), ("pending", 1)]
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+def test_results_are_not_written_after_the_lease_was_taken_over():
+    from app.db import SessionLocal, engine
+    from app.repositories.notification import NotificationRepository
+
+    async def run():
+        try:
+            async with SessionLocal() as session:
+                ids = await _seed_webhooks(session, "http://hook/a", "http://hook/b")
+            try:
+                async with SessionLocal() as first, SessionLocal() as second:
+                    stale = [n for n in await NotificationRepository(first).claim_batch(1000, 0.05) if n["id"] in ids]
+                    await asyncio.sleep(0.1)
+                    # Dzierżawa wygasła - partię pobiera drugi worker
+                    current = [n for n in await NotificationRepository(second).claim_batch(1000, 60) if n["id"] in ids]
+                    assert len(stale) == len(current) == 2
+                    await NotificationRepository(first).mark_sent(ids, stale[0]["leased_until"])
+                    await NotificationRepository(first).mark_failed([(ids[1], "late", True, 0.0)],
+                                                                    stale[0]["leased_until"])
+                    after_stale = await _notification_states(first, ids)
+                    await NotificationRepository(second).mark_sent(ids, current[0]["leased_until"])
+                    return after_stale, await _notification_states(second, ids)
+            finally:
+                async with SessionLocal() as session:
+                    await session.execute(text("DELETE FROM notifications WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                                          {"ids": ids})
+                    await session.commit()
+        finally:
+            await engine.dispose()
+
+    after_stale, after_current = asyncio.run(run())
+    assert after_stale == [("pending", 0), ("pending", 0)]
+    assert after_current == [("sent", 0), ("sent", 0)]
@@ -0,0 +1,119 @@
+"""
+Liczba zapytań SQL na endpoint i wykrywanie N+1.
+
+Testy z bazą wymagają jednorazowej bazy załadowanej z setup_database.sql (konto admin / admin123):
+    DB_TESTS=1 DATABASE_URL=postgresql+asyncpg://... python -m pytest tests/test_query_budget.py
+"""
+import asyncio
+import os
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from app.query_stats import QueryStats, statement_shape
+
+db_tests = pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+
+RINKS = 8
+
+def test_statement_shape_ignores_literals_and_list_lengths():
+    assert statement_shape("SELECT * FROM t WHERE id = $1 AND name = 'a''b' LIMIT 10") == \
+        "SELECT * FROM t WHERE id = ? AND name = ? LIMIT ?"
+    assert statement_shape("SELECT x1 FROM t WHERE id IN ($1, $2,\n $3)") == \
+        statement_shape("SELECT x1 FROM t  WHERE id IN ($7)")
+
+def test_repeated_groups_statements_by_shape():
+    stats = QueryStats(count=7)
+    stats.statements.update({"SELECT * FROM m WHERE rink = $1 LIMIT 1": 3,
+                             "SELECT * FROM m WHERE rink = $1 LIMIT 2": 2, "SELECT 1": 2})
+    assert stats.repeated(5) == [("SELECT * FROM m WHERE rink = ? LIMIT ?", 5)]
+    assert stats.repeated(8) == []
+
+async def _seed_rinks(session, org_id, admin_id, first: int = 1) -> None:
+    # Lodowiska z pomiarami - pętla po lodowiskach w endpoincie dałaby zapytanie na każde z nich
+    await session.execute(text("""
+        INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by)
+        SELECT :org, 'test-query-budget ' || n, 'test', 'test', 100, :admin
+        FROM generate_series(CAST(:first AS int), CAST(:first AS int) + CAST(:rinks AS int) - 1) n
+    """), {"org": org_id, "admin": admin_id, "first": first, "rinks": RINKS})
+    await session.execute(text("""
+        INSERT INTO measurements (ice_rink_id, timestamp, ice_temperature, chiller_power, chiller_status,
+                                  energy_consumption)
+        SELECT r.id, now() - make_interval(hours => h), -5, 50, 'running', 10
+        FROM ice_rinks r, generate_series(1, 24) h
+        WHERE r.name LIKE 'test-query-budget %'
+          AND NOT EXISTS (SELECT 1 FROM measurements m WHERE m.ice_rink_id = r.id)
+    """))
+
+def _run(scenario):
+    from app.db import SessionLocal, engine
+    from app.main import app
+
+    async def main():
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                login = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+                data = login.json()["data"]
+                headers = {"Authorization": f"Bearer {data['access_token']}"}
+                async def seed(first: int = 1):
+                    async with SessionLocal() as session:
+                        await _seed_rinks(session, data["user"]["organization_id"], data["user"]["id"], first)
+                        await session.commit()
+
+                await seed()
+                try:
+                    await scenario(client, headers, seed)
+                finally:
+                    async with SessionLocal() as session:
+                        await session.execute(text("DELETE FROM ice_rinks WHERE name LIKE 'test-query-budget %'"))
+                        await session.commit()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+@db_tests
+def test_dashboard_query_count_does_not_grow_with_rinks(query_budget):
+    async def scenario(client, headers, seed):
+        with query_budget(7) as kpi_queries:
+            response = await client.get("/api/dashboard/kpi?time_range=1d", headers=headers)
+        assert response.status_code == 200
+        kpi = response.json()["data"]
+        assert kpi["total_ice_rinks"] >= RINKS
+        assert kpi["total_energy_consumption"] >= RINKS * 10 * 23
+
+        with query_budget(4) as map_queries:
+            response = await client.get("/api/dashboard/map", headers=headers)
+        assert response.status_code == 200
+        temperatures = {r["name"]: r["current_temperature"] for r in response.json()["data"]}
+        assert temperatures["test-query-budget 1"] == -5
+
+        # Dwa razy więcej lodowisk - ta sama liczba zapytań
+        await seed(RINKS + 1)
+        with query_budget(7) as more_kpi_queries:
+            response = await client.get("/api/dashboard/kpi?time_range=1d", headers=headers)
+        assert response.json()["data"]["total_ice_rinks"] == kpi["total_ice_rinks"] + RINKS
+        with query_budget(4) as more_map_queries:
+            await client.get("/api/dashboard/map", headers=headers)
+        assert (more_kpi_queries.count, more_map_queries.count) == (kpi_queries.count, map_queries.count)
+
+    _run(scenario)
+
+@db_tests
+def test_list_endpoints_stay_within_budget(query_budget):
+    async def scenario(client, headers, seed):
+        rinks = (await client.get("/api/ice-rinks?limit=100", headers=headers)).json()["items"]
+        rink_id = next(r["id"] for r in rinks if r["name"].startswith("test-query-budget"))
+        for url, budget in [
+            ("/api/ice-rinks?limit=100", 3),
+            (f"/api/ice-rinks/{rink_id}", 5),
+            (f"/api/ice-rinks/{rink_id}/measurements?limit=100", 3),
+            ("/api/service-tickets?limit=100", 3),
+        ]:
+            with query_budget(budget):
+                response = await client.get(url, headers=headers)
+            assert response.status_code == 200, url
+
+    _run(scenario)
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+from app.rate_limiter import TokenBucket, backoff_delay
+
+def test_token_bucket_allows_burst_up_to_capacity():
+    async def run():
+        bucket = TokenBucket(rate=1, period=60, capacity=5)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) < 0.1
+
+def test_token_bucket_paces_after_burst():
+    async def run():
+        bucket = TokenBucket(rate=20, period=1, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 1 token od razu, kolejne 4 co 50 ms
+    assert asyncio.run(run()) >= 0.19
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=1.0, cap=5.0) <= 5.0
@@ -15,6 +15,8 @@ def test_basic_routes_exist():
         "/api/weather/providers",
         "/api/ice-rinks/{rink_id}/measurements",
         "/api/ice-rinks/{rink_id}/weather-forecasts",
+        "/api/system/jobs",
+        "/api/system/jobs/{job_name}/run",
     ]
 
     for expected_path in expected_paths:
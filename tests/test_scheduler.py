@@ -0,0 +1,63 @@
+import asyncio
+from typing import Optional
+
+import pytest
+
+from app.scheduler import JobScheduler, lock_key
+
+def test_lock_key_is_stable_signed_bigint():
+    key = lock_key("weather_forecasts")
+    assert key == lock_key("weather_forecasts")
+    assert key != lock_key("session_purge")
+    assert -(2 ** 63) <= key < 2 ** 63
+
+def test_job_decorator_registers_job():
+    scheduler = JobScheduler()
+
+    @scheduler.job("demo", seconds=30, wait_first=True)
+    async def demo():
+        return {"ok": True}
+
+    job = scheduler.get_job("demo")
+    assert job.func is demo
+    assert job.seconds == 30 and job.wait_first
+    assert [j.name for j in scheduler.jobs] == ["demo"]
+
+def test_app_jobs_are_registered():
+    from app import tasks  # noqa: F401
+    from app.scheduler import scheduler
+
+    assert {"weather_forecasts", "session_purge"} <= {j.name for j in scheduler.jobs}
+
+class FakeConnection:
+    """Połączenie, na którym zapytanie zwalniające blokadę jest przerywane."""
+
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+        self.calls = []
+
+    async def execute(self, statement, parameters=None):
+        self.calls.append("execute")
+        if self.error is not None:
+            raise self.error
+
+    async def commit(self):
+        self.calls.append("commit")
+
+    async def invalidate(self):
+        self.calls.append("invalidate")
+
+    async def close(self):
+        self.calls.append("close")
+
+@pytest.mark.parametrize("error", [asyncio.CancelledError(), ConnectionError("connection lost")])
+def test_interrupted_unlock_invalidates_connection(error):
+    conn = FakeConnection(error)
+    with pytest.raises(type(error)):
+        asyncio.run(JobScheduler()._release("demo", conn))
+    assert conn.calls == ["execute", "invalidate", "close"]
+
+def test_unlock_returns_connection_to_pool():
+    conn = FakeConnection()
+    asyncio.run(JobScheduler()._release("demo", conn))
+    assert conn.calls == ["execute", "commit", "close"]
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from app.repositories.search import SearchRepository, prefix_tsquery
+
+def test_prefix_tsquery_matches_every_word_as_prefix():
+    assert prefix_tsquery("Awaria  spręż") == "awaria:* & spręż:*"
+
+def test_prefix_tsquery_drops_tsquery_operators():
+    assert prefix_tsquery("pompa & !zawór:*") == "pompa:* & zawór:*"
+    assert prefix_tsquery("&|!()") is None
+
+def _run(scenario):
+    """
+    Scenariusz z dwiema organizacjami i zgłoszeniami zawierającymi unikalne słowo.
+    Użytkownika (także klienta, którego rola nie istnieje w tabeli users) podstawia nadpisanie zależności.
+    """
+    from app.db import SessionLocal, engine
+    from app.deps import get_current_user_payload
+    from app.main import app
+
+    async def main():
+        user = {}
+        app.dependency_overrides[get_current_user_payload] = lambda: user
+        try:
+            async with SessionLocal() as session:
+                seeded = await _seed(session)
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    await scenario(client, user, seeded)
+            finally:
+                async with SessionLocal() as session:
+                    orgs = {"orgs": [seeded["own_org"], seeded["other_org"]]}
+                    await session.execute(text("DELETE FROM service_tickets WHERE organization_id = ANY(:orgs)"), orgs)
+                    await session.execute(text("DELETE FROM ice_rinks WHERE organization_id = ANY(:orgs)"), orgs)
+                    await session.execute(text("DELETE FROM organizations WHERE id = ANY(:orgs)"), orgs)
+                    await session.commit()
+        finally:
+            app.dependency_overrides.pop(get_current_user_payload, None)
+            await engine.dispose()
+
+    asyncio.run(main())
+
+async def _seed(session) -> dict:
+    word = f"szron{uuid.uuid4().hex[:10]}"
+    admin = (await session.execute(text("SELECT id FROM users WHERE username = 'admin'"))).scalar_one()
+    seeded = {"word": word, "admin": admin}
+    for key in ("own", "other"):
+        org = (await session.execute(text("INSERT INTO organizations (name) VALUES (:name) RETURNING id"),
+                                     {"name": f"test-search-{key}-{word}"})).scalar_one()
+        seeded[f"{key}_org"] = org
+        seeded[f"{key}_rink"] = (await session.execute(text("""
+            INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by)
+            VALUES (:org, 'test-search', 'test', 'test', 100, :admin) RETURNING id
+        """), {"org": org, "admin": admin})).scalar_one()
+
+    async def ticket(key: str, title: str, description: str) -> uuid.UUID:
+        return (await session.execute(text("""
+            INSERT INTO service_tickets (ice_rink_id, organization_id, created_by, category, title, description)
+            VALUES (:rink, :org, :admin, 'test-search', :title, :description) RETURNING id
+        """), {"rink": seeded[f"{key}_rink"], "org": seeded[f"{key}_org"], "admin": admin,
+               "title": title, "description": description})).scalar_one()
+
+    # Słowo w tytule (waga A) jest wyżej niż w opisie (waga B)
+    seeded["title_hit"] = await ticket("own", f"Awaria {word}", "Sprężarka")
+    seeded["description_hit"] = await ticket("own", "Sprężarka", f"Awaria, kod {word}")
+    seeded["other_hit"] = await ticket("other", f"Awaria {word}", "Sprężarka")
+    comments = await session.execute(text("""
+        INSERT INTO ticket_comments (ticket_id, user_id, comment, is_internal)
+        VALUES (:own, :admin, :public, false), (:own, :admin, :internal, true), (:other, :admin, :public, false)
+        RETURNING id
+    """), {"own": seeded["title_hit"], "other": seeded["other_hit"], "admin": admin,
+           "public": f"Wymieniono zawór {word}", "internal": f"Notatka serwisu {word}"})
+    seeded["public_comment"], seeded["internal_comment"], seeded["other_comment"] = comments.scalars()
+    await session.commit()
+    return seeded
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+def test_search_ranks_and_scopes_results():
+    async def scenario(client, user, seeded):
+        url = f"/api/search?q={seeded['word']}&types=tickets&types=comments"
+        user.update({"sub": str(seeded["admin"]), "role": "admin", "organization_id": str(seeded["own_org"])})
+        admin = (await client.get(url)).json()
+        assert admin["ice_rinks"] == [] and admin["organizations"] == []
+        ranks = [hit["rank"] for hit in admin["tickets"]]
+        assert ranks == sorted(ranks, reverse=True)
+        assert {hit["id"] for hit in admin["tickets"][:2]} == {str(seeded["title_hit"]), str(seeded["other_hit"])}
+        assert admin["tickets"][2]["id"] == str(seeded["description_hit"])
+        assert len(admin["comments"]) == 3
+
+        # Klient widzi tylko swoją organizację (także gdy poda inną) i bez komentarzy wewnętrznych
+        user.update({"role": "client"})
+        client_result = (await client.get(url + f"&organization_id={seeded['other_org']}")).json()
+        assert [hit["id"] for hit in client_result["tickets"]] == [str(seeded["title_hit"]),
+                                                                   str(seeded["description_hit"])]
+        assert [hit["id"] for hit in client_result["comments"]] == [str(seeded["public_comment"])]
+
+    _run(scenario)
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+def test_cancelled_search_returns_search_timeout(monkeypatch):
+    async def slow_search(self, text_, limit, organization_id=None):
+        # Zapytanie przerwane przez statement_timeout (SQLSTATE 57014)
+        await self.session.execute(text("SET LOCAL statement_timeout = 1"))
+        await self.session.execute(text("SELECT pg_sleep(1)"))
+
+    monkeypatch.setattr(SearchRepository, "search_tickets", slow_search)
+
+    async def scenario(client, user, seeded):
+        user.update({"sub": str(seeded["admin"]), "role": "admin", "organization_id": str(seeded["own_org"])})
+        response = await client.get(f"/api/search?q={seeded['word']}&types=tickets")
+        assert response.status_code == 503
+        assert response.json()["detail"]["error"]["code"] == "SEARCH_TIMEOUT"
+
+    _run(scenario)
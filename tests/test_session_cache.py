@@ -0,0 +1,46 @@
+import time
+import uuid
+
+from app.session_cache import SessionCache
+
+def _cache(max_size=3, ttl=30):
+    cache = SessionCache(max_size=max_size, ttl=ttl)
+    cache.listening = True
+    return cache
+
+def test_cache_hit_and_invalidation():
+    cache = _cache()
+    jti = uuid.uuid4()
+    assert not cache.is_valid(jti)
+    cache.add(jti, time.time() + 3600)
+    assert cache.is_valid(jti)
+
+    cache.invalidate(jti)
+    assert not cache.is_valid(jti)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["revocations"]) == (1, 2, 1)
+
+def test_entry_never_outlives_token_exp():
+    cache = _cache(ttl=3600)
+    jti = uuid.uuid4()
+    cache.add(jti, time.time() - 1)
+    assert not cache.is_valid(jti)
+
+def test_cache_is_bounded_lru():
+    cache = _cache(max_size=2)
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    exp = time.time() + 3600
+    cache.add(a, exp)
+    cache.add(b, exp)
+    assert cache.is_valid(a)
+    cache.add(c, exp)
+    assert cache.is_valid(a) and cache.is_valid(c)
+    assert not cache.is_valid(b)
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_bypassed_without_listener():
+    cache = SessionCache(max_size=10, ttl=30)
+    jti = uuid.uuid4()
+    cache.add(jti, time.time() + 3600)
+    assert not cache.is_valid(jti)
+    assert cache.stats()["size"] == 0
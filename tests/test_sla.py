@@ -0,0 +1,75 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.repositories.notification import NotificationRepository
+from app.repositories.service_ticket import ServiceTicketRepository
+from app.sla import SlaMonitor
+
+NOW = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+def test_due_tickets_pop_in_deadline_order_and_are_counted():
+    monitor, org = SlaMonitor(), uuid.uuid4()
+    late, later, future = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    monitor.apply(later, org, "low", "new", NOW - timedelta(minutes=1))
+    monitor.apply(future, org, "high", "assigned", NOW + timedelta(hours=1))
+    monitor.apply(late, org, "critical", "in_progress", NOW - timedelta(hours=1))
+
+    assert monitor.pop_due(NOW) == [late, later]
+    assert monitor.pop_due(NOW) == []
+    assert monitor.next_deadline() == NOW + timedelta(hours=1)
+    assert monitor.breach_counts(org) == {"low": 1, "medium": 0, "high": 0, "critical": 1}
+    assert sum(monitor.breach_counts(uuid.uuid4()).values()) == 0
+
+def test_closing_or_moving_deadline_updates_counts():
+    monitor, org = SlaMonitor(), uuid.uuid4()
+    moved, closed = uuid.uuid4(), uuid.uuid4()
+    monitor.apply(moved, org, "medium", "new", NOW - timedelta(minutes=5))
+    monitor.apply(closed, org, "medium", "new", NOW - timedelta(minutes=5))
+    monitor.pop_due(NOW)
+
+    monitor.apply(moved, org, "medium", "new", NOW + timedelta(minutes=5))
+    monitor._apply_payload(json.dumps({"id": str(closed), "organization_id": str(org), "priority": "medium",
+                                       "status": "closed", "sla_target": (NOW - timedelta(minutes=5)).isoformat()}))
+    assert monitor.breach_counts()["medium"] == 0
+    assert monitor.pop_due(NOW) == []
+    assert monitor.pop_due(NOW + timedelta(minutes=5)) == [moved]
+
+def test_failed_escalation_is_retried(monkeypatch):
+    org, ticket_id = uuid.uuid4(), uuid.uuid4()
+    calls = []
+
+    async def claim_sla_breaches(self, ticket_ids):
+        calls.append(list(ticket_ids))
+        if len(calls) == 1:
+            raise ConnectionError("database is unavailable")
+        return [{"id": ticket_id, "ticket_number": "T-1", "organization_id": org, "assigned_to_id": None,
+                 "priority": "high", "sla_target": NOW}]
+
+    async def enqueue_many(self, notifications):
+        pass
+
+    monkeypatch.setattr(ServiceTicketRepository, "claim_sla_breaches", claim_sla_breaches)
+    monkeypatch.setattr(NotificationRepository, "enqueue_many", enqueue_many)
+
+    async def run():
+        monitor = SlaMonitor(retry_base_s=0.01, retry_cap_s=0.05)
+        monitor._wakeup = asyncio.Event()
+        timer = asyncio.create_task(monitor._timer())
+        try:
+            monitor.apply(ticket_id, org, "high", "in_progress", datetime.now(timezone.utc) - timedelta(seconds=1))
+            for _ in range(100):
+                if monitor.escalations:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            timer.cancel()
+            await asyncio.gather(timer, return_exceptions=True)
+        return monitor
+
+    monitor = asyncio.run(run())
+    assert calls == [[ticket_id], [ticket_id]]
+    assert monitor.escalations == 1
+    assert monitor.stats()["escalation_retries"] == 0
+    assert monitor.breach_counts(org)["high"] == 1
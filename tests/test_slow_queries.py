@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app.query_stats import track_queries
+from app.slow_queries import SlowQueryLog, is_read_only, redact
+
+def _log(**kwargs) -> SlowQueryLog:
+    return SlowQueryLog(**{"threshold_ms": 50, "buffer_size": 3, "explain_after": 2, "explain_timeout_ms": 1000,
+                           "plan_ttl_s": 3600, **kwargs})
+
+def test_parameters_are_redacted_and_only_reads_are_analyzed():
+    assert redact((uuid.uuid4(), "secret", [1, 2, 3], None, 5)) == ["UUID", "str[6]", "list[3]", None, "int"]
+    assert redact([(1,), (2,)], executemany=True) == "2 rows"
+    assert is_read_only("WITH x AS (SELECT 1) SELECT updated_at FROM x")
+    assert not is_read_only("SELECT * FROM users WHERE id = $1 FOR UPDATE")
+    assert not is_read_only("WITH d AS (DELETE FROM t RETURNING id) SELECT * FROM d")
+
+def test_repeat_offender_is_explained_once_and_buffer_is_bounded():
+    class RecordingSlowQueryLog(SlowQueryLog):
+        async def _explain(self, engine, shape, statement, parameters):
+            self.explained += 1
+            self.explain_calls.append((statement, parameters))
+
+    async def run():
+        log = RecordingSlowQueryLog(threshold_ms=50, buffer_size=3, explain_after=2, explain_timeout_ms=1000,
+                                    plan_ttl_s=3600)
+        log.explain_calls = []
+        log.start()
+        scope = {"method": "GET", "path": "/api/dashboard/kpi"}
+        with track_queries(scope):
+            for rink in range(4):
+                log.record(None, "primary", f"SELECT * FROM measurements WHERE ice_rink_id = {rink}", ("x",),
+                           False, 0.2)
+        await asyncio.sleep(0)
+        await log.stop()
+        return log
+
+    log = asyncio.run(run())
+    assert [e["route"] for e in log.entries] == ["GET /api/dashboard/kpi"] * 3
+    assert log.recorded == 4 and log.entries[-1]["parameters"] == ["str[1]"]
+    # Ten sam kształt z różnymi literałami - jeden EXPLAIN, z wartościami parametrów drugiego wykonania
+    assert log.explain_calls == [("SELECT * FROM measurements WHERE ice_rink_id = 1", ("x",))]
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a database (DB_TESTS=1)")
+def test_slow_reads_get_analyze_plan():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app import query_stats
+    from app.config import get_settings
+
+    async def run():
+        engine = create_async_engine(get_settings().database_url)
+        query_stats.instrument_engine(engine)
+        log = _log()
+        log.instrument_engine(engine, "primary")
+        log.start()
+        try:
+            async with engine.connect() as conn:
+                for _ in range(2):
+                    await conn.execute(text("SELECT pg_sleep(:s), count(*) FROM pg_class WHERE relname <> :name"),
+                                       {"s": 0.06, "name": "secret-relname"})
+            while log.stats()["pending_explains"]:
+                await asyncio.sleep(0.05)
+            return log.snapshot(10)
+        finally:
+            await log.stop()
+            await engine.dispose()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["recorded"] == 2 and snapshot["explained"] == 1
+    (plan,) = snapshot["plans"]
+    assert plan["analyze"] and plan["slow_count"] == 2
+    assert "Actual Total Time" in plan["plan"]["Plan"] and "Shared Hit Blocks" in plan["plan"]["Plan"]
+    # Plan ogólny - parametry jako $n, bez wartości z zapytania
+    assert "secret-relname" not in json.dumps(plan["plan"]) and "$2" in json.dumps(plan["plan"])
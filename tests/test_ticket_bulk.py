@@ -0,0 +1,90 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.repositories.service_ticket import BulkSelectionTooLarge, status_change_comment
+from app.routers.service_tickets import _bulk_selection
+from app.schemas import ServiceTicketBulkClose
+
+def _code(payload: dict) -> str:
+    with pytest.raises(HTTPException) as exc:
+        _bulk_selection(ServiceTicketBulkClose(**payload))
+    return exc.value.detail["error"]["code"]
+
+def test_selection_by_ids_or_filter():
+    ids = [uuid.uuid4(), uuid.uuid4()]
+    assert _bulk_selection(ServiceTicketBulkClose(ticket_ids=ids)) == {"ticket_ids": ids}
+    selection = _bulk_selection(ServiceTicketBulkClose(filter={"status": ["new"], "source": "automatic"}))
+    assert selection == {"filters": {"status": ["new"], "source": "automatic"}}
+
+def test_selection_must_be_exactly_one_and_non_empty():
+    assert _code({}) == "INVALID_BULK_SELECTION"
+    assert _code({"ticket_ids": [str(uuid.uuid4())], "filter": {"category": "x"}}) == "INVALID_BULK_SELECTION"
+    assert _code({"filter": {}}) == "INVALID_BULK_SELECTION"
+    assert _code({"ticket_ids": []}) == "BULK_LIMIT_EXCEEDED"
+
+@pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+def test_bulk_update_reports_each_ticket_and_comments_changed_ones(query_budget):
+    from app.db import SessionLocal, engine
+    from app.repositories.service_ticket import ServiceTicketRepository
+
+    category = f"test-bulk-{uuid.uuid4().hex[:8]}"
+
+    async def run():
+        try:
+            async with SessionLocal() as session:
+                admin = (await session.execute(text(
+                    "SELECT id, organization_id FROM users WHERE username = 'admin'"))).one()
+                rink_id = (await session.execute(text("""
+                    INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption,
+                                           created_by)
+                    VALUES (:org, 'test-bulk-update', 'test', 'test', 100, :admin) RETURNING id
+                """), {"org": admin.organization_id, "admin": admin.id})).scalar_one()
+                new_a, new_b, closed = (await session.execute(text("""
+                    INSERT INTO service_tickets (ice_rink_id, organization_id, created_by, status, category,
+                                                 title, description)
+                    SELECT :rink, :org, :admin, s, :category, 'Bulk', 'Bulk'
+                    FROM unnest(CAST(ARRAY['new', 'new', 'closed'] AS text[])) WITH ORDINALITY AS t(s, n)
+                    ORDER BY n
+                    RETURNING id
+                """), {"rink": rink_id, "org": admin.organization_id, "admin": admin.id,
+                       "category": category})).scalars()
+                await session.commit()
+                try:
+                    repo = ServiceTicketRepository(session)
+                    missing = uuid.uuid4()
+                    with query_budget(3):
+                        results = await repo.bulk_update(
+                            admin.id, {"status": "closed"}, lambda row: status_change_comment(row.status, "closed"),
+                            limit=10, ticket_ids=[new_b, missing, closed, new_a, new_b],
+                        )
+                    await session.commit()
+                    comments = dict((await session.execute(text("""
+                        SELECT t.id, count(c.id) FROM service_tickets t
+                        LEFT JOIN ticket_comments c ON c.ticket_id = t.id AND c.is_internal
+                        WHERE t.category = :category GROUP BY t.id
+                    """), {"category": category})).all())
+                    with pytest.raises(BulkSelectionTooLarge):
+                        await repo.bulk_update(admin.id, {"status": "resolved"}, lambda row: "x", limit=2,
+                                               filters={"category": [category]})
+                    await session.rollback()
+                    return [new_a, new_b, closed, missing], results, comments
+                finally:
+                    await session.execute(text("DELETE FROM service_tickets WHERE category = :category"),
+                                          {"category": category})
+                    await session.execute(text("DELETE FROM ice_rinks WHERE id = :rink"), {"rink": rink_id})
+                    await session.commit()
+        finally:
+            await engine.dispose()
+
+    (new_a, new_b, closed, missing), results, comments = asyncio.run(run())
+    # Kolejność `ticket_ids` bez powtórzeń
+    assert [(r["id"], r["result"]) for r in results] == [
+        (new_b, "updated"), (missing, "not_found"), (closed, "unchanged"), (new_a, "updated"),
+    ]
+    assert all(r["status"] == "closed" for r in results if r["result"] != "not_found")
+    assert comments == {new_a: 1, new_b: 1, closed: 0}
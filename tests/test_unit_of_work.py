@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.models import SystemConfig
+from app.repositories.base import BaseRepository, in_unit_of_work, unit_of_work
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.calls = []
+
+    async def commit(self):
+        self.calls.append("commit")
+
+    async def rollback(self):
+        self.calls.append("rollback")
+
+    async def flush(self):
+        self.calls.append("flush")
+
+def test_repositories_join_outer_unit_of_work():
+    session = FakeSession()
+    repo = BaseRepository(SystemConfig, session)
+
+    async def run():
+        async with unit_of_work(session):
+            await repo._commit()
+            async with unit_of_work(session):
+                await repo._commit()
+            assert in_unit_of_work(session)
+        assert not in_unit_of_work(session)
+        await repo._commit()
+
+    asyncio.run(run())
+    assert session.calls == ["flush", "flush", "commit", "commit"]
+
+def test_unit_of_work_rolls_back_once_on_error():
+    session = FakeSession()
+
+    async def run():
+        async with unit_of_work(session):
+            async with unit_of_work(session):
+                raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert session.calls == ["rollback"]
+    assert not in_unit_of_work(session)
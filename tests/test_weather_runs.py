@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.repositories.weather_forecast_run import run_to_arrays
+
+def test_run_to_arrays_unpacks_variables():
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    run = SimpleNamespace(
+        forecast_times=[start + timedelta(hours=3 * i) for i in range(3)],
+        temperature_min=[-1.5, 0.0, 2.25],
+        temperature_max=[0.5, 1.0, 3.0],
+        humidity=[80.0, None, 70.0],
+    )
+    arrays = run_to_arrays(run)
+
+    assert arrays["forecast_time"][1] == np.datetime64("2025-01-01T03:00:00")
+    assert arrays["temperature_min"].dtype == np.float32
+    assert arrays["temperature_min"].tolist() == [-1.5, 0.0, 2.25]
+    assert np.isnan(arrays["humidity"][1])
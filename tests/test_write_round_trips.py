@@ -0,0 +1,112 @@
+"""
+Liczba zapytań do bazy dla endpointów zapisujących dane.
+
+Wymaga jednorazowej bazy załadowanej z setup_database.sql (konto admin / admin123):
+    DB_TESTS=1 DATABASE_URL=postgresql+asyncpg://... python -m pytest tests/test_write_round_trips.py
+"""
+import asyncio
+import os
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from sqlalchemy import event, text
+
+pytestmark = pytest.mark.skipif(os.getenv("DB_TESTS") != "1", reason="requires a disposable database (DB_TESTS=1)")
+
+@contextmanager
+def count_round_trips():
+    """Zlicza zapytania i COMMIT-y wysłane przez silnik aplikacji."""
+    from app.db import engine
+
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def on_commit(conn):
+        statements.append("COMMIT")
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    event.listen(engine.sync_engine, "commit", on_commit)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+        event.remove(engine.sync_engine, "commit", on_commit)
+
+def _run(scenario):
+    from app.db import engine
+    from app.main import app
+
+    async def main():
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                login = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+                data = login.json()["data"]
+                headers = {"Authorization": f"Bearer {data['access_token']}"}
+                await scenario(client, headers, data["user"])
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+def test_unchanged_update_is_single_statement_without_write():
+    async def scenario(client, headers, user):
+        org_id = user["organization_id"]
+        current = (await client.get(f"/api/organizations/{org_id}", headers=headers)).json()
+
+        with count_round_trips() as statements:
+            response = await client.put(f"/api/organizations/{org_id}", headers=headers, json={"name": current["name"]})
+        assert response.status_code == 200
+        assert response.json()["updated_at"] == current["updated_at"]
+        # sprawdzenie sesji + UPDATE ... RETURNING (CTE) + COMMIT
+        assert len(statements) == 3, statements
+
+        renamed = await client.put(f"/api/organizations/{org_id}", headers=headers, json={"name": current["name"] + " 2"})
+        assert renamed.json()["name"] == current["name"] + " 2"
+        assert renamed.json()["updated_at"] != current["updated_at"]
+        await client.put(f"/api/organizations/{org_id}", headers=headers, json={"name": current["name"]})
+
+    _run(scenario)
+
+def test_password_update_and_logout_do_not_select_before_write():
+    async def scenario(client, headers, user):
+        with count_round_trips() as statements:
+            response = await client.put(
+                f"/api/users/{user['id']}/password", headers=headers, json={"new_password": "admin123"}
+            )
+        assert response.status_code == 204
+        # sprawdzenie sesji + odczyt użytkownika w routerze + UPDATE ... RETURNING + COMMIT
+        assert len(statements) == 4, statements
+        assert not any(s.startswith("SELECT users") for s in statements[2:])
+
+        with count_round_trips() as statements:
+            response = await client.post("/api/auth/logout", headers=headers)
+        assert response.status_code == 204
+        # UPDATE ... RETURNING + NOTIFY + COMMIT
+        assert len(statements) == 3, statements
+
+    _run(scenario)
+
+def test_ssp_status_update_is_single_statement():
+    async def scenario(client, headers, user):
+        from app.db import SessionLocal
+        from app.repositories.ice_rink import IceRinkRepository
+
+        async with SessionLocal() as session:
+            rink_id = (await session.execute(text(
+                "INSERT INTO ice_rinks (organization_id, name, location, chiller_type, max_power_consumption, created_by) "
+                "VALUES (:org, 'round-trip-test', 'test', 'test', 1, :user) RETURNING id"
+            ), {"org": user["organization_id"], "user": user["id"]})).scalar_one()
+            await session.commit()
+            try:
+                with count_round_trips() as statements:
+                    await IceRinkRepository(session).update_ssp_status(rink_id, "error")
+                assert len(statements) == 2, statements
+            finally:
+                await session.execute(text("DELETE FROM ice_rinks WHERE id = :id"), {"id": rink_id})
+                await session.commit()
+
+    _run(scenario)